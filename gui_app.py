@@ -9,7 +9,9 @@ import sys
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from typing import List, Dict, Optional
+import queue
 import threading
+from collections import OrderedDict
 from pathlib import Path
 from PIL import Image, ImageTk, ImageDraw, ImageFont
 
@@ -33,8 +35,14 @@ for path in [current_dir, src_path]:
     if path not in sys.path:
         sys.path.insert(0, path)
 
+from batch_processor import BatchProcessor
 from exif_reader import ExifReader
+from exif_cache import ExifCache
+from image_importer import ImageImporter
+from preview_cache import PreviewProxyCache
+from thumbnail_service import ThumbnailService
 from watermark_processor import WatermarkProcessor, WatermarkPosition
+from watermark_spec import WatermarkSpec, parse_position
 
 
 class ImageItem:
@@ -42,7 +50,7 @@ class ImageItem:
     def __init__(self, file_path: str, date_text: str = ""):
         self.file_path = file_path
         self.date_text = date_text
-        self.thumbnail = None
+        self.thumbnail = None  # 列表中显示的缩略图（PhotoImage），滚出可见范围较久后释放
         self.status = "待处理"  # 待处理、处理中、已完成、失败
 
 
@@ -56,11 +64,34 @@ class PhotoWatermarkGUI:
         self.setup_window()
         
         # 初始化核心组件
-        self.exif_reader = ExifReader()
+        self.exif_reader = ExifReader(cache=ExifCache.open_default())
         self.watermark_processor = WatermarkProcessor()
+        # 预览代理图缓存：每张图片只按预览区域大小解码一次
+        self.preview_cache = PreviewProxyCache(self.watermark_processor)
         
-        # 存储导入的图片
+        # 存储导入的图片（路径集合用于快速去重）
         self.image_items: List[ImageItem] = []
+        self.image_paths = set()
+        self.tree_rows: Dict[str, tuple] = {}  # 图片路径 -> (列表行ID, ImageItem)
+        
+        # 后台缩略图服务：只为滚动到可见范围的行生成缩略图
+        self.thumbnail_service = ThumbnailService(self.THUMBNAIL_SIZE)
+        self.thumbnail_lru: "OrderedDict[str, ImageItem]" = OrderedDict()
+        self._thumbnail_request_id = None
+        
+        # 后台导入任务
+        self.importer: Optional[ImageImporter] = None
+        self.pending_imports: List[tuple] = []
+        self.import_progress: Optional[ttk.Progressbar] = None
+        self.cancel_import_button: Optional[ttk.Button] = None
+        
+        # 后台导出任务（进程池），结果由界面线程按固定频率取出
+        self.export_processor: Optional[BatchProcessor] = None
+        self.export_results: Optional[queue.Queue] = None
+        self.export_progress: Optional[ttk.Progressbar] = None
+        self.start_button: Optional[ttk.Button] = None
+        self.pause_export_button: Optional[ttk.Button] = None
+        self.cancel_export_button: Optional[ttk.Button] = None
         
         # 设置参数的默认值
         self.settings = {
@@ -73,6 +104,7 @@ class PhotoWatermarkGUI:
             # 新增导出设置
             'output_dir': '',
             'jpeg_quality': 95,
+            'jobs': os.cpu_count() or 1,
             'naming_rule': 'suffix',
             'custom_prefix': 'wm_',
             'custom_suffix': '_watermarked',
@@ -90,7 +122,10 @@ class PhotoWatermarkGUI:
             'image_watermark_path': '',
             'image_watermark_scale': 1.0,
             # 新增旋转设置
-            'rotation': 0.0
+            'rotation': 0.0,
+            # 平铺水印设置
+            'tile_spacing': 100,
+            'tile_angle': 30.0
         }
         
         # 初始化Tk变量
@@ -104,6 +139,7 @@ class PhotoWatermarkGUI:
         self.custom_prefix_var = tk.StringVar(value=str(self.settings['custom_prefix']))
         self.custom_suffix_var = tk.StringVar(value=str(self.settings['custom_suffix']))
         self.jpeg_quality_var = tk.IntVar(value=int(self.settings['jpeg_quality']))
+        self.jobs_var = tk.IntVar(value=int(self.settings['jobs']))
         self.resize_mode_var = tk.StringVar(value=str(self.settings['resize_mode']))
         self.resize_width_var = tk.IntVar(value=int(self.settings['resize_width']))
         self.resize_height_var = tk.IntVar(value=int(self.settings['resize_height']))
@@ -117,6 +153,8 @@ class PhotoWatermarkGUI:
         self.image_watermark_scale_var = tk.DoubleVar(value=float(self.settings['image_watermark_scale']))
         # 新增旋转变量
         self.rotation_var = tk.DoubleVar(value=float(self.settings['rotation']))
+        self.tile_spacing_var = tk.IntVar(value=int(self.settings['tile_spacing']))
+        self.tile_angle_var = tk.DoubleVar(value=float(self.settings['tile_angle']))
         
         # 初始化标签变量
         self.opacity_label = None
@@ -127,6 +165,8 @@ class PhotoWatermarkGUI:
         self.image_tree: Optional[ttk.Treeview] = None
         self.preview_canvas: Optional[tk.Canvas] = None
         self.preview_photo = None
+        self.watermark_photo = None
+        self._preview_base_key = None  # 当前底图对应的 (图片, 预览区域大小)
         self.current_preview_index = None
         self.status_var: Optional[tk.StringVar] = None
         self._window_resize_id = None
@@ -148,6 +188,8 @@ class PhotoWatermarkGUI:
         # 绑定图片列表选择事件
         if self.image_tree is not None:
             self.image_tree.bind('<<TreeviewSelect>>', self.on_image_select)
+            self.image_tree.bind('<Configure>', lambda event: self.schedule_thumbnail_request())
+        self.root.after(self.THUMBNAIL_POLL_MS, self._poll_thumbnails)
         
     def setup_window(self):
         """设置主窗口"""
@@ -207,6 +249,13 @@ class PhotoWatermarkGUI:
         ttk.Button(import_frame, text="清空列表", 
                   command=self.clear_images).grid(row=2, column=0, sticky='ew', pady=2)
         
+        # 导入进度与取消按钮
+        self.import_progress = ttk.Progressbar(import_frame, mode='determinate', maximum=1)
+        self.import_progress.grid(row=3, column=0, sticky='ew', pady=(4, 2))
+        self.cancel_import_button = ttk.Button(import_frame, text="取消导入",
+                                               command=self.cancel_import, state=tk.DISABLED)
+        self.cancel_import_button.grid(row=4, column=0, sticky='ew', pady=2)
+        
         import_frame.columnconfigure(0, weight=1)
         
         # 拖拽提示
@@ -242,7 +291,7 @@ class PhotoWatermarkGUI:
         position_combo = ttk.Combobox(settings_frame, textvariable=self.position_var, 
                                      values=['top_left', 'top_center', 'top_right',
                                             'center_left', 'center', 'center_right',
-                                            'bottom_left', 'bottom_center', 'bottom_right'],
+                                            'bottom_left', 'bottom_center', 'bottom_right', 'tile'],
                                      state="readonly", width=12)
         position_combo.grid(row=2, column=1, sticky='ew', pady=2)
         
@@ -274,6 +323,8 @@ class PhotoWatermarkGUI:
         self.image_watermark_scale_var.trace('w', self.on_setting_change)
         # 新增旋转绑定
         self.rotation_var.trace('w', self.on_setting_change)
+        self.tile_spacing_var.trace('w', self.on_setting_change)
+        self.tile_angle_var.trace('w', self.on_setting_change)
         # 新增字体路径绑定
         self.font_path_var.trace('w', self.on_setting_change)
         
@@ -388,6 +439,12 @@ class PhotoWatermarkGUI:
         self.jpeg_quality_label.grid(row=5, column=1, sticky=tk.W, pady=2)
         quality_scale.configure(command=self.update_jpeg_quality_label)
         
+        # 并行进程数
+        ttk.Label(export_frame, text="并行进程数:").grid(row=6, column=0, sticky=tk.W, pady=2)
+        jobs_spin = ttk.Spinbox(export_frame, from_=1, to=max(64, int(self.settings['jobs'])),
+                                textvariable=self.jobs_var, width=10)
+        jobs_spin.grid(row=6, column=1, sticky='ew', pady=2)
+        
         export_frame.columnconfigure(1, weight=1)
         
         # 图片尺寸调整区域
@@ -468,16 +525,38 @@ class PhotoWatermarkGUI:
                                     textvariable=self.rotation_var, width=6)
         rotation_entry.grid(row=0, column=1)
         
+        # 平铺水印设置（位置为 tile 时生效）
+        ttk.Label(image_watermark_frame, text="平铺间距:").grid(row=3, column=0, sticky=tk.W, pady=2)
+        tile_spacing_spin = ttk.Spinbox(image_watermark_frame, from_=0, to=2000, increment=10,
+                                        textvariable=self.tile_spacing_var, width=10)
+        tile_spacing_spin.grid(row=3, column=1, sticky='ew', pady=2)
+        
+        ttk.Label(image_watermark_frame, text="平铺角度:").grid(row=4, column=0, sticky=tk.W, pady=2)
+        tile_angle_spin = ttk.Spinbox(image_watermark_frame, from_=-180, to=180, increment=5,
+                                      textvariable=self.tile_angle_var, width=10)
+        tile_angle_spin.grid(row=4, column=1, sticky='ew', pady=2)
+        
         image_watermark_frame.columnconfigure(1, weight=1)
         
         # 处理按钮区域
         button_frame = ttk.Frame(control_frame)
         button_frame.grid(row=6, column=0, sticky='ew', pady=(10, 0))
         
-        ttk.Button(button_frame, text="开始处理", 
-                  command=self.start_processing, style="Accent.TButton").grid(row=0, column=0, sticky='ew')
+        self.start_button = ttk.Button(button_frame, text="开始处理", 
+                                       command=self.start_processing, style="Accent.TButton")
+        self.start_button.grid(row=0, column=0, columnspan=2, sticky='ew')
+        
+        self.export_progress = ttk.Progressbar(button_frame, mode='determinate', maximum=1)
+        self.export_progress.grid(row=1, column=0, columnspan=2, sticky='ew', pady=(4, 2))
+        self.pause_export_button = ttk.Button(button_frame, text="暂停",
+                                              command=self.toggle_pause_export, state=tk.DISABLED)
+        self.pause_export_button.grid(row=2, column=0, sticky='ew', padx=(0, 2))
+        self.cancel_export_button = ttk.Button(button_frame, text="取消处理",
+                                               command=self.cancel_export, state=tk.DISABLED)
+        self.cancel_export_button.grid(row=2, column=1, sticky='ew', padx=(2, 0))
         
         button_frame.columnconfigure(0, weight=1)
+        button_frame.columnconfigure(1, weight=1)
         
         control_frame.columnconfigure(0, weight=1)
         
@@ -495,11 +574,15 @@ class PhotoWatermarkGUI:
         list_frame.columnconfigure(0, weight=1)
         list_frame.rowconfigure(0, weight=1)
         
-        # 创建Treeview显示图片列表
+        # 创建Treeview显示图片列表，#0列显示缩略图
         columns = ('文件名', '路径', '日期', '状态')
-        self.image_tree = ttk.Treeview(list_frame, columns=columns, show='headings', height=8)
+        ttk.Style().configure('Thumbnail.Treeview', rowheight=self.THUMBNAIL_SIZE[1] + 4)
+        self.image_tree = ttk.Treeview(list_frame, columns=columns, show='tree headings', height=4,
+                                       style='Thumbnail.Treeview')
         
         # 设置列
+        self.image_tree.heading('#0', text='缩略图')
+        self.image_tree.column('#0', width=self.THUMBNAIL_SIZE[0] + 24, stretch=False)
         self.image_tree.heading('文件名', text='文件名')
         self.image_tree.heading('路径', text='完整路径')
         self.image_tree.heading('日期', text='拍摄日期')
@@ -514,7 +597,12 @@ class PhotoWatermarkGUI:
         # 滚动条
         tree_scroll_v = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.image_tree.yview)
         tree_scroll_h = ttk.Scrollbar(list_frame, orient=tk.HORIZONTAL, command=self.image_tree.xview)
-        self.image_tree.configure(yscrollcommand=tree_scroll_v.set, xscrollcommand=tree_scroll_h.set)
+        
+        def on_tree_scroll(first, last):
+            tree_scroll_v.set(first, last)
+            self.schedule_thumbnail_request()
+        
+        self.image_tree.configure(yscrollcommand=on_tree_scroll, xscrollcommand=tree_scroll_h.set)
         
         # 布局
         self.image_tree.grid(row=0, column=0, sticky='ewns')
@@ -601,11 +689,10 @@ class PhotoWatermarkGUI:
         # 获取点击位置
         x, y = event.x, event.y
         
-        # 查找点击的项目
+        # 查找点击的项目，只有水印图层可以拖拽
         items = self.preview_canvas.find_overlapping(x-5, y-5, x+5, y+5)
-        if items:
-            # 检查是否点击了水印（假设水印是最后一个添加的项目）
-            self.drag_data["item"] = items[-1]
+        if self.watermark_canvas_item is not None and self.watermark_canvas_item in items:
+            self.drag_data["item"] = self.watermark_canvas_item
             self.drag_data["x"] = x
             self.drag_data["y"] = y
     
@@ -711,13 +798,13 @@ class PhotoWatermarkGUI:
     
     def on_setting_change(self, *args):
         """水印设置变化时更新预览"""
-        # 使用after方法延迟更新，避免频繁刷新
+        # 使用after方法延迟更新，合并连续的设置变化（通常只需重绘水印图层，延迟可以很短）
         if hasattr(self, '_preview_update_id') and self._preview_update_id is not None:
             try:
                 self.root.after_cancel(self._preview_update_id)
             except ValueError:
                 pass  # 忽略无效的ID
-        self._preview_update_id = self.root.after(300, self.update_preview)
+        self._preview_update_id = self.root.after(30, self.update_preview)
     
     def update_jpeg_quality_label(self, value):
         """更新JPEG质量标签"""
@@ -907,50 +994,170 @@ class PhotoWatermarkGUI:
         if folder:
             self.add_folder_images(folder)
     
+    # 界面线程每次最多插入的行数，以及轮询导入结果的间隔（约60帧/秒）
+    IMPORT_ROWS_PER_TICK = 300
+    IMPORT_POLL_MS = 16
+    
     def add_images(self, file_paths):
-        """添加图片到列表"""
-        new_count = 0
-        item_id = None  # 初始化item_id变量
-        for file_path in file_paths:
-            if self.exif_reader.is_supported_image(file_path):
-                # 检查是否已存在
-                if not any(item.file_path == file_path for item in self.image_items):
-                    # 获取日期信息
-                    date_text = self.exif_reader.get_watermark_date(file_path)
-                    item = ImageItem(file_path, date_text)
-                    self.image_items.append(item)
-                    
-                    # 添加到树形控件
-                    if self.image_tree is not None:
-                        item_id = self.image_tree.insert('', 'end', values=(
-                            os.path.basename(file_path),
-                            file_path,
-                            date_text,
-                            item.status
-                        ))
-                    new_count += 1
-                    
-                    # 如果是第一张图片，自动选中并显示预览
-                    if len(self.image_items) == 1:
-                        if self.image_tree is not None and item_id is not None:
-                            self.image_tree.selection_set(item_id)
-                        self.current_preview_index = 0
-                        self.update_preview()
-        
-        self.update_status(f"添加了 {new_count} 张图片，总计 {len(self.image_items)} 张")
+        """添加图片到列表（在后台读取日期，不阻塞界面）"""
+        self.start_import(list(file_paths))
     
     def add_folder_images(self, folder_path):
         """添加文件夹中的图片"""
-        image_files = self.exif_reader.get_image_files(folder_path)
-        if image_files:
-            self.add_images(image_files)
+        self.start_import([folder_path])
+    
+    def start_import(self, paths):
+        """启动后台导入；已有导入进行中时排队等待"""
+        if not paths:
+            return
+        if self.importer is not None:
+            self.pending_imports.append(paths)
+            return
+        
+        self.importer = ImageImporter(self.exif_reader, paths, known_paths=self.image_paths)
+        self._import_added = 0
+        self.importer.start()
+        if self.cancel_import_button is not None:
+            self.cancel_import_button.configure(state=tk.NORMAL)
+        self.update_status("正在导入图片...")
+        self.root.after(self.IMPORT_POLL_MS, self._poll_import)
+    
+    def cancel_import(self):
+        """取消正在进行和排队中的导入"""
+        self.pending_imports.clear()
+        if self.importer is not None:
+            self.importer.cancel()
+    
+    def _poll_import(self):
+        """在界面线程中分批取出导入结果并插入列表"""
+        importer = self.importer
+        if importer is None:
+            return
+        
+        if importer.cancelled:
+            importer.poll()  # 取消后丢弃尚未显示的结果
+            items = []
+        else:
+            items = importer.poll(self.IMPORT_ROWS_PER_TICK)
+        first_item_id = None
+        for file_path, date_text in items:
+            # 排队中的多个导入可能包含相同图片，以界面线程中的集合为准
+            if file_path in self.image_paths:
+                continue
+            item = ImageItem(file_path, date_text)
+            self.image_items.append(item)
+            self.image_paths.add(file_path)
+            self._import_added += 1
+            
+            # 添加到树形控件
+            if self.image_tree is not None:
+                item_id = self.image_tree.insert('', 'end', values=(
+                    os.path.basename(file_path),
+                    file_path,
+                    date_text,
+                    item.status
+                ))
+                self.tree_rows[file_path] = (item_id, item)
+                if len(self.image_items) == 1:
+                    first_item_id = item_id
+        
+        if items:
+            self.schedule_thumbnail_request()
+        
+        # 如果是第一张图片，自动选中并显示预览
+        if first_item_id is not None and self.image_tree is not None:
+            self.image_tree.selection_set(first_item_id)
+            self.current_preview_index = 0
+            self.update_preview()
+        
+        if self.import_progress is not None:
+            self.import_progress.configure(maximum=max(1, importer.total), value=importer.done)
+        
+        if not importer.drained:
+            self.update_status(f"正在导入图片 {importer.done}/{importer.total}...")
+            self.root.after(self.IMPORT_POLL_MS, self._poll_import)
+            return
+        
+        self._finish_import(importer)
+    
+    def _finish_import(self, importer):
+        """导入结束后更新状态，并启动排队中的导入"""
+        self.importer = None
+        if self.exif_reader.cache is not None:
+            self.exif_reader.cache.flush()
+        if self.cancel_import_button is not None:
+            self.cancel_import_button.configure(state=tk.DISABLED)
+        
+        if importer.error:
+            messagebox.showerror("错误", f"导入图片时出现错误: {importer.error}")
+        elif importer.cancelled:
+            self.update_status(f"已取消导入，添加了 {self._import_added} 张图片，总计 {len(self.image_items)} 张")
+        elif importer.total == 0 and any(os.path.isdir(path) for path in importer.paths):
+            folders = ", ".join(path for path in importer.paths if os.path.isdir(path))
+            messagebox.showinfo("提示", f"在文件夹 {folders} 中未找到支持的图片文件")
         else:
-            messagebox.showinfo("提示", f"在文件夹 {folder_path} 中未找到支持的图片文件")
+            self.update_status(f"添加了 {self._import_added} 张图片，总计 {len(self.image_items)} 张")
+        
+        if self.pending_imports:
+            self.start_import(self.pending_imports.pop(0))
+    
+    # 缩略图尺寸、轮询间隔，以及最多保留的缩略图数量（超出后释放最久未显示的）
+    THUMBNAIL_SIZE = (48, 48)
+    THUMBNAIL_POLL_MS = 50
+    MAX_THUMBNAILS = 500
+    
+    def schedule_thumbnail_request(self):
+        """列表滚动或行数变化后，在空闲时请求可见行的缩略图"""
+        if self._thumbnail_request_id is None:
+            self._thumbnail_request_id = self.root.after_idle(self._request_visible_thumbnails)
+    
+    def _request_visible_thumbnails(self):
+        """为当前可见（及前后各一屏）的行请求缩略图"""
+        self._thumbnail_request_id = None
+        if self.image_tree is None or not self.image_items:
+            return
+        count = len(self.image_items)
+        first, last = self.image_tree.yview()
+        start = int(first * count)
+        end = min(count, int(last * count) + 1)
+        margin = end - start
+        for index in range(max(0, start - margin), min(count, end + margin)):
+            item = self.image_items[index]
+            if item.thumbnail is not None:
+                self.thumbnail_lru.move_to_end(item.file_path)
+            else:
+                self.thumbnail_service.request(item.file_path)
+    
+    def _poll_thumbnails(self):
+        """在界面线程中取出生成好的缩略图并显示"""
+        for file_path, thumbnail in self.thumbnail_service.poll():
+            row = self.tree_rows.get(file_path)
+            if thumbnail is None or row is None or self.image_tree is None:
+                continue  # 生成失败，或图片已从列表中移除
+            item_id, item = row
+            item.thumbnail = ImageTk.PhotoImage(thumbnail)
+            self.image_tree.item(item_id, image=item.thumbnail)
+            self.thumbnail_lru[file_path] = item
+            self.thumbnail_lru.move_to_end(file_path)
+        
+        while len(self.thumbnail_lru) > self.MAX_THUMBNAILS:
+            file_path, item = self.thumbnail_lru.popitem(last=False)
+            item.thumbnail = None
+            row = self.tree_rows.get(file_path)
+            if row is not None and self.image_tree is not None:
+                self.image_tree.item(row[0], image='')
+        
+        self.root.after(self.THUMBNAIL_POLL_MS, self._poll_thumbnails)
     
     def clear_images(self):
         """清空图片列表"""
         if self.image_items and messagebox.askyesno("确认", "确定要清空所有图片吗？"):
+            self.cancel_import()
             self.image_items.clear()
+            self.image_paths.clear()
+            self.tree_rows.clear()
+            self.thumbnail_lru.clear()
+            self.preview_cache.clear()
             # 清空树形控件
             if self.image_tree is not None:
                 for item in self.image_tree.get_children():
@@ -961,6 +1168,8 @@ class PhotoWatermarkGUI:
             self.current_preview_index = None
             if self.preview_canvas is not None:
                 self.preview_canvas.delete("all")
+                self._preview_base_key = None
+                self.watermark_canvas_item = None
                 self.preview_canvas.create_text(
                     200, 150,
                     text="请选择图片进行预览",
@@ -987,15 +1196,10 @@ class PhotoWatermarkGUI:
             elif os.path.isdir(file_path):
                 folder_paths.append(file_path)
         
-        # 处理文件
-        if image_files:
-            self.add_images(image_files)
-        
-        # 处理文件夹
-        for folder_path in folder_paths:
-            self.add_folder_images(folder_path)
-        
-        if not image_files and not folder_paths:
+        # 文件与文件夹在同一个后台导入任务中处理
+        if image_files or folder_paths:
+            self.start_import(image_files + folder_paths)
+        else:
             messagebox.showinfo("提示", "未找到支持的图片文件或文件夹")
     
     def on_image_select(self, event):
@@ -1011,7 +1215,12 @@ class PhotoWatermarkGUI:
                     self.update_preview()
     
     def update_preview(self):
-        """更新预览显示"""
+        """
+        更新预览显示
+        
+        预览由两个画布项目组成：底图（代理图）只在图片或预览区域大小变化时重建，
+        水印作为独立的叠加图层，设置变化时只重新渲染并移动这个小图层
+        """
         if self.current_preview_index is None or self.current_preview_index >= len(self.image_items):
             return
         
@@ -1028,42 +1237,12 @@ class PhotoWatermarkGUI:
             if settings is None:
                 return
             
-            # 创建临时水印处理器
-            from src.watermark_processor import WatermarkProcessor, WatermarkPosition
-            temp_processor = WatermarkProcessor()
-            
-            # 处理位置参数
-            position = self.get_position_from_string(str(settings['position']))
-            
-            # 安全地获取参数值
-            font_size = self.safe_int(settings['font_size'])
-            opacity = self.safe_float(settings['opacity'])
-            image_watermark_scale = self.safe_float(settings['image_watermark_scale'])
-            
-            # 确保font_style是字典类型
-            font_style = settings['font_style']
-            if not isinstance(font_style, dict):
-                font_style = {'bold': False, 'italic': False}
-            
-            # 生成带水印的预览图片
-            preview_image = temp_processor.add_watermark(
-                image_path=image_item.file_path,
-                date_text=image_item.date_text,
-                font_size=font_size,
-                color=str(settings['color']),
-                position=position,
-                font_path=str(settings['font_path']) if settings['font_path'] else None,
-                opacity=opacity,
-                custom_text=str(settings['custom_text']) if settings['custom_text'] else None,
-                font_style=font_style,
-                shadow=bool(settings['shadow']),
-                stroke=bool(settings['stroke']),
-                image_watermark_path=str(settings['image_watermark_path']) if settings['image_watermark_path'] else None,
-                image_watermark_scale=image_watermark_scale,
-                rotation=self.safe_float(settings.get('rotation', 0.0))  # 新增旋转参数
-            )
+            try:
+                spec = self.build_watermark_spec(settings)
+            except ValueError:
+                return  # 设置正在输入中（如颜色尚未填完整），保留当前预览
             
-            # 调整图片大小以适应预览区域
+            # 预览区域大小
             canvas_width = self.preview_canvas.winfo_width()
             canvas_height = self.preview_canvas.winfo_height()
             
@@ -1073,35 +1252,33 @@ class PhotoWatermarkGUI:
             if canvas_height <= 1:
                 canvas_height = 300
             
-            # 计算缩放比例
-            img_width, img_height = preview_image.size
-            scale_x = canvas_width / img_width
-            scale_y = canvas_height / img_height
-            scale = min(scale_x, scale_y, 1.0)  # 不放大图片
-            
-            # 如果图片比预览区域小，不进行缩放
-            if scale >= 1.0:
-                scale = 1.0
-            
-            # 调整图片大小
-            new_width = int(img_width * scale)
-            new_height = int(img_height * scale)
-            if scale != 1.0:
-                preview_image = preview_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            # 清除画布
-            self.preview_canvas.delete("all")
-            
-            # 将PIL图像转换为Tkinter PhotoImage
-            self.preview_photo = ImageTk.PhotoImage(preview_image)
+            # 获取按预览区域大小解码的代理图（不放大图片），缓存命中时无需重新解码原图
+            proxy, layout_scale = self.preview_cache.get(image_item.file_path, (canvas_width, canvas_height))
             
             # 在画布中心显示图片
-            x = (canvas_width - new_width) // 2
-            y = (canvas_height - new_height) // 2
-            self.preview_canvas.create_image(x, y, anchor=tk.NW, image=self.preview_photo)
+            base_x = (canvas_width - proxy.width) // 2
+            base_y = (canvas_height - proxy.height) // 2
             
-            # 更新画布滚动区域
-            self.preview_canvas.configure(scrollregion=self.preview_canvas.bbox("all"))
+            # 底图：图片或预览区域变化时才重建
+            base_key = (image_item.file_path, canvas_width, canvas_height, id(proxy))
+            if base_key != self._preview_base_key:
+                self.preview_canvas.delete("all")
+                self.watermark_canvas_item = None
+                
+                # 将PIL图像转换为Tkinter PhotoImage
+                self.preview_photo = ImageTk.PhotoImage(proxy)
+                self.preview_canvas.create_image(base_x, base_y, anchor=tk.NW,
+                                                 image=self.preview_photo, tags="preview_base")
+                self._preview_base_key = base_key
+                
+                # 更新画布滚动区域
+                self.preview_canvas.configure(scrollregion=self.preview_canvas.bbox("all"))
+            
+            # 水印图层：按代理图的缩放系数渲染水印（不修改底图）
+            sprite, (x, y) = self.watermark_processor.render_watermark_sprite(
+                proxy.size, image_item.date_text, layout_scale=layout_scale, spec=spec
+            )
+            self.update_watermark_overlay(sprite, (x, y), proxy.size, (base_x, base_y))
             
         except Exception as e:
             import traceback
@@ -1109,6 +1286,8 @@ class PhotoWatermarkGUI:
             print(traceback.format_exc())
             # 显示错误信息
             self.preview_canvas.delete("all")
+            self._preview_base_key = None
+            self.watermark_canvas_item = None
             self.preview_canvas.create_text(
                 self.preview_canvas.winfo_width() // 2,
                 self.preview_canvas.winfo_height() // 2,
@@ -1116,6 +1295,80 @@ class PhotoWatermarkGUI:
                 fill="red"
             )
     
+    def update_watermark_overlay(self, sprite, position, image_size, base_origin):
+        """
+        更新预览中的水印叠加图层
+        
+        Args:
+            sprite: RGBA水印图像（只读）
+            position: 水印左上角在代理图中的坐标
+            image_size: 代理图尺寸，超出图片的部分被裁掉
+            base_origin: 代理图左上角在画布中的坐标
+        """
+        x, y = position
+        box = (max(0, x), max(0, y),
+               min(image_size[0], x + sprite.width), min(image_size[1], y + sprite.height))
+        if box[0] >= box[2] or box[1] >= box[3]:
+            # 水印完全位于图片之外
+            if self.watermark_canvas_item is not None:
+                self.preview_canvas.delete(self.watermark_canvas_item)
+                self.watermark_canvas_item = None
+            return
+        if box != (x, y, x + sprite.width, y + sprite.height):
+            sprite = sprite.crop((box[0] - x, box[1] - y, box[2] - x, box[3] - y))
+        
+        # 拖拽到自定义位置后保持在该位置
+        if self.position_var.get() == 'custom' and self.watermark_position is not None:
+            canvas_x, canvas_y = self.watermark_position
+        else:
+            canvas_x, canvas_y = base_origin[0] + box[0], base_origin[1] + box[1]
+        
+        self.watermark_photo = ImageTk.PhotoImage(sprite)
+        if self.watermark_canvas_item is None:
+            self.watermark_canvas_item = self.preview_canvas.create_image(
+                canvas_x, canvas_y, anchor=tk.NW, image=self.watermark_photo, tags="watermark")
+        else:
+            self.preview_canvas.itemconfigure(self.watermark_canvas_item, image=self.watermark_photo)
+            self.preview_canvas.coords(self.watermark_canvas_item, canvas_x, canvas_y)
+    
+    def build_watermark_spec(self, settings) -> WatermarkSpec:
+        """
+        由界面设置创建水印设置对象
+        
+        Raises:
+            ValueError: 设置不合法时
+        """
+        font_style = settings['font_style']
+        if not isinstance(font_style, dict):
+            font_style = {'bold': False, 'italic': False}
+        resize_mode = str(settings['resize_mode'])
+        return WatermarkSpec(
+            font_size=self.safe_int(settings['font_size']),
+            color=str(settings['color']),
+            position=self.get_position_from_string(str(settings['position'])),
+            font_path=str(settings['font_path']) if settings['font_path'] else None,
+            opacity=self.safe_float(settings['opacity']),
+            custom_text=str(settings['custom_text']) if settings['custom_text'] else None,
+            bold=bool(font_style.get('bold')),
+            italic=bool(font_style.get('italic')),
+            shadow=bool(settings['shadow']),
+            stroke=bool(settings['stroke']),
+            image_watermark_path=str(settings['image_watermark_path']) if settings['image_watermark_path'] else None,
+            image_watermark_scale=self.safe_float(settings['image_watermark_scale']),
+            rotation=self.safe_float(settings.get('rotation', 0.0)),  # 新增旋转参数
+            tile_spacing=self.safe_int(settings.get('tile_spacing', 100)),
+            tile_angle=self.safe_float(settings.get('tile_angle', 30.0)),
+            resize_mode=resize_mode,
+            resize_width=self.safe_int(settings['resize_width']) if resize_mode == 'width' else None,
+            resize_height=self.safe_int(settings['resize_height']) if resize_mode == 'height' else None,
+            resize_percent=self.safe_float(settings['resize_percent']) if resize_mode == 'percent' else None,
+            output_format=str(settings['output_format']),
+            quality=self.safe_int(settings['jpeg_quality']),
+            naming_rule=str(settings['naming_rule']),
+            custom_prefix=str(settings['custom_prefix']),
+            custom_suffix=str(settings['custom_suffix']),
+        )
+    
     def safe_int(self, value):
         """安全地转换为整数"""
         try:
@@ -1148,6 +1401,7 @@ class PhotoWatermarkGUI:
             # 新增导出设置
             output_dir = self.output_dir_var.get()
             jpeg_quality = self.jpeg_quality_var.get()
+            jobs = max(1, int(self.jobs_var.get()))
             naming_rule = self.naming_rule_var.get()
             custom_prefix = self.custom_prefix_var.get()
             custom_suffix = self.custom_suffix_var.get()
@@ -1168,6 +1422,8 @@ class PhotoWatermarkGUI:
             image_watermark_scale = self.image_watermark_scale_var.get()
             # 新增旋转设置
             rotation = self.rotation_var.get()
+            tile_spacing = self.tile_spacing_var.get()
+            tile_angle = self.tile_angle_var.get()
             
             return {
                 'font_size': font_size,
@@ -1179,6 +1435,7 @@ class PhotoWatermarkGUI:
                 # 新增导出设置
                 'output_dir': output_dir,
                 'jpeg_quality': jpeg_quality,
+                'jobs': jobs,
                 'naming_rule': naming_rule,
                 'custom_prefix': custom_prefix,
                 'custom_suffix': custom_suffix,
@@ -1195,7 +1452,9 @@ class PhotoWatermarkGUI:
                 'image_watermark_path': image_watermark_path,
                 'image_watermark_scale': image_watermark_scale,
                 # 新增旋转设置
-                'rotation': rotation
+                'rotation': rotation,
+                'tile_spacing': tile_spacing,
+                'tile_angle': tile_angle
             }
         except ValueError as e:
             messagebox.showerror("设置错误", f"设置参数格式错误: {e}")
@@ -1206,6 +1465,8 @@ class PhotoWatermarkGUI:
         if not self.image_items:
             messagebox.showwarning("警告", "请先导入图片文件")
             return
+        if self.export_processor is not None:
+            return  # 已有导出在进行中
         
         settings = self.get_current_settings()
         if settings is None:
@@ -1223,112 +1484,151 @@ class PhotoWatermarkGUI:
             messagebox.showerror("错误", "不能将文件导出到原文件夹，请选择其他目录")
             return
         
-        # 在后台线程中处理图片
-        threading.Thread(target=self.process_images_thread, args=(settings,), daemon=True).start()
+        # 所有图片共用同一组处理参数，只需验证与转换一次
+        try:
+            spec = self.build_watermark_spec(settings)
+        except ValueError as e:
+            messagebox.showerror("设置错误", f"设置参数错误: {e}")
+            return
+        pairs = [(item.file_path, item.date_text) for item in self.image_items]
+        
+        self.export_processor = BatchProcessor(jobs=settings['jobs'])
+        self.export_results = queue.Queue()
+        self._export_total = len(pairs)
+        self._export_done = 0
+        self._export_success = 0
+        self._export_output_dir = output_dir
+        if self.start_button is not None:
+            self.start_button.configure(state=tk.DISABLED)
+        if self.pause_export_button is not None:
+            self.pause_export_button.configure(state=tk.NORMAL, text="暂停")
+        if self.cancel_export_button is not None:
+            self.cancel_export_button.configure(state=tk.NORMAL)
+        if self.export_progress is not None:
+            self.export_progress.configure(maximum=max(1, len(pairs)), value=0)
+        self.update_status(f"正在处理 0/{len(pairs)}...")
+        
+        # 在后台线程中驱动进程池，界面线程定时取出结果
+        threading.Thread(target=self.process_images_thread,
+                         args=(self.export_processor, pairs, output_dir, spec, self.export_results),
+                         daemon=True).start()
+        self.root.after(self.EXPORT_REFRESH_MS, self._poll_export)
     
-    def process_images_thread(self, settings):
-        """在后台线程中处理图片"""
+    # 导出进度刷新间隔（与处理速度无关，大批量导出时不会挤占界面事件队列）
+    EXPORT_REFRESH_MS = 100
+    
+    def process_images_thread(self, processor, pairs, output_dir, spec, results):
+        """在后台线程中通过进程池处理图片，结果放入队列（不直接访问界面）"""
         try:
-            # 使用用户指定的输出目录
-            output_dir = str(settings['output_dir'])
-            
-            success_count = 0
-            total_count = len(self.image_items)
-            
-            for i, item in enumerate(self.image_items):
-                try:
-                    # 更新状态
-                    self.root.after(0, lambda idx=i: self.update_item_status(idx, "处理中"))
-                    self.root.after(0, lambda: self.update_status(f"正在处理 {i+1}/{total_count}: {os.path.basename(item.file_path)}"))
-                    
-                    # 处理图片
-                    position = self.get_position_from_string(settings['position'])
-                    
-                    # 安全地获取参数值
-                    font_size = self.safe_int(settings['font_size'])
-                    opacity = self.safe_float(settings['opacity'])
-                    jpeg_quality = self.safe_int(settings['jpeg_quality'])
-                    resize_width = self.safe_int(settings['resize_width']) if settings['resize_mode'] == 'width' else None
-                    resize_height = self.safe_int(settings['resize_height']) if settings['resize_mode'] == 'height' else None
-                    resize_percent = self.safe_float(settings['resize_percent']) if settings['resize_mode'] == 'percent' else None
-                    image_watermark_scale = self.safe_float(settings['image_watermark_scale'])
-                    
-                    # 确保font_style是字典类型
-                    font_style = settings['font_style']
-                    if not isinstance(font_style, dict):
-                        font_style = {'bold': False, 'italic': False}
-                    
-                    output_path = self.watermark_processor.process_single_image(
-                        image_path=item.file_path,
-                        date_text=item.date_text,
-                        output_dir=output_dir,
-                        font_size=font_size,
-                        color=str(settings['color']),
-                        position=position,
-                        font_path=str(settings['font_path']) if settings['font_path'] else None,
-                        opacity=opacity,
-                        output_format=str(settings['output_format']),
-                        quality=jpeg_quality,
-                        naming_rule=str(settings['naming_rule']),
-                        custom_prefix=str(settings['custom_prefix']),
-                        custom_suffix=str(settings['custom_suffix']),
-                        resize_mode=str(settings['resize_mode']),
-                        resize_width=resize_width,
-                        resize_height=resize_height,
-                        resize_percent=resize_percent,
-                        custom_text=str(settings['custom_text']) if settings['custom_text'] else None,
-                        font_style=font_style,
-                        shadow=bool(settings['shadow']),
-                        stroke=bool(settings['stroke']),
-                        image_watermark_path=str(settings['image_watermark_path']) if settings['image_watermark_path'] else None,
-                        image_watermark_scale=image_watermark_scale,
-                        rotation=self.safe_float(settings.get('rotation', 0.0))  # 新增旋转参数
-                    )
-                    
-                    # 更新成功状态
-                    self.root.after(0, lambda idx=i: self.update_item_status(idx, "已完成"))
-                    success_count += 1
-                    
-                except Exception as e:
-                    # 更新失败状态
-                    self.root.after(0, lambda idx=i, err=str(e): self.update_item_status(idx, f"失败: {err}"))
-            
-            # 完成提示
-            self.root.after(0, lambda: self.update_status(f"处理完成！成功 {success_count}/{total_count} 张，输出目录: {output_dir}"))
-            self.root.after(0, lambda: messagebox.showinfo("完成", f"处理完成！\n成功: {success_count}/{total_count} 张\n输出目录: {output_dir}"))
-            
+            for result in self.watermark_processor.process_batch(pairs, spec, output_dir, runner=processor):
+                results.put(result)
         except Exception as e:
-            self.root.after(0, lambda: messagebox.showerror("错误", f"处理过程中出现错误: {e}"))
-            self.root.after(0, lambda: self.update_status("处理失败"))
+            results.put(e)
+        finally:
+            results.put(None)  # 结束标记
     
-    def update_item_status(self, index, status):
-        """更新指定项目的状态"""
-        if 0 <= index < len(self.image_items):
-            self.image_items[index].status = status
-            # 更新树形控件中对应行的状态
-            if self.image_tree is not None:
-                items = self.image_tree.get_children()
-                if index < len(items):
-                    item_id = items[index]
-                    values = list(self.image_tree.item(item_id)['values'])
-                    values[3] = status  # 状态列
-                    self.image_tree.item(item_id, values=values)
+    def toggle_pause_export(self):
+        """暂停或继续导出"""
+        processor = self.export_processor
+        if processor is None:
+            return
+        if processor.paused:
+            processor.resume()
+            if self.pause_export_button is not None:
+                self.pause_export_button.configure(text="暂停")
+        else:
+            processor.pause()
+            if self.pause_export_button is not None:
+                self.pause_export_button.configure(text="继续")
+    
+    def cancel_export(self):
+        """取消导出，正在处理中的图片完成后停止"""
+        if self.export_processor is not None:
+            self.export_processor.cancel()
+            self.update_status("正在取消处理...")
+    
+    def _poll_export(self):
+        """在界面线程中取出已完成的结果，批量更新列表状态与进度"""
+        processor = self.export_processor
+        results = self.export_results
+        if processor is None or results is None:
+            return
+        
+        finished = False
+        error = None
+        while True:
+            try:
+                result = results.get_nowait()
+            except queue.Empty:
+                break
+            if result is None:
+                finished = True
+                break
+            if isinstance(result, Exception):
+                error = result
+                continue
+            self._export_done += 1
+            if result.success:
+                self._export_success += 1
+                self.update_item_status(result.image_path, "已完成")
+            else:
+                self.update_item_status(result.image_path, f"失败: {result.error}")
+        
+        if self.export_progress is not None:
+            self.export_progress.configure(value=self._export_done)
+        
+        if error is not None:
+            messagebox.showerror("错误", f"处理过程中出现错误: {error}")
+        if not finished:
+            if processor.cancelled:
+                self.update_status(f"正在取消处理，等待进行中的图片完成 {self._export_done}/{self._export_total}...")
+            elif processor.paused:
+                self.update_status(f"已暂停 {self._export_done}/{self._export_total}")
+            else:
+                self.update_status(f"正在处理 {self._export_done}/{self._export_total}...")
+            self.root.after(self.EXPORT_REFRESH_MS, self._poll_export)
+            return
+        
+        self._finish_export(processor, error)
+    
+    def _finish_export(self, processor, error):
+        """导出结束后恢复按钮状态并提示结果"""
+        self.export_processor = None
+        self.export_results = None
+        if self.start_button is not None:
+            self.start_button.configure(state=tk.NORMAL)
+        if self.pause_export_button is not None:
+            self.pause_export_button.configure(state=tk.DISABLED, text="暂停")
+        if self.cancel_export_button is not None:
+            self.cancel_export_button.configure(state=tk.DISABLED)
+        
+        success_count, total_count = self._export_success, self._export_total
+        output_dir = self._export_output_dir
+        if error is not None:
+            self.update_status("处理失败")
+        elif processor.cancelled:
+            self.update_status(f"已取消处理，成功 {success_count}/{total_count} 张，输出目录: {output_dir}")
+        else:
+            self.update_status(f"处理完成！成功 {success_count}/{total_count} 张，输出目录: {output_dir}")
+            messagebox.showinfo("完成", f"处理完成！\n成功: {success_count}/{total_count} 张\n输出目录: {output_dir}")
+    
+    def update_item_status(self, file_path, status):
+        """更新指定图片的状态"""
+        row = self.tree_rows.get(file_path)
+        if row is None:
+            return  # 图片已从列表中移除
+        item_id, item = row
+        item.status = status
+        # 更新树形控件中对应行的状态
+        if self.image_tree is not None:
+            self.image_tree.set(item_id, '状态', status)
     
     def get_position_from_string(self, position_str: str) -> WatermarkPosition:
         """将字符串转换为位置枚举"""
-        position_map = {
-            'top_left': WatermarkPosition.TOP_LEFT,
-            'top_center': WatermarkPosition.TOP_CENTER,
-            'top_right': WatermarkPosition.TOP_RIGHT,
-            'center_left': WatermarkPosition.CENTER_LEFT,
-            'center': WatermarkPosition.CENTER,
-            'center_right': WatermarkPosition.CENTER_RIGHT,
-            'bottom_left': WatermarkPosition.BOTTOM_LEFT,
-            'bottom_center': WatermarkPosition.BOTTOM_CENTER,
-            'bottom_right': WatermarkPosition.BOTTOM_RIGHT
-        }
-        
-        return position_map.get(position_str.lower(), WatermarkPosition.BOTTOM_RIGHT)
+        try:
+            return parse_position(position_str)
+        except ValueError:
+            return WatermarkPosition.BOTTOM_RIGHT
 
 
 def main():
@@ -7,6 +7,7 @@
 import os
 import sys
 import argparse
+import itertools
 from typing import List, Tuple, Optional
 
 # 添加src目录到Python路径（使用相对路径，适配不同环境）
@@ -19,44 +20,32 @@ for path in [current_dir, src_path]:
         sys.path.insert(0, path)
 
 from exif_reader import ExifReader
-from watermark_processor import WatermarkProcessor, WatermarkPosition
+from exif_cache import ExifCache
+from watermark_processor import WatermarkProcessor, WatermarkPosition, Rendition, OutputNameRegistry
+from watermark_spec import WatermarkSpec, parse_position
+from batch_processor import BatchProcessor
+from batch_manifest import BatchManifest, settings_fingerprint
+from batch_journal import BatchJournal
 
 
 class PhotoWatermarkApp:
     """照片水印应用主类"""
     
-    def __init__(self):
-        self.exif_reader = ExifReader()
+    def __init__(self, use_exif_cache: bool = False):
+        """
+        Args:
+            use_exif_cache: 是否使用本地EXIF元数据缓存（与图形界面共用）
+        """
+        cache = ExifCache.open_default() if use_exif_cache else None
+        self.exif_reader = ExifReader(cache=cache)
         self.watermark_processor = WatermarkProcessor()
     
     def get_position_from_string(self, position_str: str) -> WatermarkPosition:
         """将字符串转换为位置枚举"""
-        position_map = {
-            'top_left': WatermarkPosition.TOP_LEFT,
-            'top_center': WatermarkPosition.TOP_CENTER,
-            'top_right': WatermarkPosition.TOP_RIGHT,
-            'center_left': WatermarkPosition.CENTER_LEFT,
-            'center': WatermarkPosition.CENTER,
-            'center_right': WatermarkPosition.CENTER_RIGHT,
-            'bottom_left': WatermarkPosition.BOTTOM_LEFT,
-            'bottom_center': WatermarkPosition.BOTTOM_CENTER,
-            'bottom_right': WatermarkPosition.BOTTOM_RIGHT,
-            '左上': WatermarkPosition.TOP_LEFT,
-            '上中': WatermarkPosition.TOP_CENTER,
-            '右上': WatermarkPosition.TOP_RIGHT,
-            '左中': WatermarkPosition.CENTER_LEFT,
-            '居中': WatermarkPosition.CENTER,
-            '右中': WatermarkPosition.CENTER_RIGHT,
-            '左下': WatermarkPosition.BOTTOM_LEFT,
-            '下中': WatermarkPosition.BOTTOM_CENTER,
-            '右下': WatermarkPosition.BOTTOM_RIGHT
-        }
-        
-        position_str = position_str.lower().strip()
-        if position_str in position_map:
-            return position_map[position_str]
-        else:
-            print(f"警告：未识别的位置 '{position_str}'，使用默认位置 '右下'")
+        try:
+            return parse_position(position_str)
+        except ValueError:
+            print(f"警告：未识别的位置 '{position_str.lower().strip()}'，使用默认位置 '右下'")
             return WatermarkPosition.BOTTOM_RIGHT
     
     def process_images(self, input_path: str, font_size: int = 36, 
@@ -69,8 +58,16 @@ class PhotoWatermarkApp:
                       resize_height: Optional[int] = None, resize_percent: Optional[float] = None,
                       custom_text: Optional[str] = None, bold: bool = False,
                       italic: bool = False, shadow: bool = False, stroke: bool = False,
+                      stroke_width: Optional[int] = None, stroke_color: str = "#000000",
                       image_watermark: Optional[str] = None, image_watermark_scale: float = 1.0,
-                      rotation: float = 0.0) -> None:
+                      rotation: float = 0.0, tile_spacing: int = 100, tile_angle: float = 30.0,
+                      max_memory: Optional[int] = None, jobs: Optional[int] = None,
+                      pipeline: bool = False, io_threads: int = 2,
+                      renditions: Optional[List[Rendition]] = None,
+                      force: bool = False, use_hash: bool = False,
+                      resume: bool = False, recursive: bool = False,
+                      include: Optional[List[str]] = None, exclude: Optional[List[str]] = None,
+                      max_depth: Optional[int] = None) -> None:
         """处理图片添加水印"""
         
         print(f"开始处理路径: {input_path}")
@@ -78,12 +75,19 @@ class PhotoWatermarkApp:
         
         if output_dir:
             print(f"输出目录: {output_dir}")
+        if position_str.lower().strip() in ('tile', '平铺'):
+            print(f"平铺水印: 间距={tile_spacing}, 角度={tile_angle}")
+        if max_memory:
+            print(f"内存上限: 每个进程 {max_memory} MB（大图按水平条带处理）")
         if jpeg_quality != 95:
             print(f"JPEG质量: {jpeg_quality}")
         if naming_rule != "suffix":
             print(f"命名规则: {naming_rule}")
         if resize_mode != "none":
             print(f"尺寸调整: {resize_mode}")
+        if renditions:
+            sizes = ", ".join(str(r.size) if r.size else "full" for r in renditions)
+            print(f"多尺寸导出: {sizes}")
         
         # 验证输入路径
         if not os.path.exists(input_path):
@@ -93,16 +97,6 @@ class PhotoWatermarkApp:
         position = self.get_position_from_string(position_str)
         
         try:
-            # 读取图片和日期信息
-            print("正在读取图片EXIF信息...")
-            image_date_pairs = self.exif_reader.process_images(input_path)
-            
-            if not image_date_pairs:
-                print("未找到任何支持的图片文件")
-                return
-            
-            print(f"找到 {len(image_date_pairs)} 个图片文件")
-            
             # 创建输出目录
             if output_dir:
                 # 使用用户指定的输出目录
@@ -111,62 +105,137 @@ class PhotoWatermarkApp:
                     sys.exit(1)
                 final_output_dir = output_dir
             else:
-                # 使用默认输出目录
-                final_output_dir = self.watermark_processor.create_output_directory(input_path)
+                # 使用默认输出目录（找到图片后才创建）
+                final_output_dir = self.watermark_processor.default_output_directory(input_path)
             print(f"输出目录: {output_dir}")
             
+            # 水印与输出设置（所有图片共用，只验证与转换一次）
+            spec = WatermarkSpec(
+                font_size=font_size,
+                color=color,
+                position=position,
+                font_path=font_path,
+                opacity=opacity,
+                output_format=output_format,
+                quality=jpeg_quality,
+                naming_rule=naming_rule,
+                custom_prefix=custom_prefix,
+                custom_suffix=custom_suffix,
+                resize_mode=resize_mode,
+                resize_width=resize_width,
+                resize_height=resize_height,
+                resize_percent=resize_percent,
+                custom_text=custom_text,
+                bold=bold,
+                italic=italic,
+                shadow=shadow,
+                stroke=stroke,
+                stroke_width=stroke_width,
+                stroke_color=stroke_color,
+                image_watermark_path=image_watermark,
+                image_watermark_scale=image_watermark_scale,
+                rotation=rotation,
+                tile_spacing=tile_spacing,
+                tile_angle=tile_angle,
+                max_memory=max_memory
+            )
+            fingerprint_options = spec.to_options()
+            del fingerprint_options['max_memory']  # 内存上限不影响输出结果
+            if position is not WatermarkPosition.TILE:
+                # 平铺设置只在平铺模式下生效，不影响其余模式已有的处理记录
+                del fingerprint_options['tile_spacing'], fingerprint_options['tile_angle']
+            if renditions:
+                fingerprint_options['renditions'] = renditions
+            
+            fingerprint = settings_fingerprint(fingerprint_options)
+            
+            # 流式读取图片和日期信息（递归扫描时跳过位于输入目录内的输出目录），
+            # 扫描与处理同时进行，无需等待整个目录扫描完成
+            print("正在扫描图片并读取EXIF信息...")
+            image_date_pairs = iter(self.exif_reader.iter_images(
+                input_path, recursive=recursive, include=include, exclude=exclude,
+                max_depth=max_depth, exclude_dirs=[final_output_dir]
+            ))
+            # 找到第一张图片后才创建输出目录中的清单与日志，没有图片时不留下空目录
+            first_pair = next(image_date_pairs, None)
+            if first_pair is None:
+                print("未找到任何支持的图片文件")
+                return
+            image_date_pairs = itertools.chain([first_pair], image_date_pairs)
+            
+            # 增量处理：跳过源文件与设置均未变化的图片
+            manifest = BatchManifest(final_output_dir, use_hash=use_hash)
+            
+            # 作业日志：逐条记录已完成的图片，中断后可用 --resume 继续
+            journal = BatchJournal(final_output_dir, fingerprint, resume=resume)
+            
+            skipped = {'resumed': 0, 'unchanged': 0}
+            # 跳过的图片保留已有的输出文件名，本次处理的重名图片不会覆盖它们；
+            # 输出目录中不属于任何已记录图片的文件也不会被覆盖
+            names = OutputNameRegistry()
+            
+            def pending_pairs():
+                for image_path, date_text in image_date_pairs:
+                    entry = journal.completed_entry(image_path) if resume else None
+                    if entry and entry['date'] == date_text and journal.is_done(image_path):
+                        manifest.record(image_path, date_text, fingerprint, entry['outputs'])
+                        for output_path in entry['outputs']:
+                            names.reserve(output_path, image_path)
+                        skipped['resumed'] += 1
+                    elif not force and manifest.is_up_to_date(image_path, date_text, fingerprint):
+                        for output_path in manifest.recorded_outputs(image_path):
+                            names.reserve(output_path, image_path)
+                        skipped['unchanged'] += 1
+                    else:
+                        # 重新处理的图片覆盖自己上次的输出，不因文件已存在而另起序号
+                        for output_path in manifest.recorded_outputs(image_path):
+                            names.reserve(output_path, image_path)
+                        yield image_path, date_text
+            
             # 处理每张图片
             success_count = 0
             failed_count = 0
-            total_count = len(image_date_pairs)
             
-            for idx, (image_path, date_text) in enumerate(image_date_pairs, 1):
-                try:
-                    print(f"[{idx}/{total_count}] 处理图片: {os.path.basename(image_path)}, 日期: {date_text}")
-                    
-                    # 准备字体样式参数
-                    font_style = {}
-                    if bold:
-                        font_style['bold'] = True
-                    if italic:
-                        font_style['italic'] = True
-                    
-                    output_path = self.watermark_processor.process_single_image(
-                        image_path=image_path,
-                        date_text=date_text,
-                        output_dir=final_output_dir,
-                        font_size=font_size,
-                        color=color,
-                        position=position,
-                        font_path=font_path,
-                        opacity=opacity,
-                        output_format=output_format,
-                        quality=jpeg_quality,
-                        naming_rule=naming_rule,
-                        custom_prefix=custom_prefix,
-                        custom_suffix=custom_suffix,
-                        resize_mode=resize_mode,
-                        resize_width=resize_width,
-                        resize_height=resize_height,
-                        resize_percent=resize_percent,
-                        custom_text=custom_text,
-                        font_style=font_style if font_style else None,
-                        shadow=shadow,
-                        stroke=stroke,
-                        image_watermark_path=image_watermark,
-                        image_watermark_scale=image_watermark_scale,
-                        rotation=rotation  # 新增旋转参数
-                    )
-                    
-                    print(f"  ✅ 已保存: {os.path.basename(output_path)}")
-                    success_count += 1
-                    
-                except Exception as e:
-                    print(f"  ❌ 处理失败: {e}")
-                    failed_count += 1
+            batch_processor = BatchProcessor(jobs=jobs, io_threads=io_threads)
+            # 递归处理时在输出目录中保留子目录结构
+            source_root = input_path if recursive and os.path.isdir(input_path) else None
+            if pipeline:
+                print(f"流水线处理: {batch_processor.jobs} 个进程, 读取线程 {batch_processor.io_threads} 个")
+            elif batch_processor.jobs > 1:
+                print(f"并行处理: {batch_processor.jobs} 个进程")
+            results = self.watermark_processor.process_batch(
+                pending_pairs(), spec, final_output_dir, source_root=source_root,
+                renditions=renditions, runner=batch_processor, names=names, pipeline=pipeline
+            )
+            
+            completed = False
+            try:
+                for result in results:
+                    print(f"[{result.index}] 处理图片: {os.path.basename(result.image_path)}, 日期: {result.date_text}")
+                    if result.success:
+                        saved = ", ".join(os.path.basename(path) for path in result.output_paths)
+                        print(f"  ✅ 已保存: {saved}")
+                        journal.record(result.image_path, result.date_text, result.output_paths)
+                        manifest.record(result.image_path, result.date_text, fingerprint, result.output_paths)
+                        success_count += 1
+                    else:
+                        print(f"  ❌ 处理失败: {result.error}")
+                        manifest.forget(result.image_path)
+                        failed_count += 1
+                completed = True
+            finally:
+                manifest.save()
+                # 作业全部完成后删除日志；中断时保留，供 --resume 使用
+                journal.close(remove=completed)
+            
+            total_count = success_count + failed_count
             
             print(f"\n🎉 处理完成！")
             print(f"📊 统计: 总计 {total_count} 张图片，成功 {success_count} 张，失败 {failed_count} 张")
+            if skipped['resumed']:
+                print(f"⏭️  从中断处继续：跳过上次作业已完成的图片 {skipped['resumed']} 张")
+            if skipped['unchanged']:
+                print(f"⏭️  跳过未变化的图片 {skipped['unchanged']} 张（使用 --force 强制重新处理）")
             if success_count > 0:
                 print(f"💾 水印图片保存在: {final_output_dir}")
             if failed_count > 0:
@@ -219,7 +288,7 @@ def create_parser() -> argparse.ArgumentParser:
         "--position", "-p",
         type=str,
         default="bottom_right",
-        help="水印位置 (默认: bottom_right)"
+        help="水印位置，tile 表示在整张图片上错位平铺 (默认: bottom_right)"
     )
     
     parser.add_argument(
@@ -341,6 +410,20 @@ def create_parser() -> argparse.ArgumentParser:
         help="添加描边效果"
     )
     
+    parser.add_argument(
+        "--stroke-width", "-sw",
+        type=int,
+        default=None,
+        help="描边宽度像素 (默认: 字体大小的1/30，至少为1)"
+    )
+    
+    parser.add_argument(
+        "--stroke-color", "-sc",
+        type=str,
+        default="#000000",
+        help="描边颜色，十六进制格式 (默认: #000000 黑色)"
+    )
+    
     # 新增图片水印参数
     parser.add_argument(
         "--image-watermark", "-iw",
@@ -364,6 +447,113 @@ def create_parser() -> argparse.ArgumentParser:
         help="水印旋转角度 -180.0到180.0度 (默认: 0.0)"
     )
     
+    # 平铺水印参数
+    parser.add_argument(
+        "--tile-spacing", "-ts",
+        type=int,
+        default=100,
+        help="平铺模式下相邻水印之间的间距（像素） (默认: 100)"
+    )
+    
+    parser.add_argument(
+        "--tile-angle", "-ta",
+        type=float,
+        default=30.0,
+        help="平铺模式下每个水印的旋转角度 -180.0到180.0度 (默认: 30.0)"
+    )
+    
+    # 多尺寸导出参数
+    parser.add_argument(
+        "--renditions", "-rd",
+        type=str,
+        default=None,
+        help="一次解码导出多个尺寸，逗号分隔的 尺寸[:质量[:后缀]]，尺寸为长边像素或 full，"
+             "例如 \"2400:90,1200,400:80,full\" (与 --resize-mode 互斥)"
+    )
+    
+    # 扫描参数
+    parser.add_argument(
+        "--recursive", "-R",
+        action="store_true",
+        help="递归处理子目录中的图片，输出时保留子目录结构"
+    )
+    
+    parser.add_argument(
+        "--include",
+        action="append",
+        metavar="PATTERN",
+        help="只处理匹配通配符的图片（匹配相对路径或文件名，可多次指定），如 \"2023/*/*.jpg\""
+    )
+    
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        metavar="PATTERN",
+        help="排除匹配通配符的文件或目录（匹配相对路径或文件名，可多次指定），如 \"*_raw\""
+    )
+    
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        help="递归扫描的最大子目录深度（0 表示只处理顶层目录）"
+    )
+    
+    parser.add_argument(
+        "--no-exif-cache",
+        action="store_true",
+        help="不使用本地EXIF元数据缓存，每次都重新读取图片的EXIF信息"
+    )
+    
+    # 增量处理参数
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="忽略输出目录中的处理清单，重新处理所有图片"
+    )
+    
+    parser.add_argument(
+        "--hash",
+        action="store_true",
+        dest="use_hash",
+        help="在清单中记录源文件内容哈希，修改时间变化但内容未变的图片仍会被跳过"
+    )
+    
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="继续上次被中断的作业，跳过作业日志中已完成的图片"
+    )
+    
+    # 并行处理参数
+    parser.add_argument(
+        "--jobs", "-j",
+        type=int,
+        default=None,
+        help="并行处理的进程数 (默认: CPU核心数，1 表示串行处理)"
+    )
+    
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="使用读取线程预取图片文件的流水线处理，适合网络共享等高延迟存储"
+    )
+    
+    parser.add_argument(
+        "--io-threads",
+        type=int,
+        default=2,
+        help="流水线模式下的读取线程数 (默认: 2)"
+    )
+    
+    parser.add_argument(
+        "--max-memory",
+        type=int,
+        default=None,
+        metavar="MB",
+        help="每个进程处理单张图片的内存上限（MB），设置后大图按水平条带处理；"
+             "原图仍需整帧解码，解码所需内存超过上限的图片记为失败 (默认: 不限制)"
+    )
+    
     return parser
 
 
@@ -394,6 +584,14 @@ def main():
         print("错误：颜色格式错误，请使用 #RRGGBB 格式（如 #FFFFFF）")
         sys.exit(1)
     
+    if not args.stroke_color.startswith('#') or len(args.stroke_color) != 7:
+        print("错误：描边颜色格式错误，请使用 #RRGGBB 格式（如 #000000）")
+        sys.exit(1)
+    
+    if args.stroke_width is not None and args.stroke_width < 1:
+        print("错误：描边宽度必须大于等于 1")
+        sys.exit(1)
+    
     # 验证字体文件
     if args.font_path and not os.path.exists(args.font_path):
         print(f"错误：字体文件不存在: {args.font_path}")
@@ -414,8 +612,49 @@ def main():
         print("错误：旋转角度必须在 -180.0 到 180.0 之间")
         sys.exit(1)
     
+    # 验证平铺参数
+    if args.tile_spacing < 0:
+        print("错误：平铺间距不能为负数")
+        sys.exit(1)
+    if not (-180.0 <= args.tile_angle <= 180.0):
+        print("错误：平铺角度必须在 -180.0 到 180.0 之间")
+        sys.exit(1)
+    
+    # 验证并行进程数
+    if args.jobs is not None and args.jobs < 1:
+        print("错误：并行进程数必须大于等于 1")
+        sys.exit(1)
+    
+    if args.io_threads < 1:
+        print("错误：读取线程数必须大于等于 1")
+        sys.exit(1)
+    
+    # 验证多尺寸导出参数
+    renditions = None
+    if args.renditions:
+        try:
+            renditions = Rendition.parse_list(args.renditions)
+        except ValueError as e:
+            print(f"错误：{e}")
+            sys.exit(1)
+        if args.resize_mode != "none":
+            print("错误：--renditions 不能与 --resize-mode 同时使用")
+            sys.exit(1)
+    
+    if args.max_memory is not None:
+        if args.max_memory < 1:
+            print("错误：--max-memory 必须大于 0")
+            sys.exit(1)
+        if renditions:
+            print("错误：--max-memory 暂不支持多尺寸导出 (--renditions)")
+            sys.exit(1)
+    
+    if args.max_depth is not None and args.max_depth < 0:
+        print("错误：--max-depth 不能为负数")
+        sys.exit(1)
+    
     # 创建应用实例并处理图片
-    app = PhotoWatermarkApp()
+    app = PhotoWatermarkApp(use_exif_cache=not args.no_exif_cache)
     
     try:
         app.process_images(
@@ -440,9 +679,25 @@ def main():
             italic=args.italic,
             shadow=args.shadow,
             stroke=args.stroke,
+            stroke_width=args.stroke_width,
+            stroke_color=args.stroke_color,
             image_watermark=args.image_watermark,
             image_watermark_scale=args.image_watermark_scale,
-            rotation=args.rotation  # 新增旋转参数
+            rotation=args.rotation,  # 新增旋转参数
+            tile_spacing=args.tile_spacing,
+            tile_angle=args.tile_angle,
+            max_memory=args.max_memory,
+            jobs=args.jobs,
+            pipeline=args.pipeline,
+            io_threads=args.io_threads,
+            renditions=renditions,
+            force=args.force,
+            use_hash=args.use_hash,
+            resume=args.resume,
+            recursive=args.recursive,
+            include=args.include,
+            exclude=args.exclude,
+            max_depth=args.max_depth
         )
     except KeyboardInterrupt:
         print("\n用户中断操作")
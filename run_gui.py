@@ -16,17 +16,18 @@ os.chdir(script_dir)
 if script_dir not in sys.path:
     sys.path.insert(0, script_dir)
 
-# 导入并运行GUI应用
-try:
-    from gui_app import main
-    print("🚀 启动照片水印GUI应用...")
-    print(f"📁 工作目录: {os.getcwd()}")
-    print(f"🐍 Python版本: {sys.version}")
-    main()
-except ImportError as e:
-    print(f"❌ 导入失败: {e}")
-    print("请确保安装了所有依赖：pip install -r requirements.txt")
-    sys.exit(1)
-except Exception as e:
-    print(f"❌ 运行失败: {e}")
-    sys.exit(1)
\ No newline at end of file
+# 导入并运行GUI应用（工作进程以 spawn/forkserver 方式启动时会重新导入本脚本，不能再次启动界面）
+if __name__ == "__main__":
+    try:
+        from gui_app import main
+        print("🚀 启动照片水印GUI应用...")
+        print(f"📁 工作目录: {os.getcwd()}")
+        print(f"🐍 Python版本: {sys.version}")
+        main()
+    except ImportError as e:
+        print(f"❌ 导入失败: {e}")
+        print("请确保安装了所有依赖：pip install -r requirements.txt")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ 运行失败: {e}")
+        sys.exit(1)
\ No newline at end of file
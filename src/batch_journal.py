@@ -0,0 +1,104 @@
+"""
+批处理作业日志模块
+以仅追加的JSON Lines文件逐条记录已完成的图片，每条记录写入后立即落盘，
+进程被强制终止后可通过 --resume 从中断处继续
+"""
+
+import json
+import os
+from typing import Dict, List, Optional
+
+
+class BatchJournal:
+    """输出目录中的作业日志（仅追加）"""
+
+    FILENAME = ".watermark_journal.jsonl"
+
+    def __init__(self, output_dir: str, fingerprint: str, resume: bool = False):
+        """
+        Args:
+            output_dir: 输出目录
+            fingerprint: 当前作业的水印设置指纹
+            resume: 是否继续上次未完成的作业；否则开始新的日志
+        """
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, self.FILENAME)
+        self.fingerprint = fingerprint
+        self.completed: Dict[str, dict] = {}
+        self._file = None
+
+        if resume:
+            self._load()
+        self._open(append=resume and os.path.exists(self.path))
+
+    def _load(self) -> None:
+        """读取上次作业的日志，截掉进程被终止时写了一半的末行"""
+        try:
+            with open(self.path, 'rb+') as f:
+                data = f.read()
+                complete = data.rfind(b'\n') + 1
+                if complete < len(data):
+                    # 之后的记录追加在文件末尾，不截掉的话会与半行拼在一起
+                    f.truncate(complete)
+        except OSError:
+            return
+
+        for line in data[:complete].decode('utf-8').splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get('type') == 'job':
+                if entry.get('fingerprint') != self.fingerprint:
+                    raise ValueError("上次作业的水印设置与当前设置不一致，无法继续，请去掉 --resume 重新处理")
+            elif entry.get('type') == 'done':
+                self.completed[entry['source']] = entry
+
+    def _open(self, append: bool) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._file = open(self.path, 'a' if append else 'w', encoding='utf-8')
+        if not append:
+            self._write({'type': 'job', 'fingerprint': self.fingerprint})
+
+    def _write(self, entry: dict) -> None:
+        """写入一行记录并立即落盘"""
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def is_done(self, image_path: str) -> bool:
+        """判断图片在上次作业中是否已完成（且输出文件仍然存在）"""
+        entry = self.completed.get(os.path.abspath(image_path))
+        return bool(entry and entry['outputs'] and all(os.path.exists(p) for p in entry['outputs']))
+
+    def completed_entry(self, image_path: str) -> Optional[dict]:
+        """返回图片在上次作业中的完成记录"""
+        return self.completed.get(os.path.abspath(image_path))
+
+    def record(self, image_path: str, date_text: str, output_paths: List[str]) -> None:
+        """记录一张已完成的图片（输出文件已完整写入后调用）"""
+        source = os.path.abspath(image_path)
+        entry = {
+            'type': 'done',
+            'source': source,
+            'date': date_text,
+            'outputs': [os.path.abspath(p) for p in output_paths],
+        }
+        self._write(entry)
+        self.completed[source] = entry
+
+    def close(self, remove: bool = False) -> None:
+        """
+        关闭日志
+
+        Args:
+            remove: 作业已全部完成时删除日志文件
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if remove:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
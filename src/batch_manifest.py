@@ -0,0 +1,160 @@
+"""
+批处理清单模块
+在输出目录中记录每张源图片的签名与水印设置指纹，
+再次运行时跳过源文件与设置均未变化的图片
+"""
+
+import hashlib
+import json
+import os
+import threading
+from enum import Enum
+from typing import Dict, List, Optional
+
+
+def _to_jsonable(value):
+    """将设置中的枚举、对象等转换为可稳定序列化的形式"""
+    if isinstance(value, Enum):
+        return value.value
+    if hasattr(value, '__dict__'):
+        return vars(value)
+    return str(value)
+
+
+def file_content_hash(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """计算文件内容的SHA-256摘要"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def settings_fingerprint(options: dict) -> str:
+    """
+    计算水印设置指纹
+
+    除设置本身外，还包含字体文件与图片水印文件的大小和修改时间，
+    这些文件被替换后同样需要重新处理。
+    """
+    payload = dict(options)
+    for key in ('font_path', 'image_watermark_path'):
+        path = options.get(key)
+        if path and os.path.isfile(path):
+            stat = os.stat(path)
+            payload[key + '_stat'] = [stat.st_size, stat.st_mtime_ns]
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=_to_jsonable)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+class BatchManifest:
+    """输出目录中的批处理清单（可在多个线程中使用）"""
+
+    FILENAME = ".watermark_manifest.json"
+    VERSION = 1
+
+    def __init__(self, output_dir: str, use_hash: bool = False, autosave_interval: int = 100):
+        """
+        Args:
+            output_dir: 输出目录
+            use_hash: 是否额外记录并比较源文件内容哈希（修改时间变化但内容未变时仍可跳过）
+            autosave_interval: 每记录多少条结果自动保存一次清单
+        """
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, self.FILENAME)
+        self.use_hash = use_hash
+        self.autosave_interval = max(1, autosave_interval)
+        self.entries: Dict[str, dict] = {}
+        self._unsaved = 0
+        self._lock = threading.RLock()
+        self.load()
+
+    def load(self) -> None:
+        """读取清单，文件不存在或损坏时视为空清单"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                self.entries = data.get('entries', {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self) -> None:
+        """写入清单（先写临时文件再原子替换）"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with self._lock:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': self.VERSION, 'entries': self.entries}, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+            self._unsaved = 0
+
+    @staticmethod
+    def _key(image_path: str) -> str:
+        return os.path.abspath(image_path)
+
+    def is_up_to_date(self, image_path: str, date_text: str, fingerprint: str) -> bool:
+        """判断源图片的输出是否仍然有效（源文件、日期与设置均未变化且输出文件存在）"""
+        entry = self.entries.get(self._key(image_path))
+        if not entry:
+            return False
+        if entry.get('fingerprint') != fingerprint or entry.get('date') != date_text:
+            return False
+        if not entry.get('outputs') or not all(os.path.exists(p) for p in entry['outputs']):
+            return False
+
+        try:
+            stat = os.stat(image_path)
+        except OSError:
+            return False
+        if stat.st_size != entry.get('size'):
+            return False
+        if stat.st_mtime_ns == entry.get('mtime_ns'):
+            return True
+
+        # 修改时间变化（如复制或touch）时，按内容哈希判断
+        if self.use_hash and entry.get('sha256'):
+            try:
+                if file_content_hash(image_path) == entry['sha256']:
+                    with self._lock:
+                        entry['mtime_ns'] = stat.st_mtime_ns
+                        self._unsaved += 1
+                    return True
+            except OSError:
+                pass
+        return False
+
+    def recorded_outputs(self, image_path: str) -> List[str]:
+        """已记录的源图片输出文件路径"""
+        entry = self.entries.get(self._key(image_path))
+        return list(entry.get('outputs', [])) if entry else []
+
+    def record(self, image_path: str, date_text: str, fingerprint: str,
+               output_paths: List[str]) -> None:
+        """记录一张成功处理的图片"""
+        try:
+            stat = os.stat(image_path)
+        except OSError:
+            return
+        entry = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'date': date_text,
+            'fingerprint': fingerprint,
+            'outputs': [os.path.abspath(p) for p in output_paths],
+        }
+        if self.use_hash:
+            try:
+                entry['sha256'] = file_content_hash(image_path)
+            except OSError:
+                pass
+        with self._lock:
+            self.entries[self._key(image_path)] = entry
+            self._unsaved += 1
+            if self._unsaved >= self.autosave_interval:
+                self.save()
+
+    def forget(self, image_path: str) -> Optional[dict]:
+        """移除一张图片的记录（如处理失败时）"""
+        with self._lock:
+            return self.entries.pop(self._key(image_path), None)
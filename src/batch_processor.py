@@ -0,0 +1,316 @@
+"""
+批量处理模块
+将逐张图片的水印处理分发到多个进程并行执行，
+并提供预取文件数据的 读取 → 处理 流水线执行器
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import takewhile
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from watermark_processor import BatchResult, OutputNameRegistry, WatermarkProcessor, item_output_dir
+    from watermark_spec import WatermarkSpec
+except ImportError:  # 以 src 包的方式导入时
+    from .watermark_processor import BatchResult, OutputNameRegistry, WatermarkProcessor, item_output_dir
+    from .watermark_spec import WatermarkSpec
+
+
+def _pool_context():
+    """
+    工作进程的启动方式：使用 forkserver（不支持时为 spawn），不使用 fork
+
+    创建进程池时父进程中往往有其他线程在运行（图形界面、缩略图与导入线程、流水线的
+    读写线程）并持有锁或打开的 SQLite 连接，fork 多线程进程可能使子进程死锁在继承的锁上。
+    工作进程的状态只来自可序列化的 WatermarkSpec，重新启动的进程不会丢失任何设置。
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+# 工作进程内复用的处理器实例
+_worker_processor: Optional[WatermarkProcessor] = None
+
+
+def _init_worker():
+    """工作进程初始化：每个进程只创建一次处理器"""
+    global _worker_processor
+    _worker_processor = WatermarkProcessor()
+
+
+def _process_task(index: int, image_path: str, date_text: str, output_dir: str,
+                  spec: WatermarkSpec, renditions: Optional[list],
+                  output_filenames: List[str], image_data: Optional[bytes] = None) -> BatchResult:
+    """处理单个工作单元，异常被捕获并记录在结果中"""
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = WatermarkProcessor()
+    return _worker_processor.process_item(index, image_path, date_text, output_dir, spec,
+                                          renditions, output_filenames, image_data)
+
+
+# 流水线各阶段之间传递的结束标记
+_STAGE_DONE = object()
+
+
+class BatchProcessor:
+    """
+    批量水印处理器（进程池后端）
+
+    可在其他线程中调用 pause()/resume() 暂停提交新任务，cancel() 取消尚未开始的任务；
+    已在处理中的图片总会完成（暂停期间照常产出结果），被取消的图片不会产出结果。
+    """
+
+    def __init__(self, jobs: Optional[int] = None, window: Optional[int] = None,
+                 io_threads: int = 2):
+        """
+        Args:
+            jobs: 工作进程数，默认为CPU核心数；为1时在当前进程内串行处理
+            window: 同时在途的任务数上限，默认为进程数的4倍
+            io_threads: 流水线模式下的读取线程数
+        """
+        self.jobs = max(1, jobs or os.cpu_count() or 1)
+        self.window = max(self.jobs, window or self.jobs * 4)
+        self.io_threads = max(1, io_threads)
+        self._processor = WatermarkProcessor()
+        self._cancel_event = threading.Event()
+        self._resume_event = threading.Event()  # 未暂停时为已设置状态
+        self._resume_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._resume_event.is_set()
+
+    def cancel(self) -> None:
+        """取消尚未开始处理的图片（同时解除暂停）"""
+        self._cancel_event.set()
+        self._resume_event.set()
+
+    def pause(self) -> None:
+        """暂停提交新的图片，处理中的图片继续完成"""
+        if not self.cancelled:
+            self._resume_event.clear()
+
+    def resume(self) -> None:
+        """继续处理"""
+        self._resume_event.set()
+
+    def _wait_until_runnable(self) -> bool:
+        """暂停时阻塞等待；返回是否可以继续提交任务（未被取消）"""
+        self._resume_event.wait()
+        return not self.cancelled
+
+    def process(self, image_date_pairs: Iterable[Tuple[str, str]], output_dir: str,
+                source_root: Optional[str] = None, spec: Optional[WatermarkSpec] = None,
+                renditions: Optional[list] = None, names: Optional[OutputNameRegistry] = None,
+                **options) -> Iterator[BatchResult]:
+        """
+        批量处理图片，按输入顺序逐个产出结果
+
+        Args:
+            image_date_pairs: (图片路径, 日期) 序列
+            output_dir: 输出目录
+            source_root: 输入根目录，指定时在输出目录中保留图片的相对子目录结构
+            spec: 水印设置，未指定时由 options 创建（整个批次只创建一次）
+            renditions: 多尺寸导出的 Rendition 列表（可选）
+            names: 输出文件名登记，默认为本批次新建
+            **options: 与 WatermarkProcessor.process_single_image 相同的旧接口参数
+
+        Returns:
+            按输入顺序排列的 BatchResult 迭代器
+        """
+        spec = self._processor.make_spec(spec, **options)
+        if names is None:
+            names = OutputNameRegistry()
+
+        # 已知任务总数时，进程数不超过任务数
+        workers = self.jobs
+        if hasattr(image_date_pairs, '__len__'):
+            workers = max(1, min(workers, len(image_date_pairs)))
+
+        if workers == 1:
+            runnable = takewhile(lambda _: self._wait_until_runnable(), image_date_pairs)
+            yield from self._processor.process_batch(runnable, spec, output_dir,
+                                                     source_root=source_root, renditions=renditions,
+                                                     names=names)
+            return
+
+        # 输出文件名在父进程中按输入顺序分配，批次内重名时结果与串行处理一致
+        def tasks():
+            for idx, (image_path, date_text) in enumerate(image_date_pairs, 1):
+                task_output_dir = item_output_dir(output_dir, image_path, source_root)
+                output_filenames = self._processor.plan_output_filenames(
+                    image_path, spec, task_output_dir, renditions, names
+                )
+                yield idx, image_path, date_text, task_output_dir, output_filenames
+
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       mp_context=_pool_context())
+        try:
+            # 限制在途任务数量，既保持输出有序，又避免一次性提交全部任务
+            pending = deque()
+            for idx, image_path, date_text, task_output_dir, output_filenames in tasks():
+                # 暂停时只停止提交新任务，已提交的任务完成后照常产出结果
+                while self.paused and pending:
+                    yield pending.popleft().result()
+                if not self._wait_until_runnable():
+                    break
+                pending.append(executor.submit(
+                    _process_task, idx, image_path, date_text, task_output_dir,
+                    spec, renditions, output_filenames
+                ))
+                if len(pending) >= self.window:
+                    yield pending.popleft().result()
+            while pending:
+                future = pending.popleft()
+                if self.cancelled and future.cancel():
+                    continue  # 尚未开始的任务直接取消
+                yield future.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def process_pipelined(self, image_date_pairs: Iterable[Tuple[str, str]], output_dir: str,
+                          source_root: Optional[str] = None, spec: Optional[WatermarkSpec] = None,
+                          renditions: Optional[list] = None,
+                          names: Optional[OutputNameRegistry] = None,
+                          **options) -> Iterator[BatchResult]:
+        """
+        以流水线方式批量处理图片：读取线程预取文件数据，进程池中的 process_item
+        解码、渲染、编码并写入输出文件。读取与进程池之间通过有界队列连接以形成背压，
+        使磁盘/网络读取与CPU计算相互重叠。
+
+        每张图片的处理与 process 相同（耗时、多尺寸导出与内存上限均适用）；
+        内存受限模式下不预取文件数据，由工作进程从文件分条处理。
+
+        Args:
+            image_date_pairs: (图片路径, 日期) 序列
+            output_dir: 输出目录
+            source_root: 输入根目录，指定时在输出目录中保留图片的相对子目录结构
+            spec: 水印设置，未指定时由 options 创建（整个批次只创建一次）
+            renditions: 多尺寸导出的 Rendition 列表（可选）
+            names: 输出文件名登记，默认为本批次新建
+            **options: 与 WatermarkProcessor.process_single_image 相同的旧接口参数
+
+        Returns:
+            按输入顺序排列的 BatchResult 迭代器，读取耗时记录在 timings['read'] 中
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        spec = self._processor.make_spec(spec, **options)
+        if names is None:
+            names = OutputNameRegistry()
+        prefetch = not (spec.max_memory and not renditions)
+
+        read_queue = queue.Queue(maxsize=self.window)
+        done_queue = queue.Queue()
+        # 限制进程池中在途任务数，防止读取阶段无限制地向进程池提交
+        render_slots = threading.BoundedSemaphore(self.window)
+        stop_event = threading.Event()
+
+        source = enumerate(image_date_pairs, 1)
+        source_lock = threading.Lock()
+
+        def reader():
+            while self._wait_until_runnable() and not stop_event.is_set():
+                with source_lock:
+                    try:
+                        idx, (image_path, date_text) = next(source)
+                    except StopIteration:
+                        return
+                    # 在取出图片时按输入顺序分配输出文件名，重名时的序号与串行处理一致
+                    target_dir = item_output_dir(output_dir, image_path, source_root)
+                    output_filenames = self._processor.plan_output_filenames(
+                        image_path, spec, target_dir, renditions, names
+                    )
+                task = (idx, image_path, date_text, target_dir, output_filenames)
+                start = time.perf_counter()
+                try:
+                    data = None
+                    if prefetch:
+                        with open(image_path, 'rb') as f:
+                            data = f.read()
+                    read_queue.put((task, data, time.perf_counter() - start, None))
+                except Exception as e:
+                    read_queue.put((task, None, time.perf_counter() - start,
+                                    f"无法读取图片文件 {image_path}: {e}"))
+
+        def dispatcher(executor):
+            # 读取线程全部结束后，向进程池阶段发送结束标记
+            readers = [threading.Thread(target=reader, daemon=True) for _ in range(self.io_threads)]
+            for thread in readers:
+                thread.start()
+
+            def join_readers():
+                for thread in readers:
+                    thread.join()
+                read_queue.put(_STAGE_DONE)
+            threading.Thread(target=join_readers, daemon=True).start()
+
+            while True:
+                item = read_queue.get()
+                if item is _STAGE_DONE:
+                    break
+                (idx, image_path, date_text, target_dir, output_filenames), data, read_time, error = item
+                if self.cancelled:
+                    continue  # 已读取但尚未开始处理的图片直接丢弃
+                if error is not None or stop_event.is_set():
+                    done_queue.put(BatchResult(idx, image_path, date_text, error=error or "已取消",
+                                               timings={'read': read_time}))
+                    continue
+
+                render_slots.acquire()
+
+                def on_done(f, idx=idx, image_path=image_path, date_text=date_text, read_time=read_time):
+                    render_slots.release()
+                    try:
+                        result = f.result()
+                    except Exception as e:
+                        result = BatchResult(idx, image_path, date_text, error=str(e) or "已取消")
+                    result.timings['read'] = read_time
+                    done_queue.put(result)
+
+                try:
+                    future = executor.submit(_process_task, idx, image_path, date_text, target_dir,
+                                             spec, renditions, output_filenames, data)
+                except RuntimeError:
+                    # 执行器已关闭（迭代被提前终止）
+                    render_slots.release()
+                    done_queue.put(BatchResult(idx, image_path, date_text, error="已取消"))
+                    continue
+                future.add_done_callback(on_done)
+                del data, item
+
+            # 等待所有任务及其回调完成后，通知结果阶段结束
+            executor.shutdown(wait=True)
+            done_queue.put(_STAGE_DONE)
+
+        executor = ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_worker,
+                                       mp_context=_pool_context())
+        threading.Thread(target=dispatcher, args=(executor,), daemon=True).start()
+
+        try:
+            # 结果可能乱序完成，按序号缓存后依次产出
+            buffered = {}
+            next_index = 1
+            while True:
+                result = done_queue.get()
+                if result is _STAGE_DONE:
+                    break
+                buffered[result.index] = result
+                while next_index in buffered:
+                    yield buffered.pop(next_index)
+                    next_index += 1
+            for idx in sorted(buffered):
+                yield buffered[idx]
+        finally:
+            stop_event.set()
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,122 @@
+"""
+EXIF元数据缓存模块
+将提取到的拍摄日期、图片尺寸与方向保存在本地SQLite数据库中，
+以 (文件大小, 修改时间, inode) 判断缓存是否有效，命令行与图形界面共用
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Optional
+
+
+class ImageMetadata:
+    """图片元数据"""
+    def __init__(self, exif_date: Optional[str] = None, width: Optional[int] = None,
+                 height: Optional[int] = None, orientation: Optional[int] = None):
+        self.exif_date = exif_date          # EXIF拍摄日期 (YYYY-MM-DD)，没有时为 None
+        self.width = width
+        self.height = height
+        self.orientation = orientation      # EXIF方向标签 (1-8)，没有时为 None
+
+
+def default_cache_path() -> str:
+    """默认缓存文件路径（遵循 XDG_CACHE_HOME）"""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'photo_watermark', 'exif_cache.sqlite3')
+
+
+class ExifCache:
+    """基于SQLite的EXIF元数据缓存，可在多个线程中使用"""
+
+    # 累计多少条写入后提交一次事务
+    COMMIT_INTERVAL = 200
+
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        Args:
+            db_path: 数据库文件路径，默认为 default_cache_path()
+        """
+        self.db_path = db_path or default_cache_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending = 0
+        # 命令行与图形界面可能同时使用同一缓存，使用WAL模式并设置等待超时
+        self._conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS exif_cache ("
+            " path TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " inode INTEGER NOT NULL,"
+            " exif_date TEXT,"
+            " width INTEGER,"
+            " height INTEGER,"
+            " orientation INTEGER)"
+        )
+        self._conn.commit()
+
+    @classmethod
+    def open_default(cls) -> Optional['ExifCache']:
+        """打开默认缓存，无法创建（如目录只读）时返回 None"""
+        try:
+            return cls()
+        except (OSError, sqlite3.Error) as e:
+            print(f"警告: 无法打开EXIF缓存，将不使用缓存: {e}")
+            return None
+
+    def get(self, image_path: str, stat: os.stat_result) -> Optional[ImageMetadata]:
+        """
+        查询缓存
+
+        Args:
+            image_path: 图片路径
+            stat: 图片当前的 os.stat 结果
+
+        Returns:
+            文件未变化时返回缓存的元数据，否则返回 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, inode, exif_date, width, height, orientation"
+                " FROM exif_cache WHERE path = ?", (os.path.abspath(image_path),)
+            ).fetchone()
+        if row is None or tuple(row[:3]) != (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+            return None
+        return ImageMetadata(*row[3:])
+
+    def put(self, image_path: str, stat: os.stat_result, metadata: ImageMetadata) -> None:
+        """写入缓存（批量提交，调用 flush 确保落盘）"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO exif_cache"
+                " (path, size, mtime_ns, inode, exif_date, width, height, orientation)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (os.path.abspath(image_path), stat.st_size, stat.st_mtime_ns, stat.st_ino,
+                 metadata.exif_date, metadata.width, metadata.height, metadata.orientation)
+            )
+            self._pending += 1
+            if self._pending >= self.COMMIT_INTERVAL:
+                self._commit()
+
+    def _commit(self) -> None:
+        try:
+            self._conn.commit()
+        except sqlite3.OperationalError as e:
+            # 缓存写入失败（如数据库被其他进程长时间锁定）不影响处理
+            print(f"警告: EXIF缓存写入失败: {e}")
+        self._pending = 0
+
+    def flush(self) -> None:
+        """提交尚未写入的缓存记录"""
+        with self._lock:
+            if self._pending:
+                self._commit()
+
+    def close(self) -> None:
+        """提交并关闭数据库"""
+        self.flush()
+        with self._lock:
+            self._conn.close()
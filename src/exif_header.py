@@ -0,0 +1,258 @@
+"""
+EXIF头部快速读取模块
+只读取文件头部的EXIF数据块（JPEG的APP1段、WebP的EXIF块、PNG的eXIf块、TIFF的IFD），
+直接沿IFD偏移查找拍摄时间与方向标签或内嵌缩略图，不解析MakerNote等其余内容
+"""
+
+import struct
+from typing import BinaryIO, Callable, Dict, Optional, Tuple
+
+# 需要读取的标签
+TAG_DATETIME = 0x0132            # IFD0: DateTime
+TAG_ORIENTATION = 0x0112         # IFD0: Orientation
+TAG_EXIF_IFD_POINTER = 0x8769    # IFD0: Exif子IFD偏移
+TAG_DATETIME_ORIGINAL = 0x9003   # Exif IFD: DateTimeOriginal
+TAG_THUMBNAIL_OFFSET = 0x0201    # IFD1: JPEGInterchangeFormat
+TAG_THUMBNAIL_LENGTH = 0x0202    # IFD1: JPEGInterchangeFormatLength
+
+_TYPE_ASCII = 2
+_TYPE_SHORT = 3
+_TYPE_LONG = 4
+
+# IFD条目数量上限，防止损坏文件导致大量读取
+_MAX_IFD_ENTRIES = 1024
+
+
+class ExifHeaderError(Exception):
+    """EXIF头部无法解析（格式不支持或数据损坏）"""
+    pass
+
+
+def _tiff_byte_order(read_at: Callable[[int, int], bytes]) -> Tuple[str, int]:
+    """解析TIFF头，返回 (struct字节序前缀, IFD0偏移)"""
+    header = read_at(0, 8)
+    if len(header) < 8:
+        raise ExifHeaderError("TIFF头不完整")
+    if header[:2] == b'II':
+        endian = '<'
+    elif header[:2] == b'MM':
+        endian = '>'
+    else:
+        raise ExifHeaderError("无效的TIFF字节序标记")
+    magic, ifd0_offset = struct.unpack(endian + 'HI', header[2:8])
+    if magic != 42:
+        raise ExifHeaderError("无效的TIFF标识")
+    return endian, ifd0_offset
+
+
+def _read_ifd(read_at: Callable[[int, int], bytes], endian: str, offset: int,
+              wanted: set) -> Tuple[Dict[int, object], int]:
+    """
+    读取一个IFD中所需的标签
+
+    Returns:
+        ({标签: 值}, 下一个IFD的偏移)，字符串标签为 str，数值标签为 int
+    """
+    count_data = read_at(offset, 2)
+    if len(count_data) < 2:
+        raise ExifHeaderError("IFD偏移越界")
+    (count,) = struct.unpack(endian + 'H', count_data)
+    if count > _MAX_IFD_ENTRIES:
+        raise ExifHeaderError("IFD条目数量异常")
+    entries = read_at(offset + 2, count * 12 + 4)
+    if len(entries) < count * 12:
+        raise ExifHeaderError("IFD数据不完整")
+
+    values = {}
+    for i in range(count):
+        tag, value_type, value_count = struct.unpack(endian + 'HHI', entries[i * 12:i * 12 + 8])
+        if tag not in wanted:
+            continue
+        value_field = entries[i * 12 + 8:i * 12 + 12]
+        if value_type == _TYPE_ASCII:
+            raw = value_field[:value_count] if value_count <= 4 else read_at(
+                struct.unpack(endian + 'I', value_field)[0], value_count)
+            values[tag] = raw.split(b'\x00', 1)[0].decode('ascii', errors='replace')
+        elif value_type == _TYPE_SHORT:
+            values[tag] = struct.unpack(endian + 'H', value_field[:2])[0]
+        elif value_type == _TYPE_LONG:
+            values[tag] = struct.unpack(endian + 'I', value_field)[0]
+
+    next_field = entries[count * 12:count * 12 + 4]
+    next_offset = struct.unpack(endian + 'I', next_field)[0] if len(next_field) == 4 else 0
+    return values, next_offset
+
+
+def _parse_tiff(read_at: Callable[[int, int], bytes]) -> Dict[int, object]:
+    """
+    解析TIFF结构中的 IFD0 与 Exif IFD，只提取所需标签
+
+    Args:
+        read_at: 按 (偏移, 长度) 读取TIFF数据的函数，偏移相对于TIFF头
+
+    Returns:
+        {标签: 值} 字典，字符串标签为 str，数值标签为 int
+    """
+    endian, ifd0_offset = _tiff_byte_order(read_at)
+    tags, _ = _read_ifd(read_at, endian, ifd0_offset,
+                        {TAG_DATETIME, TAG_ORIENTATION, TAG_EXIF_IFD_POINTER})
+    exif_offset = tags.pop(TAG_EXIF_IFD_POINTER, None)
+    if exif_offset:
+        tags.update(_read_ifd(read_at, endian, exif_offset, {TAG_DATETIME_ORIGINAL})[0])
+    return tags
+
+
+def _parse_tiff_thumbnail(read_at: Callable[[int, int], bytes]) -> Optional[bytes]:
+    """沿 IFD0 的下一IFD偏移找到 IFD1，读取其中的JPEG缩略图数据"""
+    endian, ifd0_offset = _tiff_byte_order(read_at)
+    _, ifd1_offset = _read_ifd(read_at, endian, ifd0_offset, set())
+    if not ifd1_offset:
+        return None
+    tags, _ = _read_ifd(read_at, endian, ifd1_offset, {TAG_THUMBNAIL_OFFSET, TAG_THUMBNAIL_LENGTH})
+    offset = tags.get(TAG_THUMBNAIL_OFFSET)
+    length = tags.get(TAG_THUMBNAIL_LENGTH)
+    if not offset or not length:
+        return None
+    data = read_at(offset, length)
+    return data if len(data) == length and data[:2] == b'\xFF\xD8' else None
+
+
+def _buffer_reader(data: bytes) -> Callable[[int, int], bytes]:
+    """内存中EXIF数据块的读取函数"""
+    return lambda offset, size: data[offset:offset + size]
+
+
+def _file_reader(f: BinaryIO) -> Callable[[int, int], bytes]:
+    """按需定位读取的文件读取函数（TIFF的IFD可位于文件任意位置）"""
+    def read_at(offset: int, size: int) -> bytes:
+        f.seek(offset)
+        return f.read(size)
+    return read_at
+
+
+def _strip_exif_prefix(data: bytes) -> bytes:
+    """去掉部分写入工具在EXIF数据前添加的 'Exif\\0\\0' 标识"""
+    return data[6:] if data.startswith(b'Exif\x00\x00') else data
+
+
+def _find_jpeg_app1(f: BinaryIO) -> Optional[bytes]:
+    """沿JPEG段头查找EXIF APP1段，只读取段头和APP1段本身"""
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            raise ExifHeaderError("JPEG段结构无效")
+        # 跳过填充字节
+        while marker[1] == 0xFF:
+            next_byte = f.read(1)
+            if not next_byte:
+                raise ExifHeaderError("JPEG段结构无效")
+            marker = marker[1:] + next_byte
+        if marker[1] in (0xD9, 0xDA):  # EOI / SOS：其后为图像数据，不再有EXIF
+            return None
+        if 0xD0 <= marker[1] <= 0xD7 or marker[1] == 0x01:  # 无长度字段的标记
+            continue
+        length_data = f.read(2)
+        if len(length_data) < 2:
+            raise ExifHeaderError("JPEG段长度不完整")
+        (length,) = struct.unpack('>H', length_data)
+        if length < 2:
+            raise ExifHeaderError("JPEG段长度无效")
+        if marker[1] == 0xE1:
+            segment = f.read(length - 2)
+            if segment.startswith(b'Exif\x00\x00'):
+                return segment[6:]
+        else:
+            f.seek(length - 2, 1)
+
+
+def _find_webp_exif(f: BinaryIO) -> Optional[bytes]:
+    """沿RIFF块头查找WebP的EXIF块，跳过图像数据块"""
+    f.seek(12)
+    while True:
+        chunk_header = f.read(8)
+        if len(chunk_header) < 8:
+            return None
+        fourcc = chunk_header[:4]
+        (size,) = struct.unpack('<I', chunk_header[4:])
+        if fourcc == b'EXIF':
+            data = f.read(size)
+            if len(data) < size:
+                raise ExifHeaderError("WebP EXIF块不完整")
+            return _strip_exif_prefix(data)
+        f.seek(size + (size & 1), 1)  # 块数据按偶数字节对齐
+
+
+def _find_png_exif(f: BinaryIO) -> Optional[bytes]:
+    """沿PNG块头查找eXIf块，只定位跳过图像数据块，不读取它们"""
+    f.seek(8)
+    while True:
+        chunk_header = f.read(8)
+        if len(chunk_header) < 8:
+            return None
+        (size,) = struct.unpack('>I', chunk_header[:4])
+        chunk_type = chunk_header[4:]
+        if chunk_type == b'eXIf':
+            data = f.read(size)
+            if len(data) < size:
+                raise ExifHeaderError("PNG eXIf块不完整")
+            return _strip_exif_prefix(data)
+        if chunk_type == b'IEND':
+            return None
+        f.seek(size + 4, 1)  # 块数据与CRC
+
+
+def _read_tiff_block(image_path: str, parse: Callable[[Callable[[int, int], bytes]], object],
+                     default):
+    """定位文件中的TIFF结构（JPEG APP1、WebP EXIF块、PNG eXIf块或TIFF文件本身）并解析"""
+    with open(image_path, 'rb') as f:
+        signature = f.read(12)
+        try:
+            if signature[:2] == b'\xFF\xD8':
+                tiff_data = _find_jpeg_app1(f)
+                return parse(_buffer_reader(tiff_data)) if tiff_data else default
+            if signature[:4] in (b'II*\x00', b'MM\x00*'):
+                return parse(_file_reader(f))
+            if signature[:4] == b'RIFF' and signature[8:12] == b'WEBP':
+                tiff_data = _find_webp_exif(f)
+                return parse(_buffer_reader(tiff_data)) if tiff_data else default
+            if signature[:8] == b'\x89PNG\r\n\x1a\n':
+                tiff_data = _find_png_exif(f)
+                return parse(_buffer_reader(tiff_data)) if tiff_data else default
+        except struct.error as e:
+            raise ExifHeaderError(f"EXIF数据损坏: {e}")
+    raise ExifHeaderError("不支持的文件格式")
+
+
+def read_exif_header(image_path: str) -> Dict[int, object]:
+    """
+    从文件头部读取EXIF拍摄时间与方向标签
+
+    Args:
+        image_path: 图片路径（JPEG、TIFF、WebP或PNG）
+
+    Returns:
+        {标签: 值} 字典；文件不含EXIF时返回空字典
+
+    Raises:
+        ExifHeaderError: 文件格式不支持或EXIF结构无法解析时
+        OSError: 文件无法读取时
+    """
+    return _read_tiff_block(image_path, _parse_tiff, {})
+
+
+def read_exif_thumbnail(image_path: str) -> Optional[bytes]:
+    """
+    读取EXIF中内嵌的JPEG缩略图（通常约160x120），不解码原图
+
+    Args:
+        image_path: 图片路径（JPEG、TIFF、WebP或PNG）
+
+    Returns:
+        缩略图的JPEG数据；没有内嵌缩略图时返回 None
+
+    Raises:
+        ExifHeaderError: 文件格式不支持或EXIF结构无法解析时
+        OSError: 文件无法读取时
+    """
+    return _read_tiff_block(image_path, _parse_tiff_thumbnail, None)
@@ -4,9 +4,22 @@ EXIF信息读取模块
 """
 
 import os
+import fnmatch
 import piexif
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Iterable, Iterator, Sequence
+from PIL import Image
+
+try:
+    from exif_header import (read_exif_header, ExifHeaderError, TAG_DATETIME,
+                             TAG_DATETIME_ORIGINAL, TAG_ORIENTATION)
+    from exif_cache import ExifCache, ImageMetadata
+except ImportError:  # 以 src 包的方式导入时
+    from .exif_header import (read_exif_header, ExifHeaderError, TAG_DATETIME,
+                              TAG_DATETIME_ORIGINAL, TAG_ORIENTATION)
+    from .exif_cache import ExifCache, ImageMetadata
 
 
 class ExifReader:
@@ -23,8 +36,15 @@ class ExifReader:
         '.gif'              # GIF格式（支持动画，但处理为静态）
     }
     
-    def __init__(self):
-        pass
+    # 通常不包含EXIF信息的格式
+    NO_EXIF_FORMATS = {'.png', '.bmp', '.gif', '.ico'}
+    
+    def __init__(self, cache: Optional[ExifCache] = None):
+        """
+        Args:
+            cache: EXIF元数据缓存，为 None 时每次都读取文件
+        """
+        self.cache = cache
     
     def is_supported_image(self, file_path: str) -> bool:
         """检查文件是否为支持的图片格式"""
@@ -33,23 +53,122 @@ class ExifReader:
     
     def get_image_files(self, directory: str) -> List[str]:
         """获取目录下所有支持的图片文件"""
-        image_files = []
+        return list(self.scan_image_files(directory))
+    
+    def _matches_any(self, rel_path: str, name: str, patterns: Sequence[str]) -> bool:
+        """相对路径或文件名匹配任一通配符模式"""
+        return any(fnmatch.fnmatch(rel_path, pattern) or fnmatch.fnmatch(name, pattern)
+                   for pattern in patterns)
+    
+    def scan_image_files(self, input_path: str, recursive: bool = False,
+                         include: Optional[Sequence[str]] = None,
+                         exclude: Optional[Sequence[str]] = None,
+                         max_depth: Optional[int] = None,
+                         exclude_dirs: Iterable[str] = ()) -> Iterator[str]:
+        """
+        使用 os.scandir 扫描支持的图片文件，边扫描边产出
         
-        if not os.path.exists(directory):
-            raise FileNotFoundError(f"目录不存在: {directory}")
+        目录项的文件/目录类型直接取自 DirEntry，无需对每个文件单独调用 stat。
         
-        if os.path.isfile(directory):
+        Args:
+            input_path: 图片文件或目录
+            recursive: 是否递归扫描子目录（不跟随指向目录的符号链接）
+            include: 文件需匹配的通配符模式（匹配相对路径或文件名），为空时不限制
+            exclude: 需排除的文件或目录的通配符模式（匹配相对路径或文件名）
+            max_depth: 递归的最大子目录深度，0 表示只扫描顶层目录，None 表示不限
+            exclude_dirs: 需跳过的目录（如位于输入目录内的输出目录）
+        
+        Returns:
+            图片路径迭代器，同一目录内按文件名排序
+        """
+        if not os.path.exists(input_path):
+            raise FileNotFoundError(f"目录不存在: {input_path}")
+        
+        if os.path.isfile(input_path):
             # 如果输入的是单个文件
-            if self.is_supported_image(directory):
-                image_files.append(directory)
-        else:
-            # 如果输入的是目录
-            for filename in os.listdir(directory):
-                file_path = os.path.join(directory, filename)
-                if os.path.isfile(file_path) and self.is_supported_image(filename):
-                    image_files.append(file_path)
+            if self.is_supported_image(input_path):
+                yield input_path
+            return
+        
+        include = list(include or [])
+        exclude = list(exclude or [])
+        skipped_dirs = {os.path.normcase(os.path.abspath(d)) for d in exclude_dirs}
+        
+        # 深度优先遍历：(目录路径, 相对路径, 深度)
+        stack = [(input_path, "", 0)]
+        while stack:
+            directory, rel_dir, depth = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError as e:
+                print(f"无法读取目录 {directory}: {e}")
+                continue
+            
+            subdirs = []
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if exclude and self._matches_any(rel_path, entry.name, exclude):
+                    continue
+                try:
+                    if entry.is_file():
+                        if not self.is_supported_image(entry.name):
+                            continue
+                        if include and not self._matches_any(rel_path, entry.name, include):
+                            continue
+                        yield entry.path
+                    elif recursive and entry.is_dir(follow_symlinks=False):
+                        if max_depth is not None and depth >= max_depth:
+                            continue
+                        if os.path.normcase(os.path.abspath(entry.path)) in skipped_dirs:
+                            continue
+                        subdirs.append((entry.path, rel_path, depth + 1))
+                except OSError:
+                    continue
+            
+            # 逆序入栈，使子目录按名称顺序处理
+            stack.extend(reversed(subdirs))
+    
+    def iter_watermark_dates(self, image_files: Iterable[str],
+                             workers: int = 8) -> Iterator[Tuple[str, str]]:
+        """
+        使用线程池并行读取图片日期，按输入顺序产出 (图片路径, 日期)
+        
+        读取EXIF以磁盘/网络I/O为主，线程池可让多个读取同时进行；
+        在途任务数有上限，输入可以是仍在扫描中的迭代器。
         
-        return image_files
+        Args:
+            image_files: 图片路径序列或迭代器
+            workers: 线程数，为1时串行读取
+        """
+        try:
+            yield from self._iter_watermark_dates(image_files, workers)
+        finally:
+            if self.cache is not None:
+                self.cache.flush()
+    
+    def _iter_watermark_dates(self, image_files: Iterable[str],
+                              workers: int) -> Iterator[Tuple[str, str]]:
+        if workers <= 1:
+            for image_path in image_files:
+                yield image_path, self.get_watermark_date(image_path)
+            return
+        
+        def collect(path, future):
+            # 提示信息在当前线程输出，避免多线程输出相互交错
+            date, from_exif = future.result()
+            if not from_exif:
+                print(f"未找到EXIF拍摄日期，使用文件修改日期: {os.path.basename(path)}")
+            return path, date
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for image_path in image_files:
+                pending.append((image_path, executor.submit(self._read_watermark_date, image_path)))
+                if len(pending) >= workers * 4:
+                    yield collect(*pending.popleft())
+            while pending:
+                yield collect(*pending.popleft())
     
     def extract_date_from_exif(self, image_path: str) -> Optional[str]:
         """
@@ -61,18 +180,20 @@ class ExifReader:
             _, ext = os.path.splitext(image_path.lower())
             
             # PNG, BMP, GIF, ICO 通常不包含EXIF信息
-            if ext in {'.png', '.bmp', '.gif', '.ico'}:
+            if ext in self.NO_EXIF_FORMATS:
                 return None
             
+            # 快速路径：只读取文件头部的EXIF数据块
+            try:
+                tags = read_exif_header(image_path)
+                date_str = tags.get(TAG_DATETIME_ORIGINAL) or tags.get(TAG_DATETIME)
+                return self.format_exif_date(date_str) if date_str else None
+            except (ExifHeaderError, OSError):
+                pass  # 头部无法解析时回退到piexif完整解析
+            
             # 读取EXIF数据
             exif_data = piexif.load(image_path)
             
-            # 尝试从多个可能的EXIF字段获取日期时间
-            date_fields = [
-                piexif.ExifIFD.DateTimeOriginal,  # 原始拍摄时间
-                piexif.ImageIFD.DateTime          # 图片时间
-            ]
-            
             date_str = None
             
             # 首先尝试从Exif字段获取
@@ -86,17 +207,7 @@ class ExifReader:
                     date_str = exif_data["0th"][piexif.ImageIFD.DateTime].decode('utf-8')
             
             if date_str:
-                # EXIF日期格式通常为: "YYYY:MM:DD HH:MM:SS"
-                # 转换为标准格式: "YYYY-MM-DD"
-                date_part = date_str.split(' ')[0]  # 只取日期部分
-                formatted_date = date_part.replace(':', '-')
-                
-                # 验证日期格式是否正确
-                try:
-                    datetime.strptime(formatted_date, '%Y-%m-%d')
-                    return formatted_date
-                except ValueError:
-                    pass
+                return self.format_exif_date(date_str)
             
             return None
             
@@ -104,6 +215,59 @@ class ExifReader:
             # 静默失败，不打印错误信息（对于不支持EXIF的格式这是正常的）
             return None
     
+    def read_image_metadata(self, image_path: str) -> ImageMetadata:
+        """读取图片的拍摄日期、尺寸与方向（不使用缓存）"""
+        exif_date = None
+        orientation = None
+        _, ext = os.path.splitext(image_path.lower())
+        if ext not in self.NO_EXIF_FORMATS:
+            try:
+                tags = read_exif_header(image_path)
+                date_str = tags.get(TAG_DATETIME_ORIGINAL) or tags.get(TAG_DATETIME)
+                exif_date = self.format_exif_date(date_str) if date_str else None
+                orientation = tags.get(TAG_ORIENTATION)
+            except (ExifHeaderError, OSError):
+                exif_date = self.extract_date_from_exif(image_path)
+        
+        # Image.open 只解析文件头，不解码像素
+        width = height = None
+        try:
+            with Image.open(image_path) as image:
+                width, height = image.size
+        except Exception:
+            pass
+        return ImageMetadata(exif_date, width, height, orientation)
+    
+    def get_image_metadata(self, image_path: str) -> ImageMetadata:
+        """获取图片元数据，文件未变化时直接使用缓存"""
+        if self.cache is None:
+            return self.read_image_metadata(image_path)
+        try:
+            stat = os.stat(image_path)
+        except OSError:
+            return self.read_image_metadata(image_path)
+        
+        metadata = self.cache.get(image_path, stat)
+        if metadata is None:
+            metadata = self.read_image_metadata(image_path)
+            self.cache.put(image_path, stat, metadata)
+        return metadata
+    
+    def format_exif_date(self, date_str: str) -> Optional[str]:
+        """
+        将EXIF日期时间转换为水印日期
+        EXIF日期格式通常为: "YYYY:MM:DD HH:MM:SS"，转换为标准格式: "YYYY-MM-DD"
+        """
+        date_part = date_str.split(' ')[0]  # 只取日期部分
+        formatted_date = date_part.replace(':', '-')
+        
+        # 验证日期格式是否正确
+        try:
+            datetime.strptime(formatted_date, '%Y-%m-%d')
+            return formatted_date
+        except ValueError:
+            return None
+    
     def get_file_modification_date(self, image_path: str) -> str:
         """获取文件修改日期作为备选方案"""
         try:
@@ -119,25 +283,53 @@ class ExifReader:
         获取用于水印的日期
         优先使用EXIF中的拍摄日期，如果没有则使用文件修改日期
         """
-        exif_date = self.extract_date_from_exif(image_path)
-        if exif_date:
-            return exif_date
-        else:
+        date, from_exif = self._read_watermark_date(image_path)
+        if not from_exif:
             print(f"未找到EXIF拍摄日期，使用文件修改日期: {os.path.basename(image_path)}")
-            return self.get_file_modification_date(image_path)
+        return date
+    
+    def _read_watermark_date(self, image_path: str) -> Tuple[str, bool]:
+        """读取水印日期，返回 (日期, 是否来自EXIF)，不输出提示信息"""
+        if self.cache is not None:
+            exif_date = self.get_image_metadata(image_path).exif_date
+        else:
+            exif_date = self.extract_date_from_exif(image_path)
+        if exif_date:
+            return exif_date, True
+        return self.get_file_modification_date(image_path), False
     
-    def process_images(self, input_path: str) -> List[Tuple[str, str]]:
+    def iter_images(self, input_path: str, recursive: bool = False,
+                    include: Optional[Sequence[str]] = None,
+                    exclude: Optional[Sequence[str]] = None,
+                    max_depth: Optional[int] = None,
+                    exclude_dirs: Iterable[str] = (),
+                    workers: int = 8) -> Iterator[Tuple[str, str]]:
+        """
+        流式处理输入路径中的图片，每检查完一张即产出 (图片路径, 日期)
+        
+        扫描与日期读取同时进行，下游处理无需等待整个目录扫描完成，
+        内存占用也不随图片数量增长。未找到图片时不产出任何结果（不抛出异常）。
+        扫描参数见 scan_image_files；workers 为并行读取日期的线程数。
+        """
+        image_files = self.scan_image_files(input_path, recursive, include, exclude,
+                                            max_depth, exclude_dirs)
+        return self.iter_watermark_dates(image_files, workers)
+    
+    def process_images(self, input_path: str, recursive: bool = False,
+                       include: Optional[Sequence[str]] = None,
+                       exclude: Optional[Sequence[str]] = None,
+                       max_depth: Optional[int] = None,
+                       exclude_dirs: Iterable[str] = (),
+                       workers: int = 8) -> List[Tuple[str, str]]:
         """
         处理输入路径中的所有图片，返回 (图片路径, 日期) 的列表
+        
+        需要逐个处理时请使用流式的 iter_images。
         """
-        image_files = self.get_image_files(input_path)
+        results = list(self.iter_images(input_path, recursive, include, exclude,
+                                        max_depth, exclude_dirs, workers))
         
-        if not image_files:
+        if not results:
             raise ValueError(f"在路径 {input_path} 中未找到支持的图片文件")
         
-        results = []
-        for image_path in image_files:
-            date = self.get_watermark_date(image_path)
-            results.append((image_path, date))
-        
-        return results
\ No newline at end of file
+        return results
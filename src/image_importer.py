@@ -0,0 +1,141 @@
+"""
+图片导入模块
+在后台线程中展开文件夹、去重并并行读取拍摄日期，
+结果分批放入队列，供界面线程按固定频率取出显示
+"""
+
+import os
+import queue
+import threading
+import time
+from typing import Iterable, List, Optional, Set, Tuple
+
+try:
+    from exif_reader import ExifReader
+except ImportError:  # 以 src 包的方式导入时
+    from .exif_reader import ExifReader
+
+
+class ImageImporter:
+    """
+    后台图片导入任务
+
+    界面线程调用 start() 启动后，定期调用 poll() 取出已读取完日期的
+    (图片路径, 日期)，并通过 done/total 属性显示进度；cancel() 可随时取消。
+    """
+
+    def __init__(self, exif_reader: ExifReader, paths: Iterable[str],
+                 known_paths: Optional[Set[str]] = None, workers: int = 8,
+                 batch_size: int = 200, batch_interval: float = 0.05):
+        """
+        Args:
+            exif_reader: EXIF读取器
+            paths: 待导入的图片文件与文件夹
+            known_paths: 列表中已有的图片路径，这些图片不会重复导入
+            workers: 并行读取日期的线程数
+            batch_size: 每批结果的最大数量
+            batch_interval: 结果不足一批时，最长等待多少秒后提交
+        """
+        self.exif_reader = exif_reader
+        self.paths = list(paths)
+        self.known_paths = set(known_paths or ())
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+
+        self.total = 0              # 待读取日期的图片总数（展开文件夹后确定）
+        self.done = 0               # 已读取日期的图片数
+        self.finished = False       # 后台线程是否已结束
+        self.error: Optional[str] = None
+
+        self._results: queue.Queue = queue.Queue()
+        self._cancel_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def start(self) -> None:
+        """启动后台导入线程"""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def cancel(self) -> None:
+        """取消导入，后台线程在当前图片读取完成后结束"""
+        self._cancel_event.set()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """等待后台线程结束"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def poll(self, max_items: Optional[int] = None) -> List[Tuple[str, str]]:
+        """
+        非阻塞地取出已就绪的结果
+
+        Args:
+            max_items: 最多取出的数量（按批取出，可能略超），None 表示全部取出
+
+        Returns:
+            (图片路径, 日期) 列表
+        """
+        items: List[Tuple[str, str]] = []
+        while max_items is None or len(items) < max_items:
+            try:
+                items.extend(self._results.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    @property
+    def drained(self) -> bool:
+        """后台线程已结束且结果已全部取出"""
+        return self.finished and self._results.empty()
+
+    def _expand_paths(self) -> List[str]:
+        """展开文件夹并去重，得到待导入的图片列表"""
+        seen = set(self.known_paths)
+        image_files = []
+        for path in self.paths:
+            if self.cancelled:
+                break
+            if os.path.isdir(path):
+                candidates = self.exif_reader.scan_image_files(path)
+            elif self.exif_reader.is_supported_image(path):
+                candidates = [path]
+            else:
+                continue
+            for image_path in candidates:
+                if image_path not in seen:
+                    seen.add(image_path)
+                    image_files.append(image_path)
+        return image_files
+
+    def _run(self) -> None:
+        try:
+            image_files = self._expand_paths()
+            self.total = len(image_files)
+
+            batch = []
+            last_put = time.monotonic()
+            dates = self.exif_reader.iter_watermark_dates(image_files, self.workers)
+            try:
+                for item in dates:
+                    if self.cancelled:
+                        break
+                    batch.append(item)
+                    self.done += 1
+                    now = time.monotonic()
+                    if len(batch) >= self.batch_size or now - last_put >= self.batch_interval:
+                        self._results.put(batch)
+                        batch = []
+                        last_put = now
+            finally:
+                dates.close()
+            if batch:
+                self._results.put(batch)
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self.finished = True
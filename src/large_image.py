@@ -0,0 +1,134 @@
+"""
+大图分条处理模块
+为内存受限的大图处理提供条带划分、内存估算与逐条带写入的PNG编码器
+
+Pillow 只能整帧解码图片（JPEG 仅在缩小时可用 draft 模式降低解码尺寸），
+因此解码后的原图总会完整驻留内存；分条处理限制的是其余的整帧副本
+（模式转换、透明背景合成、水印图层与输出图像）。
+"""
+
+import struct
+import zlib
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from PIL import Image, ImageChops, UnidentifiedImageError
+
+# 各模式每个像素占用的字节数（Pillow 内部的 RGB 也按4字节存储）
+_PIXEL_BYTES = {'1': 1, 'L': 1, 'P': 1, 'LA': 4, 'PA': 4, 'RGB': 4, 'RGBA': 4,
+                'CMYK': 4, 'YCbCr': 4, 'I': 4, 'F': 4, 'I;16': 2}
+
+
+def frame_bytes(size: Tuple[int, int], mode: str) -> int:
+    """估算指定尺寸与模式的整帧图像占用的内存（字节）"""
+    return size[0] * size[1] * _PIXEL_BYTES.get(mode, 4)
+
+
+def open_within_budget(image_path: str) -> Image.Image:
+    """
+    只读取文件头打开图片（不解码），不做 Pillow 按像素数的解压缩炸弹检查
+
+    调用方必须在解码前按 frame_bytes(image.size, image.mode) 与内存上限判断能否处理，
+    由内存上限代替像素数限制：有足够上限时，超过 Pillow 拒绝线（默认约1.8亿像素）的
+    全景图与扫描图也可以处理。与 Image.open 的识别流程相同，只是直接调用格式插件，
+    不读写全局的 Image.MAX_IMAGE_PIXELS，其他线程的 Image.open 不受影响。
+
+    Raises:
+        UnidentifiedImageError: 无法识别图片格式时
+        OSError: 无法读取文件时
+    """
+    with open(image_path, 'rb') as f:
+        prefix = f.read(16)
+    Image.init()
+    for format_id in Image.ID:
+        factory, accept = Image.OPEN[format_id]
+        result = not accept or accept(prefix)
+        if not result or isinstance(result, str):
+            continue
+        try:
+            return factory(image_path)  # 传入路径时图像自行打开并在关闭时关闭文件
+        except (SyntaxError, IndexError, TypeError, struct.error):
+            continue
+    raise UnidentifiedImageError(f"cannot identify image file {image_path!r}")
+
+
+def iter_strips(size: Tuple[int, int], strip_height: int) -> Iterator[Tuple[int, int, int, int]]:
+    """按从上到下的顺序产出水平条带的区域 (0, 上, 宽, 下)"""
+    width, height = size
+    strip_height = max(1, strip_height)
+    for top in range(0, height, strip_height):
+        yield 0, top, width, min(height, top + strip_height)
+
+
+class PNGStripWriter:
+    """
+    逐条带写入PNG文件，输出图像不需要完整驻留内存
+
+    每行使用 Up 滤波（与上一行逐字节相减，由 ImageChops 完成），
+    压缩数据随写随出，内存占用只与条带大小有关。
+    """
+
+    _COLOR_TYPES = {'L': 0, 'RGB': 2, 'RGBA': 6}
+    _FILTER_UP = b'\x02'
+
+    def __init__(self, fp: BinaryIO, size: Tuple[int, int], mode: str, compress_level: int = 6,
+                 icc_profile: Optional[bytes] = None):
+        """
+        Args:
+            fp: 已打开的二进制输出文件
+            size: 图像尺寸
+            mode: 图像模式（L、RGB 或 RGBA）
+            compress_level: zlib 压缩级别（与 Pillow 默认值相同）
+            icc_profile: 嵌入的ICC色彩配置（与 Pillow 保存PNG时一样保留原图的配置）
+        """
+        if mode not in self._COLOR_TYPES:
+            raise ValueError(f"分条写入PNG不支持的图像模式: {mode}")
+        self.fp = fp
+        self.size = size
+        self.mode = mode
+        self.rows_written = 0
+        self._previous_row = Image.new(mode, (size[0], 1))  # 首行之上视为全0
+        self._compressor = zlib.compressobj(compress_level)
+
+        fp.write(b'\x89PNG\r\n\x1a\n')
+        self._write_chunk(b'IHDR', struct.pack('>IIBBBBB', size[0], size[1], 8,
+                                               self._COLOR_TYPES[mode], 0, 0, 0))
+        if icc_profile:
+            self._write_chunk(b'iCCP', b'ICC Profile\0\0' + zlib.compress(icc_profile))
+
+    def _write_chunk(self, chunk_type: bytes, data: bytes) -> None:
+        self.fp.write(struct.pack('>I', len(data)))
+        self.fp.write(chunk_type)
+        self.fp.write(data)
+        self.fp.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(chunk_type)) & 0xFFFFFFFF))
+
+    def write_strip(self, strip: Image.Image) -> None:
+        """写入下一条带（宽度与模式必须与图像一致）"""
+        if strip.mode != self.mode or strip.width != self.size[0]:
+            raise ValueError("条带的宽度或模式与图像不一致")
+        width, height = strip.size
+
+        # 上一行图像：条带整体下移一行，首行取上一条带的最后一行
+        above = Image.new(self.mode, strip.size)
+        above.paste(self._previous_row, (0, 0))
+        if height > 1:
+            above.paste(strip.crop((0, 0, width, height - 1)), (0, 1))
+        filtered = ImageChops.subtract_modulo(strip, above).tobytes()
+        del above
+        self._previous_row = strip.crop((0, height - 1, width, height))
+
+        stride = len(filtered) // height
+        raw = self._FILTER_UP + self._FILTER_UP.join(
+            filtered[row:row + stride] for row in range(0, len(filtered), stride)
+        )
+        del filtered
+        compressed = self._compressor.compress(raw)
+        if compressed:
+            self._write_chunk(b'IDAT', compressed)
+        self.rows_written += height
+
+    def close(self) -> None:
+        """写入剩余的压缩数据与文件结束块"""
+        if self.rows_written != self.size[1]:
+            raise ValueError(f"已写入 {self.rows_written} 行，图像高度为 {self.size[1]} 行")
+        self._write_chunk(b'IDAT', self._compressor.flush())
+        self._write_chunk(b'IEND', b'')
@@ -0,0 +1,67 @@
+"""
+预览代理图缓存模块
+每张图片只按预览区域大小解码一次（JPEG使用draft模式），缓存在LRU中，
+设置变化时直接在代理图上按比例重新绘制水印，无需重新解码原图
+"""
+
+import os
+from collections import OrderedDict
+from typing import Tuple
+
+from PIL import Image
+
+try:
+    from watermark_processor import WatermarkProcessor
+except ImportError:  # 以 src 包的方式导入时
+    from .watermark_processor import WatermarkProcessor
+
+
+class PreviewProxyCache:
+    """预览代理图的LRU缓存"""
+
+    def __init__(self, processor: WatermarkProcessor, max_items: int = 8):
+        """
+        Args:
+            processor: 用于解码图片的水印处理器
+            max_items: 最多缓存的代理图数量
+        """
+        self.processor = processor
+        self.max_items = max(1, max_items)
+        self._entries: "OrderedDict[tuple, Tuple[Image.Image, float]]" = OrderedDict()
+
+    def get(self, image_path: str, max_size: Tuple[int, int]) -> Tuple[Image.Image, float]:
+        """
+        获取图片的预览代理图
+
+        Args:
+            image_path: 图片路径
+            max_size: 预览区域大小，代理图等比例缩小到该范围内（不放大）
+
+        Returns:
+            (代理图, 缩放系数)。代理图为共享对象，绘制水印前需先 copy()；
+            缩放系数可作为 add_watermark 的 layout_scale
+        """
+        stat = os.stat(image_path)
+        key = (os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size, tuple(max_size))
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+
+        with Image.open(image_path) as source:
+            width, height = source.size
+            scale = min(max_size[0] / width, max_size[1] / height, 1.0)
+            target_size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            proxy = self.processor.load_image(source, target_size)
+            if proxy is source:
+                proxy = source.copy()  # 关闭文件后原图像对象不可再用
+
+        entry = (proxy, proxy.width / width)
+        self._entries[key] = entry
+        while len(self._entries) > self.max_items:
+            self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._entries.clear()
@@ -0,0 +1,272 @@
+"""
+缩略图服务模块
+在后台线程中生成图片列表的小缩略图：优先使用EXIF内嵌缩略图或TIFF的缩小分辨率页，
+否则JPEG以draft模式缩小解码，其余格式解码后先按整数倍缩小；
+结果按 (路径, 修改时间) 缓存在磁盘上，超过容量上限时淘汰最久未使用的缩略图
+"""
+
+import hashlib
+import io
+import os
+import queue
+import threading
+from typing import List, Optional, Set, Tuple
+
+from PIL import Image
+
+try:
+    from exif_header import ExifHeaderError, read_exif_thumbnail
+except ImportError:  # 以 src 包的方式导入时
+    from .exif_header import ExifHeaderError, read_exif_thumbnail
+
+
+def default_thumbnail_dir() -> str:
+    """默认缩略图缓存目录（遵循 XDG_CACHE_HOME）"""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'photo_watermark', 'thumbnails')
+
+
+# reduce() 支持的模式（调色板模式按索引取平均没有意义，需先转换）
+_REDUCIBLE_MODES = {'L', 'LA', 'RGB', 'RGBA', 'RGBX', 'CMYK', 'YCbCr', 'I', 'F'}
+
+
+def _embedded_preview(image_path: str, size: Tuple[int, int]) -> Optional[Image.Image]:
+    """读取不小于目标尺寸的EXIF内嵌缩略图，没有时返回 None"""
+    try:
+        data = read_exif_thumbnail(image_path)
+    except (ExifHeaderError, OSError):
+        return None
+    if not data:
+        return None
+    try:
+        embedded = Image.open(io.BytesIO(data))
+        if embedded.width >= size[0] or embedded.height >= size[1]:
+            embedded.draft('RGB', size)
+            return embedded.convert('RGB')
+    except OSError:
+        pass
+    return None
+
+
+def _seek_reduced_page(source: Image.Image, size: Tuple[int, int]) -> None:
+    """多页TIFF中存在不小于目标尺寸的缩小分辨率页（NewSubfileType 标记）时，定位到最小的一页"""
+    best = None
+    try:
+        for frame in range(1, getattr(source, 'n_frames', 1)):
+            source.seek(frame)
+            if not source.tag_v2.get(254, 0) & 1:
+                continue
+            if source.width >= size[0] and source.height >= size[1]:
+                if best is None or source.width < best[1]:
+                    best = (frame, source.width)
+    except (EOFError, OSError):
+        pass
+    source.seek(best[0] if best else 0)
+
+
+def make_thumbnail(image_path: str, size: Tuple[int, int] = (64, 64)) -> Image.Image:
+    """
+    生成缩略图（RGB模式，等比例缩小到 size 范围内）
+
+    内嵌缩略图不小于目标尺寸时直接使用，不解码原图；TIFF优先解码缩小分辨率页；
+    否则JPEG按 draft 模式以1/2~1/8比例解码，其余格式解码后先用 reduce()
+    按整数倍缩小再转换模式，不产生整帧大小的转换副本。
+
+    Args:
+        image_path: 图片路径
+        size: 缩略图最大尺寸
+
+    Returns:
+        缩略图
+    """
+    with Image.open(image_path) as source:
+        thumbnail = None
+        if source.format in ('JPEG', 'TIFF', 'WEBP', 'PNG'):
+            thumbnail = _embedded_preview(image_path, size)
+        if thumbnail is None:
+            if source.format == 'TIFF':
+                _seek_reduced_page(source, size)
+            source.draft('RGB', size)
+            image = source
+            factor = min(source.width // size[0], source.height // size[1])
+            if factor >= 2 and source.mode in _REDUCIBLE_MODES:
+                image = source.reduce(factor)
+            thumbnail = image.convert('RGBA' if source.mode in ('RGBA', 'LA', 'PA') else 'RGB')
+
+    thumbnail.thumbnail(size, Image.LANCZOS)
+    if thumbnail.mode != 'RGB':
+        # 透明背景铺白色，列表中显示更清楚
+        background = Image.new('RGB', thumbnail.size, (255, 255, 255))
+        background.paste(thumbnail, mask=thumbnail.getchannel('A'))
+        thumbnail = background
+    return thumbnail
+
+
+class ThumbnailService:
+    """
+    后台缩略图服务
+
+    界面线程调用 request() 提交当前可见的图片，定期调用 poll() 取出
+    已生成的缩略图，在界面线程中创建 PhotoImage 显示。
+    """
+
+    # 磁盘缓存的默认容量上限（64x64 的缩略图约数KB，可缓存上万张）
+    DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, size: Tuple[int, int] = (64, 64), cache_dir: Optional[str] = None,
+                 workers: int = 2, max_cache_bytes: int = DEFAULT_CACHE_BYTES):
+        """
+        Args:
+            size: 缩略图最大尺寸
+            cache_dir: 磁盘缓存目录，默认为 default_thumbnail_dir()；无法创建时不使用磁盘缓存
+            workers: 生成缩略图的线程数
+            max_cache_bytes: 磁盘缓存的容量上限（字节），超过时淘汰最久未使用的缩略图
+        """
+        self.size = tuple(size)
+        self.max_cache_bytes = max_cache_bytes
+        self.cache_dir: Optional[str] = cache_dir or default_thumbnail_dir()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        except OSError as e:
+            print(f"警告: 无法创建缩略图缓存目录，将不使用磁盘缓存: {e}")
+            self.cache_dir = None
+
+        self._requests: queue.LifoQueue = queue.LifoQueue()  # 最近请求的（当前可见的）优先
+        self._results: queue.Queue = queue.Queue()
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._cache_bytes: Optional[int] = None  # 首次写入缓存时统计
+        self._stop_event = threading.Event()
+        self._threads = [threading.Thread(target=self._run, daemon=True) for _ in range(max(1, workers))]
+        for thread in self._threads:
+            thread.start()
+
+    def cache_path(self, image_path: str, stat: os.stat_result) -> Optional[str]:
+        """图片缩略图在磁盘缓存中的路径（文件修改后自动失效）"""
+        if self.cache_dir is None:
+            return None
+        key = f"{os.path.abspath(image_path)}|{stat.st_mtime_ns}|{stat.st_size}|{self.size[0]}x{self.size[1]}"
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.png')
+
+    def request(self, image_path: str) -> None:
+        """请求生成缩略图（同一图片未完成时重复请求会被忽略）"""
+        with self._lock:
+            if image_path in self._pending:
+                return
+            self._pending.add(image_path)
+        self._requests.put(image_path)
+
+    def poll(self, max_items: Optional[int] = None) -> List[Tuple[str, Optional[Image.Image]]]:
+        """
+        非阻塞地取出已生成的缩略图
+
+        Returns:
+            (图片路径, 缩略图) 列表，生成失败时缩略图为 None
+        """
+        items = []
+        while max_items is None or len(items) < max_items:
+            try:
+                items.append(self._results.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def load(self, image_path: str) -> Image.Image:
+        """读取缓存的缩略图，没有时生成并写入磁盘缓存"""
+        stat = os.stat(image_path)
+        cache_path = self.cache_path(image_path, stat)
+        if cache_path is not None and os.path.exists(cache_path):
+            try:
+                with Image.open(cache_path) as cached:
+                    thumbnail = cached.convert('RGB')
+                # 更新修改时间作为最近使用时间（访问时间常因 noatime 挂载选项不更新）
+                os.utime(cache_path)
+                return thumbnail
+            except OSError:
+                pass  # 缓存文件损坏或已被淘汰，重新生成
+
+        thumbnail = make_thumbnail(image_path, self.size)
+        if cache_path is not None:
+            temp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.part"
+            try:
+                thumbnail.save(temp_path, 'PNG')
+                os.replace(temp_path, cache_path)
+                self._account_cache(os.path.getsize(cache_path))
+            except OSError:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+        return thumbnail
+
+    def _cache_entries(self) -> List[Tuple[int, str, int]]:
+        """磁盘缓存中的缩略图 (修改时间, 路径, 大小) 列表"""
+        entries = []
+        with os.scandir(self.cache_dir) as items:
+            for item in items:
+                if item.name.endswith('.png'):
+                    try:
+                        stat = item.stat()
+                    except OSError:
+                        continue  # 已被其他线程或进程淘汰
+                    entries.append((stat.st_mtime_ns, item.path, stat.st_size))
+        return entries
+
+    def _account_cache(self, added: int) -> None:
+        """记录新写入的缩略图大小，超过容量上限时淘汰到上限的3/4，避免每次写入都清理"""
+        with self._cache_lock:
+            if self._cache_bytes is None:
+                self._cache_bytes = sum(size for _, _, size in self._cache_entries())
+            else:
+                self._cache_bytes += added
+            if self._cache_bytes > self.max_cache_bytes:
+                self._cache_bytes = self.prune_cache(self.max_cache_bytes * 3 // 4)
+
+    def prune_cache(self, max_bytes: Optional[int] = None) -> int:
+        """
+        按最近使用时间淘汰磁盘缓存中的缩略图，直到总大小不超过 max_bytes
+
+        Args:
+            max_bytes: 淘汰后的总大小上限，默认为 max_cache_bytes
+
+        Returns:
+            淘汰后缓存的总大小（字节）
+        """
+        if self.cache_dir is None:
+            return 0
+        if max_bytes is None:
+            max_bytes = self.max_cache_bytes
+        entries = sorted(self._cache_entries())
+        total = sum(size for _, _, size in entries)
+        for _, path, size in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        return total
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                image_path = self._requests.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if image_path is None:
+                break
+            try:
+                thumbnail = self.load(image_path)
+            except Exception:
+                thumbnail = None
+            with self._lock:
+                self._pending.discard(image_path)
+            self._results.put((image_path, thumbnail))
+
+    def shutdown(self) -> None:
+        """停止后台线程（正在生成的缩略图完成后退出）"""
+        self._stop_event.set()
+        for _ in self._threads:
+            self._requests.put(None)
@@ -3,24 +3,212 @@
 用于在图片上添加日期水印
 """
 
+import io
 import os
-from PIL import Image, ImageDraw, ImageFont
-from typing import Tuple, Optional, Union
-from enum import Enum
+import threading
+import time
+from functools import lru_cache
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple, Optional, Union, BinaryIO
 from pathlib import Path
 
+try:
+    from watermark_stamp import (render_text_stamp, load_logo_stamp,
+                                 render_text_tile, load_logo_tile, fill_tiled)
+    from watermark_spec import WatermarkPosition, WatermarkSpec, _resolve_font_file, parse_hex_color
+    from large_image import PNGStripWriter, frame_bytes, iter_strips, open_within_budget
+except ImportError:  # 以 src 包的方式导入时
+    from .watermark_stamp import (render_text_stamp, load_logo_stamp,
+                                  render_text_tile, load_logo_tile, fill_tiled)
+    from .watermark_spec import WatermarkPosition, WatermarkSpec, _resolve_font_file, parse_hex_color
+    from .large_image import PNGStripWriter, frame_bytes, iter_strips, open_within_budget
 
-class WatermarkPosition(Enum):
-    """水印位置枚举"""
-    TOP_LEFT = "top_left"
-    TOP_CENTER = "top_center"
-    TOP_RIGHT = "top_right"
-    CENTER_LEFT = "center_left"
-    CENTER = "center"
-    CENTER_RIGHT = "center_right"
-    BOTTOM_LEFT = "bottom_left"
-    BOTTOM_CENTER = "bottom_center"
-    BOTTOM_RIGHT = "bottom_right"
+
+@lru_cache(maxsize=128)
+def _load_truetype_font(font_file: str, font_size: int):
+    """加载并缓存指定字体文件与字号的字体对象"""
+    return ImageFont.truetype(font_file, font_size)
+
+
+@lru_cache(maxsize=1)
+def _load_default_font():
+    """加载并缓存PIL默认字体"""
+    return ImageFont.load_default()
+
+
+class Rendition:
+    """多尺寸导出中的一个输出尺寸"""
+    def __init__(self, size: Optional[int] = None, quality: Optional[int] = None,
+                 suffix: Optional[str] = None):
+        """
+        Args:
+            size: 输出长边像素，None 表示保持原尺寸
+            quality: 该尺寸的JPEG/WebP质量，None 表示使用全局质量
+            suffix: 文件名尺寸后缀，默认为 "_<size>"（原尺寸无后缀）
+        """
+        self.size = size
+        self.quality = quality
+        if suffix is None:
+            suffix = f"_{size}" if size else ""
+        self.suffix = suffix
+    
+    def target_size(self, original_size: Tuple[int, int]) -> Tuple[int, int]:
+        """计算该尺寸的输出大小（按长边等比缩放，不放大）"""
+        width, height = original_size
+        if not self.size or max(width, height) <= self.size:
+            return (width, height)
+        scale = self.size / max(width, height)
+        return (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+    
+    @classmethod
+    def parse_list(cls, spec: str) -> list:
+        """
+        解析多尺寸规格字符串，格式为逗号分隔的 "尺寸[:质量[:后缀]]"，
+        尺寸为长边像素或 full（原尺寸），例如 "2400:90,1200,400:80:_thumb,full"
+        """
+        renditions = []
+        for item in spec.split(','):
+            item = item.strip()
+            if not item:
+                continue
+            parts = item.split(':')
+            if len(parts) > 3:
+                raise ValueError(f"尺寸规格格式错误: {item}")
+            
+            size_str = parts[0].strip().lower()
+            if size_str in ('full', 'original', '0'):
+                size = None
+            else:
+                try:
+                    size = int(size_str)
+                except ValueError:
+                    raise ValueError(f"尺寸必须为正整数或 full: {item}")
+                if size <= 0:
+                    raise ValueError(f"尺寸必须为正整数或 full: {item}")
+            
+            quality = None
+            if len(parts) > 1 and parts[1].strip():
+                try:
+                    quality = int(parts[1])
+                except ValueError:
+                    raise ValueError(f"质量必须为 1-100 的整数: {item}")
+                if not (1 <= quality <= 100):
+                    raise ValueError(f"质量必须为 1-100 的整数: {item}")
+            
+            suffix = parts[2] if len(parts) > 2 else None
+            renditions.append(cls(size, quality, suffix))
+        
+        if not renditions:
+            raise ValueError("尺寸规格不能为空")
+        return renditions
+
+
+class BatchResult:
+    """单张图片的批处理结果"""
+    def __init__(self, index: int, image_path: str, date_text: str,
+                 output_path: Optional[str] = None, error: Optional[str] = None,
+                 output_paths: Optional[List[str]] = None,
+                 timings: Optional[Dict[str, float]] = None):
+        self.index = index
+        self.image_path = image_path
+        self.date_text = date_text
+        self.output_path = output_path
+        self.error = error
+        # 多尺寸导出时的全部输出路径
+        self.output_paths = output_paths if output_paths is not None else (
+            [output_path] if output_path else []
+        )
+        # 各阶段耗时（秒），如 {'render': 0.12, 'save': 0.05}
+        self.timings = timings or {}
+    
+    @property
+    def success(self) -> bool:
+        return self.error is None
+    
+    @property
+    def elapsed(self) -> float:
+        """处理这张图片的总耗时（秒）"""
+        return sum(self.timings.values())
+
+
+def item_output_dir(output_dir: str, image_path: str, source_root: Optional[str] = None) -> str:
+    """
+    计算单张图片的输出目录
+
+    指定 source_root 时，在输出目录下保留图片相对于 source_root 的子目录结构，
+    避免递归处理时不同子目录中的同名文件互相覆盖。
+    """
+    if not source_root:
+        return output_dir
+    rel_dir = os.path.relpath(os.path.dirname(os.path.abspath(image_path)), os.path.abspath(source_root))
+    if rel_dir == os.curdir or rel_dir.startswith(os.pardir):
+        return output_dir
+    return os.path.join(output_dir, rel_dir)
+
+
+class OutputNameRegistry:
+    """
+    批处理中已分配的输出文件名（可在多个线程中使用）
+    
+    同一批次中不同源图片生成相同的输出文件（如 a.jpg 与 a.png 都输出为 JPEG）时，
+    后出现的图片按输入顺序依次追加 _2、_3 等序号，避免互相覆盖；
+    序号只取决于输入顺序，重复运行时得到相同的文件名。
+    
+    输出目录中已有的文件同样视为已占用：每个目录在首次分配时用一次 os.scandir 读取
+    文件列表，之后只在内存中比较。已有文件属于同一源图片的上次输出时，先用 reserve()
+    登记，重新处理时覆盖原文件而不是另起序号。
+    """
+    
+    def __init__(self):
+        self._owners: Dict[Tuple[str, str], str] = {}
+        self._existing: Dict[str, set] = {}  # 目录 → 已有文件名（小写）
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _key(output_path: str) -> Tuple[str, str]:
+        # 按不区分大小写的文件名比较，兼容Windows与macOS的文件系统
+        directory, filename = os.path.split(os.path.abspath(output_path))
+        return directory, filename.lower()
+    
+    def _existing_names(self, directory: str) -> set:
+        """目录中已有的文件名（每个目录只读取一次，目录不存在时为空）"""
+        names = self._existing.get(directory)
+        if names is None:
+            try:
+                with os.scandir(directory) as entries:
+                    names = {entry.name.lower() for entry in entries}
+            except (FileNotFoundError, NotADirectoryError):
+                names = set()
+            self._existing[directory] = names
+        return names
+    
+    def reserve(self, output_path: str, image_path: str) -> None:
+        """将输出路径登记为源图片所有（如增量处理时跳过的图片或上次处理的输出），不检查冲突"""
+        with self._lock:
+            self._owners.setdefault(self._key(output_path), os.path.abspath(image_path))
+    
+    def claim(self, output_path: str, image_path: str) -> str:
+        """
+        为源图片登记输出路径
+        
+        Returns:
+            实际使用的输出路径（发生冲突时带序号）
+        """
+        directory = self._key(output_path)[0]
+        source = os.path.abspath(image_path)
+        stem, ext = os.path.splitext(os.path.basename(output_path))
+        with self._lock:
+            existing = self._existing_names(directory)
+            candidate, number = os.path.basename(output_path), 1
+            while True:
+                key = (directory, candidate.lower())
+                owner = self._owners.get(key)
+                if owner is None and candidate.lower() not in existing:
+                    self._owners[key] = owner = source
+                if owner == source:
+                    return output_path if number == 1 else os.path.join(os.path.dirname(output_path), candidate)
+                number += 1
+                candidate = f"{stem}_{number}{ext}"
 
 
 class WatermarkProcessor:
@@ -45,38 +233,90 @@ class WatermarkProcessor:
         Returns:
             调整后的图像
         """
-        if resize_mode == "none":
+        new_size = self.compute_resize_size(image.size, resize_mode, width, height, scale_percent)
+        if new_size is None:
             return image
-            
-        original_width, original_height = image.size
+        
+        # 使用高质量重采样
+        try:
+            return image.resize(new_size, Image.Resampling.LANCZOS)
+        except AttributeError:
+            # 兼容较旧版本的Pillow
+            return image.resize(new_size, Image.Resampling.LANCZOS)
+    
+    def compute_resize_size(self, original_size: Tuple[int, int], resize_mode: str = "none",
+                            width: Optional[int] = None, height: Optional[int] = None,
+                            scale_percent: Optional[float] = None) -> Optional[Tuple[int, int]]:
+        """计算缩放后的目标尺寸，不需要缩放时返回 None"""
+        original_width, original_height = original_size
         
         if resize_mode == "width" and width:
             # 按宽度缩放，保持宽高比
             scale_ratio = width / original_width
             new_height = int(original_height * scale_ratio)
-            new_size = (width, new_height)
+            return (width, max(1, new_height))
             
         elif resize_mode == "height" and height:
             # 按高度缩放，保持宽高比
             scale_ratio = height / original_height
             new_width = int(original_width * scale_ratio)
-            new_size = (new_width, height)
+            return (max(1, new_width), height)
             
         elif resize_mode == "percent" and scale_percent:
             # 按百分比缩放
             new_width = int(original_width * scale_percent)
             new_height = int(original_height * scale_percent)
-            new_size = (new_width, new_height)
-            
-        else:
-            return image
+            return (max(1, new_width), max(1, new_height))
         
-        # 使用高质量重采样
+        return None
+    
+    def load_image(self, image_source: Union[str, BinaryIO, Image.Image],
+                   target_size: Optional[Tuple[int, int]] = None) -> Image.Image:
+        """
+        打开图片并统一转换为RGB或RGBA模式
+        
+        Args:
+            image_source: 图片路径、图片文件对象或已打开的图像
+            target_size: 目标尺寸（可选）。指定时，JPEG使用draft模式按2的幂次
+                缩小解码，再高质量缩放到目标尺寸
+                
+        Returns:
+            RGB或RGBA模式的图像
+        """
         try:
-            return image.resize(new_size, Image.Resampling.LANCZOS)
-        except AttributeError:
-            # 兼容较旧版本的Pillow
-            return image.resize(new_size, Image.Resampling.LANCZOS)
+            if isinstance(image_source, Image.Image):
+                image = image_source
+            else:
+                image = Image.open(image_source)
+            
+            # JPEG草稿模式：解码时直接按1/2、1/4、1/8缩小，减少解码耗时与内存
+            if target_size is not None and image.format == 'JPEG':
+                image.draft(image.mode, target_size)
+            
+            working_mode = self._working_mode(image)
+            if image.mode != working_mode:
+                image = image.convert(working_mode)
+            else:
+                # 显式解码：未解码的文件图像被标记为只读，首次 paste 会先解码再复制一份整帧
+                image.load()
+        except Exception as e:
+            raise ValueError(f"无法打开图片文件 {image_source}: {e}")
+        
+        if target_size is not None and image.size != tuple(target_size):
+            # reducing_gap 先用整数倍缩小再做LANCZOS重采样，兼顾速度与质量
+            image = image.resize(target_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        
+        return image
+    
+    def _working_mode(self, image: Image.Image) -> str:
+        """
+        图片统一转换后的模式（只根据文件头信息判断，不解码）：
+        带透明信息的调色板与灰度图片转换为RGBA，其余不常见模式转换为RGB
+        """
+        has_transparency = 'transparency' in image.info or image.mode in ('RGBA', 'LA')
+        if image.mode == 'RGBA' or (image.mode in ('P', 'L', 'LA') and has_transparency):
+            return 'RGBA'
+        return 'RGB'
     
     def get_text_size(self, text: str, font) -> Tuple[int, int]:
         """获取文本在指定字体下的尺寸"""
@@ -126,72 +366,57 @@ class WatermarkProcessor:
         return positions.get(position, positions[WatermarkPosition.BOTTOM_RIGHT])
     
     def get_font(self, font_size: int, font_path: Optional[str] = None, font_style: Optional[dict[str, bool]] = None):
-        """获取字体对象"""
+        """获取字体对象（字体文件解析结果与字体对象均在进程内缓存）"""
         try:
-            # 处理字体样式
             if font_style:
                 # 这里我们尝试通过字体文件名来支持粗体和斜体
                 # 在实际应用中，可能需要更复杂的字体匹配逻辑
-                if font_path and os.path.exists(font_path):
-                    return ImageFont.truetype(font_path, font_size)
-                else:
-                    # 尝试使用系统默认字体
-                    try:
-                        # Windows系统尝试使用微软雅黑
-                        font_name = "msyh.ttc"
-                        if font_style.get('bold') and font_style.get('italic'):
-                            font_name = "msyhbd.ttc"  # 粗体+斜体
-                        elif font_style.get('bold'):
-                            font_name = "msyhbd.ttc"  # 粗体
-                        elif font_style.get('italic'):
-                            # Windows微软雅黑斜体可能需要其他处理
-                            pass
-                        return ImageFont.truetype(font_name, font_size)
-                    except OSError:
-                        try:
-                            # 尝试使用Arial字体
-                            font_name = "arial.ttf"
-                            if font_style.get('bold') and font_style.get('italic'):
-                                font_name = "arialbi.ttf"  # 粗体+斜体
-                            elif font_style.get('bold'):
-                                font_name = "arialbd.ttf"  # 粗体
-                            elif font_style.get('italic'):
-                                font_name = "ariali.ttf"   # 斜体
-                            return ImageFont.truetype(font_name, font_size)
-                        except OSError:
-                            # 如果都失败，使用PIL默认字体
-                            return ImageFont.load_default()
+                bold = bool(font_style.get('bold'))
+                italic = bool(font_style.get('italic'))
             else:
-                if font_path and os.path.exists(font_path):
-                    return ImageFont.truetype(font_path, font_size)
-                else:
-                    # 尝试使用系统默认字体
-                    try:
-                        # Windows系统尝试使用微软雅黑
-                        return ImageFont.truetype("msyh.ttc", font_size)
-                    except OSError:
-                        try:
-                            # 尝试使用Arial字体
-                            return ImageFont.truetype("arial.ttf", font_size)
-                        except OSError:
-                            # 如果都失败，使用PIL默认字体
-                            return ImageFont.load_default()
+                bold = italic = None
+            
+            return self.load_font_file(_resolve_font_file(font_path, bold, italic), font_size)
         except Exception:
-            return ImageFont.load_default()
+            return _load_default_font()
+    
+    def load_font_file(self, font_file: Optional[str], font_size: int):
+        """加载已解析的字体文件（None 或加载失败时使用PIL默认字体）"""
+        if font_file is None:
+            return _load_default_font()
+        try:
+            return _load_truetype_font(font_file, font_size)
+        except Exception:
+            return _load_default_font()
     
     def hex_to_rgb(self, hex_color: str) -> Tuple[int, int, int]:
         """将十六进制颜色转换为RGB元组"""
-        hex_color = hex_color.lstrip('#')
-        if len(hex_color) != 6:
-            raise ValueError("颜色格式错误，请使用#RRGGBB格式")
+        return parse_hex_color(hex_color)
+    
+    def make_spec(self, spec: Optional[WatermarkSpec] = None, **options) -> WatermarkSpec:
+        """
+        返回水印设置：已提供 spec 时直接使用，否则由旧接口的关键字参数创建
+        （颜色格式错误时与以往一样提示并使用默认颜色）
         
+        Raises:
+            ValueError: 其余设置不合法时
+        """
+        if spec is not None:
+            return spec
         try:
-            rgb_tuple = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-            return (rgb_tuple[0], rgb_tuple[1], rgb_tuple[2])
+            parse_hex_color(options.get('color', '#FFFFFF'))
         except ValueError:
-            raise ValueError("颜色格式错误，请使用#RRGGBB格式")
+            print(f"颜色格式错误，使用默认白色: {options['color']}")
+            options['color'] = '#FFFFFF'
+        if options.get('stroke'):
+            try:
+                parse_hex_color(options.get('stroke_color', '#000000'))
+            except ValueError:
+                print(f"描边颜色格式错误，使用默认黑色: {options['stroke_color']}")
+                options['stroke_color'] = '#000000'
+        return WatermarkSpec.from_options(**options)
     
-    def add_watermark(self, image_path: str, date_text: str, 
+    def add_watermark(self, image_path: Union[str, BinaryIO, Image.Image], date_text: str, 
                      font_size: int = 36, color: str = "#FFFFFF", 
                      position: WatermarkPosition = WatermarkPosition.BOTTOM_RIGHT,
                      font_path: Optional[str] = None,
@@ -202,12 +427,17 @@ class WatermarkProcessor:
                      stroke: bool = False,
                      image_watermark_path: Optional[str] = None,
                      image_watermark_scale: float = 1.0,
-                     rotation: float = 0.0) -> Image.Image:
+                     rotation: float = 0.0,
+                     stroke_width: Optional[int] = None,
+                     stroke_color: str = "#000000",
+                     layout_scale: float = 1.0,
+                     spec: Optional[WatermarkSpec] = None) -> Image.Image:
         """
         在图片上添加水印
         
         Args:
-            image_path: 图片路径
+            image_path: 图片路径、已读入内存的图片文件对象（如 BytesIO）或已打开的图像
+                （传入RGB/RGBA图像时会在其上原地绘制）
             date_text: 水印文本（日期）
             font_size: 字体大小
             color: 文字颜色（十六进制格式，如#FFFFFF）
@@ -221,203 +451,247 @@ class WatermarkProcessor:
             image_watermark_path: 图片水印路径（可选）
             image_watermark_scale: 图片水印缩放比例（0.0-1.0）
             rotation: 水印旋转角度（度）
+            stroke_width: 描边宽度（像素），默认按字体大小自动计算
+            stroke_color: 描边颜色（十六进制格式）
+            layout_scale: 布局缩放系数。图片已预先缩放时，字体大小、边距、
+                描边宽度与图片水印大小按此系数等比例缩放
+            spec: 预先验证的水印设置，指定时忽略其余水印参数
             
         Returns:
             带水印的PIL图像对象
         """
+        spec = self.make_spec(
+            spec, font_size=font_size, color=color, position=position, font_path=font_path,
+            opacity=opacity, custom_text=custom_text, font_style=font_style, shadow=shadow,
+            stroke=stroke, image_watermark_path=image_watermark_path,
+            image_watermark_scale=image_watermark_scale, rotation=rotation,
+            stroke_width=stroke_width, stroke_color=stroke_color
+        )
+        
         # 打开图片
-        try:
-            image = Image.open(image_path)
-            original_mode = image.mode
-            has_transparency = 'transparency' in image.info or original_mode in ('RGBA', 'LA')
-            
-            # 处理不同的图像模式
-            if original_mode == 'P':  # 调色板模式
-                if has_transparency:
-                    image = image.convert('RGBA')
-                else:
-                    image = image.convert('RGB')
-            elif original_mode in ('L', 'LA'):  # 灰度模式
-                if has_transparency or original_mode == 'LA':
-                    image = image.convert('RGBA')
-                else:
-                    image = image.convert('RGB')
-            elif original_mode in ('1', 'P'):
-                image = image.convert('RGB')
-            elif original_mode not in ('RGB', 'RGBA'):
-                # 其他不常见模式，尝试转换为RGB
-                image = image.convert('RGB')
-        except Exception as e:
-            raise ValueError(f"无法打开图片文件 {image_path}: {e}")
+        image = self.load_image(image_path)
+        
+        if spec.position is WatermarkPosition.TILE:
+            tile, solid_fill = self._build_tile(date_text, spec, layout_scale)
+            return self.composite_tiled(image, tile, solid_fill)
+        
+        sprite, (x, y), solid_fill = self._build_watermark(image.size, date_text, spec, layout_scale)
+        
+        if solid_fill is not None:
+            # 直接以图章的alpha通道为遮罩在图片上填充文字颜色
+            image.paste(solid_fill, (x, y), sprite.getchannel('A'))
+        else:
+            # 需要旋转、透明度、特效或图片水印时，在水印覆盖的区域内进行alpha合成
+            image = self.composite_sprite(image, sprite, (x, y))
+        
+        return image
+    
+    def render_watermark_sprite(self, image_size: Tuple[int, int], date_text: str,
+                                font_size: int = 36, color: str = "#FFFFFF",
+                                position: WatermarkPosition = WatermarkPosition.BOTTOM_RIGHT,
+                                font_path: Optional[str] = None,
+                                opacity: float = 1.0,
+                                custom_text: Optional[str] = None,
+                                font_style: Optional[dict[str, bool]] = None,
+                                shadow: bool = False,
+                                stroke: bool = False,
+                                image_watermark_path: Optional[str] = None,
+                                image_watermark_scale: float = 1.0,
+                                rotation: float = 0.0,
+                                stroke_width: Optional[int] = None,
+                                stroke_color: str = "#000000",
+                                layout_scale: float = 1.0,
+                                spec: Optional[WatermarkSpec] = None) -> Tuple[Image.Image, Tuple[int, int]]:
+        """
+        只渲染水印本身，不读取也不修改图片，供预览以独立图层叠加显示
+        
+        参数与 add_watermark 相同，image_size 为水印所在图片的尺寸。
+        
+        Returns:
+            (RGBA水印图像, 水印左上角在图片中的坐标)。水印图像为只读共享对象，
+            坐标可能超出图片边界
+        """
+        spec = self.make_spec(
+            spec, font_size=font_size, color=color, position=position, font_path=font_path,
+            opacity=opacity, custom_text=custom_text, font_style=font_style, shadow=shadow,
+            stroke=stroke, image_watermark_path=image_watermark_path,
+            image_watermark_scale=image_watermark_scale, rotation=rotation,
+            stroke_width=stroke_width, stroke_color=stroke_color
+        )
+        sprite, position, _ = self._build_watermark(image_size, date_text, spec, layout_scale)
+        return sprite, position
+    
+    def _build_watermark(self, image_size: Tuple[int, int], date_text: str, spec: WatermarkSpec,
+                         layout_scale: float = 1.0
+                         ) -> Tuple[Image.Image, Tuple[int, int], Optional[Tuple[int, int, int]]]:
+        """
+        生成水印图像及其位置
         
-        # 判断是否需要保持透明通道
-        preserve_alpha = image.mode == 'RGBA'
+        Returns:
+            (RGBA水印图像, 左上角坐标, 纯色填充颜色)。纯色填充颜色不为 None 时，
+            水印为不透明、无特效的文字，可直接以alpha通道为遮罩填充该颜色
+        """
+        if spec.position is WatermarkPosition.TILE:
+            # 平铺水印覆盖整张图片
+            tile, solid_fill = self._build_tile(date_text, spec, layout_scale)
+            return fill_tiled(tile, image_size), (0, 0), solid_fill
+        
+        font_size, margin, image_watermark_scale, stroke_width = self._scaled_layout(spec, layout_scale)
         
         # 如果提供了图片水印路径，则使用图片水印
-        if image_watermark_path and os.path.exists(image_watermark_path):
+        if spec.image_watermark_path and os.path.exists(spec.image_watermark_path):
             try:
-                # 打开水印图片
-                watermark_image = Image.open(image_watermark_path)
-                
-                # 转换为RGBA模式以支持透明通道
-                if watermark_image.mode != 'RGBA':
-                    watermark_image = watermark_image.convert('RGBA')
-                
-                # 根据缩放比例调整水印图片大小
-                if image_watermark_scale != 1.0:
-                    original_size = watermark_image.size
-                    new_size = (int(original_size[0] * image_watermark_scale), int(original_size[1] * image_watermark_scale))
-                    watermark_image = watermark_image.resize(new_size, Image.Resampling.LANCZOS)
-                
-                # 应用水印旋转
-                if rotation != 0:
-                    watermark_image = watermark_image.rotate(rotation, expand=True)
-                
-                # 应用水印透明度
-                if opacity < 1.0:
-                    # 分离alpha通道并调整透明度
-                    alpha = watermark_image.split()[-1]  # 获取alpha通道
-                    alpha = alpha.point(lambda p: int(p * opacity))  # 调整透明度
-                    watermark_image.putalpha(alpha)
+                # 获取缓存的水印图片（已按缩放比例、旋转角度与透明度处理）
+                watermark_image = load_logo_stamp(
+                    spec.image_watermark_path, image_watermark_scale, spec.rotation, spec.opacity
+                )
                 
                 # 计算水印位置
-                img_width, img_height = image.size
-                wm_width, wm_height = watermark_image.size
-                x, y = self.calculate_position(image.size, watermark_image.size, position)
-                
-                # 创建临时图像用于粘贴水印
-                if image.mode != 'RGBA':
-                    temp_image = image.convert('RGBA')
-                else:
-                    temp_image = image.copy()
-                
-                # 粘贴水印图片
-                temp_image.paste(watermark_image, (x, y), watermark_image)
-                
-                # 如果原图不是RGBA模式，转换回原模式
-                if image.mode != 'RGBA':
-                    if image.mode == 'RGB':
-                        image = temp_image.convert('RGB')
-                    elif image.mode == 'P':
-                        image = temp_image.convert('P')
-                    else:
-                        image = temp_image.convert(image.mode)
-                else:
-                    image = temp_image
-                
-                return image
+                x, y = self.calculate_position(image_size, watermark_image.size, spec.position, margin)
+                return watermark_image, (x, y), None
                 
             except Exception as e:
                 print(f"处理图片水印时出错: {e}")
                 # 如果图片水印处理失败，继续使用文本水印
                 pass
         
-        # 创建绘图对象
-        draw = ImageDraw.Draw(image)
+        # 获取字体（字体文件已在创建设置时解析）
+        font = self.load_font_file(spec.font_file, font_size)
         
-        # 获取字体
-        font = self.get_font(font_size, font_path, font_style)
+        # 确定使用的文本
+        watermark_text = spec.custom_text if spec.custom_text is not None else date_text
         
-        # 应用字体样式（如果需要）
-        if font_style:
-            # 注意：PIL的字体样式支持有限，这里只是预留接口
-            pass
+        # 获取预渲染的水印图章（相同文本与样式在批处理中只渲染一次）
+        shadow_offset = max(1, font_size // 20) if spec.shadow else 0  # 阴影偏移量
+        stamp = render_text_stamp(watermark_text, font, spec.rgb_color, spec.alpha,
+                                  shadow_offset, stroke_width, spec.rotation, spec.stroke_rgb)
         
-        # 确定使用的文本
-        watermark_text = custom_text if custom_text is not None else date_text
+        # 计算文本位置
+        text_position = self.calculate_position(image_size, stamp.text_size, spec.position, margin)
+        paste_position = stamp.paste_position(text_position)
         
-        # 转换颜色
-        try:
-            rgb_color = self.hex_to_rgb(color)
-        except ValueError:
-            print(f"颜色格式错误，使用默认白色: {color}")
-            rgb_color = (255, 255, 255)
-        
-        # 如果需要旋转或透明度，创建带alpha通道的颜色
-        if opacity < 1.0 or shadow or stroke or rotation != 0:
-            alpha = int(255 * opacity) if opacity < 1.0 else 255
-            rgba_color = rgb_color + (alpha,)
-            
-            # 创建透明水印层
-            watermark_layer = Image.new('RGBA', image.size, (0, 0, 0, 0))
-            watermark_draw = ImageDraw.Draw(watermark_layer)
-            
-            # 计算文本位置
-            text_size = self.get_text_size(watermark_text, font)
-            text_position = self.calculate_position(image.size, text_size, position)
-            
-            # 如果需要旋转，创建旋转的文本图像
-            if rotation != 0:
-                # 创建一个足够大的图像来容纳旋转后的文本
-                text_img = Image.new('RGBA', (text_size[0] * 2, text_size[1] * 2), (0, 0, 0, 0))
-                text_draw = ImageDraw.Draw(text_img)
-                
-                # 在文本图像上绘制文本
-                text_draw.text((text_size[0] // 2, text_size[1] // 2), watermark_text, font=font, fill=rgba_color)
-                
-                # 旋转文本图像
-                rotated_text = text_img.rotate(rotation, expand=True)
-                
-                # 计算旋转后文本的中心位置
-                rotated_width, rotated_height = rotated_text.size
-                center_x = text_position[0] + text_size[0] // 2
-                center_y = text_position[1] + text_size[1] // 2
-                paste_x = center_x - rotated_width // 2
-                paste_y = center_y - rotated_height // 2
-                
-                # 添加阴影效果
-                if shadow:
-                    shadow_offset = max(1, font_size // 20)  # 阴影偏移量
-                    shadow_color = (0, 0, 0, int(alpha * 0.5))  # 半透明黑色阴影
-                    shadow_text = text_img.rotate(rotation, expand=True)
-                    shadow_draw = ImageDraw.Draw(shadow_text)
-                    shadow_draw.text((text_size[0] // 2 + shadow_offset, text_size[1] // 2 + shadow_offset), 
-                                   watermark_text, font=font, fill=shadow_color)
-                    watermark_layer.paste(shadow_text, (int(paste_x + shadow_offset), int(paste_y + shadow_offset)), shadow_text)
-                
-                # 粘贴旋转后的文本到水印层
-                watermark_layer.paste(rotated_text, (int(paste_x), int(paste_y)), rotated_text)
+        solid_fill = spec.rgb_color if spec.is_solid_text else None
+        return stamp.sprite, paste_position, solid_fill
+    
+    def _scaled_layout(self, spec: WatermarkSpec, layout_scale: float = 1.0
+                       ) -> Tuple[int, int, float, int]:
+        """按布局缩放系数调整尺寸相关参数，返回 (字体大小, 边距, 图片水印缩放比例, 描边宽度)"""
+        font_size = spec.font_size
+        margin = 20
+        image_watermark_scale = spec.image_watermark_scale
+        stroke_width = spec.effective_stroke_width
+        if layout_scale != 1.0:
+            font_size = max(1, int(round(font_size * layout_scale)))
+            margin = max(0, int(round(margin * layout_scale)))
+            image_watermark_scale = image_watermark_scale * layout_scale
+            if not spec.stroke:
+                stroke_width = 0
+            elif spec.stroke_width is None:
+                stroke_width = max(1, font_size // 30)  # 默认描边宽度按缩放后的字号计算
             else:
-                # 添加阴影效果
-                if shadow:
-                    shadow_offset = max(1, font_size // 20)  # 阴影偏移量
-                    shadow_color = (0, 0, 0, int(alpha * 0.5))  # 半透明黑色阴影
-                    watermark_draw.text((text_position[0] + shadow_offset, text_position[1] + shadow_offset), 
-                                      watermark_text, font=font, fill=shadow_color)
-                
-                # 添加描边效果
-                if stroke:
-                    stroke_color = (0, 0, 0, alpha)  # 黑色描边
-                    stroke_width = max(1, font_size // 30)  # 描边宽度
-                    # 绘制多个方向的描边
-                    for dx in range(-stroke_width, stroke_width + 1):
-                        for dy in range(-stroke_width, stroke_width + 1):
-                            if dx != 0 or dy != 0:
-                                watermark_draw.text((text_position[0] + dx, text_position[1] + dy), 
-                                                  watermark_text, font=font, fill=stroke_color)
-                
-                # 在透明层上绘制文本
-                watermark_draw.text(text_position, watermark_text, font=font, fill=rgba_color)
+                stroke_width = max(1, int(round(spec.stroke_width * layout_scale)))
+        return font_size, margin, image_watermark_scale, stroke_width
+    
+    def _build_tile(self, date_text: str, spec: WatermarkSpec, layout_scale: float = 1.0
+                    ) -> Tuple[Image.Image, Optional[Tuple[int, int, int]]]:
+        """
+        生成平铺水印的无缝图块（按设置缓存，同一批次只渲染一次）
+        
+        Returns:
+            (RGBA图块, 纯色填充颜色)，纯色填充颜色的含义同 _build_watermark
+        """
+        font_size, _, image_watermark_scale, stroke_width = self._scaled_layout(spec, layout_scale)
+        spacing = max(0, int(round(spec.tile_spacing * layout_scale)))
+        
+        if spec.image_watermark_path and os.path.exists(spec.image_watermark_path):
+            try:
+                tile = load_logo_tile(spec.image_watermark_path, image_watermark_scale,
+                                      spec.tile_angle, spec.opacity, spacing)
+                return tile, None
+            except Exception as e:
+                print(f"处理图片水印时出错: {e}")
+                # 如果图片水印处理失败，继续使用文本水印
+        
+        font = self.load_font_file(spec.font_file, font_size)
+        watermark_text = spec.custom_text if spec.custom_text is not None else date_text
+        shadow_offset = max(1, font_size // 20) if spec.shadow else 0
+        tile = render_text_tile(watermark_text, font, spec.rgb_color, spec.alpha, shadow_offset,
+                                stroke_width, spec.tile_angle, spec.stroke_rgb, spacing)
+        
+        # 没有阴影与描边时图块中只有文字一种颜色（透明度与旋转都体现在alpha通道中），
+        # 可直接以alpha通道为遮罩填充文字颜色
+        solid_fill = spec.rgb_color if not (shadow_offset or stroke_width) else None
+        return tile, solid_fill
+    
+    def composite_tiled(self, image: Image.Image, tile: Image.Image,
+                        solid_fill: Optional[Tuple[int, int, int]] = None) -> Image.Image:
+        """
+        将平铺图块按行带铺满整张图片并逐带合成
+        
+        只生成一条与图片同宽、高为图块高度的图层，自上而下逐带 paste/alpha_composite，
+        共约 图片高度/图块高度 次调用。与一次性生成整张图片大小的RGBA图层（纯色时为L遮罩）
+        相比，结果逐像素一致，而大图上省去了一份整帧图层的内存，调用次数带来的开销很小。
+        
+        Args:
+            image: RGB或RGBA模式的图片（原地修改）
+            tile: RGBA模式的无缝图块
+            solid_fill: 纯色填充颜色，指定时只铺满图块的alpha通道作为遮罩
             
-            # 将透明层合并到原图
-            if not preserve_alpha:
-                image = image.convert('RGBA')
-            image = Image.alpha_composite(image, watermark_layer)
+        Returns:
+            合成后的图片，模式与输入相同
+        """
+        band = fill_tiled(tile.getchannel('A') if solid_fill is not None else tile,
+                          (image.width, tile.height))
+        for top in range(0, image.height, tile.height):
+            if top + band.height > image.height:
+                band = band.crop((0, 0, image.width, image.height - top))
+            if solid_fill is not None:
+                image.paste(solid_fill, (0, top, image.width, top + band.height), band)
+            elif image.mode == 'RGBA':
+                image.alpha_composite(band, dest=(0, top))
+            else:
+                image.paste(band, (0, top), band)
+        return image
+    
+    def composite_sprite(self, image: Image.Image, sprite: Image.Image,
+                         position: Tuple[int, int]) -> Image.Image:
+        """
+        将RGBA水印合成到图片上，只混合水印覆盖的区域，
+        内存与耗时取决于水印大小而不是照片大小
+        
+        Args:
+            image: RGB或RGBA模式的图片（原地修改）
+            sprite: RGBA模式的水印图像
+            position: 水印左上角在图片中的坐标（可以超出图片边界）
             
-            # 如果原图不是透明的，可以选择转回RGB
-            if not preserve_alpha:
-                # 这里保持RGBA，让用户在保存时选择格式
-                pass
-        else:
-            # 直接在图片上绘制文本
-            text_size = self.get_text_size(watermark_text, font)
-            text_position = self.calculate_position(image.size, text_size, position)
-            draw.text(text_position, watermark_text, font=font, fill=rgb_color)
+        Returns:
+            合成后的图片，模式与输入相同
+        """
+        x, y = position
+        box = (max(0, x), max(0, y),
+               min(image.width, x + sprite.width), min(image.height, y + sprite.height))
+        if box[0] >= box[2] or box[1] >= box[3]:
+            return image  # 水印完全位于图片之外
         
+        if image.mode == 'RGBA':
+            source = (box[0] - x, box[1] - y, box[2] - x, box[3] - y)
+            image.alpha_composite(sprite, dest=box[:2], source=source)
+        else:
+            # 不透明底图上以水印的alpha通道为遮罩混合，结果与转换为RGBA后合成一致，
+            # 但不产生任何RGBA副本
+            image.paste(sprite, (x, y), sprite)
         return image
     
     def create_output_directory(self, input_path: str) -> str:
         """创建输出目录"""
+        output_dir = self.default_output_directory(input_path)
+        
+        # 创建目录
+        os.makedirs(output_dir, exist_ok=True)
+        return output_dir
+    
+    def default_output_directory(self, input_path: str) -> str:
+        """默认输出目录的路径（不创建目录）"""
         if os.path.isfile(input_path):
             # 如果输入是文件，在文件所在目录创建输出目录
             parent_dir = os.path.dirname(input_path)
@@ -426,14 +700,11 @@ class WatermarkProcessor:
             # 如果输入是目录，在该目录下创建输出目录
             dir_name = os.path.basename(os.path.abspath(input_path))
             output_dir = os.path.join(input_path, dir_name + "_watermark")
-        
-        # 创建目录
-        os.makedirs(output_dir, exist_ok=True)
         return output_dir
     
     def generate_output_filename(self, original_path: str, naming_rule: str = "suffix",
                                 custom_prefix: str = "wm_", custom_suffix: str = "_watermarked",
-                                output_format: str = "auto") -> str:
+                                output_format: str = "auto", rendition_suffix: str = "") -> str:
         """
         生成输出文件名
         
@@ -443,6 +714,7 @@ class WatermarkProcessor:
             custom_prefix: 自定义前缀
             custom_suffix: 自定义后缀
             output_format: 输出格式
+            rendition_suffix: 多尺寸导出时追加在扩展名之前的尺寸后缀
             
         Returns:
             输出文件名
@@ -474,6 +746,10 @@ class WatermarkProcessor:
             # 默认使用后缀
             output_filename = name + custom_suffix + ext
         
+        if rendition_suffix:
+            stem, ext = os.path.splitext(output_filename)
+            output_filename = stem + rendition_suffix + ext
+        
         return output_filename
     
     def validate_output_directory(self, input_path: str, output_dir: str) -> bool:
@@ -501,11 +777,106 @@ class WatermarkProcessor:
         except Exception:
             return True  # 如果无法判断，允许继续
     
+    def get_save_format(self, output_filename: str) -> str:
+        """根据输出文件扩展名决定保存格式"""
+        _, ext = os.path.splitext(output_filename)
+        if ext.lower() in ['.jpg', '.jpeg']:
+            return 'JPEG'
+        elif ext.lower() == '.png':
+            return 'PNG'
+        elif ext.lower() in ['.tiff', '.tif']:
+            return 'TIFF'
+        elif ext.lower() == '.bmp':
+            return 'BMP'
+        elif ext.lower() == '.webp':
+            return 'WEBP'
+        else:
+            return 'JPEG'  # 默认
+    
+    def prepare_image_for_format(self, image: Image.Image, save_format: str) -> Image.Image:
+        """将图像转换为目标格式可保存的模式"""
+        if save_format == 'JPEG':
+            # JPEG不支持透明通道，需要转换
+            if image.mode in ('RGBA', 'LA'):
+                # 创建白色背景
+                background = Image.new('RGB', image.size, (255, 255, 255))
+                if image.mode == 'RGBA':
+                    background.paste(image, mask=image.getchannel('A'))  # 使用alpha通道作为遮罩
+                else:
+                    background.paste(image)
+                return background
+            elif image.mode != 'RGB':
+                return image.convert('RGB')
+        elif save_format == 'PNG':
+            # PNG支持透明通道
+            if image.mode not in ('RGBA', 'RGB', 'L', 'LA', 'P'):
+                return image.convert('RGBA')
+        elif save_format == 'BMP':
+            # BMP不支持透明通道
+            if image.mode in ('RGBA', 'LA'):
+                return image.convert('RGB')
+        # TIFF、WebP支持多种模式，直接保存
+        return image
+    
+    def get_save_options(self, save_format: str, quality: int = 95) -> dict:
+        """获取保存格式对应的编码参数"""
+        if save_format in ('JPEG', 'WEBP'):
+            return {'quality': quality}
+        return {}
+    
+    def encode_watermarked_image(self, image: Image.Image, original_path: str,
+                                 output_format: str = "auto", quality: int = 95,
+                                 naming_rule: str = "suffix", custom_prefix: str = "wm_",
+                                 custom_suffix: str = "_watermarked") -> Tuple[str, bytes]:
+        """
+        将带水印的图片编码为内存中的文件数据，不写入磁盘
+        
+        Returns:
+            (输出文件名, 编码后的文件数据)
+        """
+        output_filename = self.generate_output_filename(
+            original_path, naming_rule, custom_prefix, custom_suffix, output_format
+        )
+        try:
+            save_format = self.get_save_format(output_filename)
+            image = self.prepare_image_for_format(image, save_format)
+            buffer = io.BytesIO()
+            image.save(buffer, save_format, **self.get_save_options(save_format, quality))
+            return output_filename, buffer.getvalue()
+        except Exception as e:
+            raise ValueError(f"编码图片失败 {output_filename}: {e}")
+    
+    @staticmethod
+    def write_output_file(output_path: str, write: Callable[[BinaryIO], None]) -> None:
+        """
+        原子地写入输出文件：先写入同目录下的临时文件，完整写入后再替换为目标文件，
+        进程中途被终止时不会留下截断的输出图片
+        
+        Args:
+            output_path: 输出文件路径
+            write: 向已打开的二进制文件写入内容的函数
+        """
+        directory, filename = os.path.split(output_path)
+        # 临时文件名包含进程与线程标识，多个写入者互不冲突
+        temp_path = os.path.join(directory, f".{filename}.{os.getpid()}.{threading.get_ident()}.part")
+        try:
+            with open(temp_path, 'wb') as f:
+                write(f)
+            os.replace(temp_path, output_path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+    
     def save_watermarked_image(self, image: Image.Image, original_path: str, 
                               output_dir: str, output_format: str = "auto",
                               quality: int = 95, naming_rule: str = "suffix",
                               custom_prefix: str = "wm_", 
-                              custom_suffix: str = "_watermarked") -> str:
+                              custom_suffix: str = "_watermarked",
+                              rendition_suffix: str = "",
+                              output_filename: Optional[str] = None) -> str:
         """
         保存带水印的图片
         
@@ -518,69 +889,30 @@ class WatermarkProcessor:
             naming_rule: 命名规则 ("original", "prefix", "suffix")
             custom_prefix: 自定义前缀
             custom_suffix: 自定义后缀
+            rendition_suffix: 多尺寸导出时的尺寸后缀
+            output_filename: 指定输出文件名（如批处理中已避开重名的文件名），
+                指定时忽略命名相关参数
         
         Returns:
             输出文件路径
         """
         # 生成输出文件名
-        output_filename = self.generate_output_filename(
-            original_path, naming_rule, custom_prefix, custom_suffix, output_format
-        )
+        if output_filename is None:
+            output_filename = self.generate_output_filename(
+                original_path, naming_rule, custom_prefix, custom_suffix, output_format,
+                rendition_suffix
+            )
         output_path = os.path.join(output_dir, output_filename)
         
         # 确保输出目录存在
         os.makedirs(output_dir, exist_ok=True)
         
-        # 决定保存格式
-        _, ext = os.path.splitext(output_filename)
-        if ext.lower() in ['.jpg', '.jpeg']:
-            save_format = 'JPEG'
-        elif ext.lower() == '.png':
-            save_format = 'PNG'
-        elif ext.lower() in ['.tiff', '.tif']:
-            save_format = 'TIFF'
-        elif ext.lower() == '.bmp':
-            save_format = 'BMP'
-        elif ext.lower() == '.webp':
-            save_format = 'WEBP'
-        else:
-            save_format = 'JPEG'  # 默认
-        
         # 保存图片
         try:
-            if save_format == 'JPEG':
-                # JPEG不支持透明通道，需要转换
-                if image.mode in ('RGBA', 'LA'):
-                    # 创建白色背景
-                    background = Image.new('RGB', image.size, (255, 255, 255))
-                    if image.mode == 'RGBA':
-                        background.paste(image, mask=image.split()[3])  # 使用alpha通道作为遮罩
-                    else:
-                        background.paste(image)
-                    image = background
-                elif image.mode != 'RGB':
-                    image = image.convert('RGB')
-                image.save(output_path, save_format, quality=quality)
-            elif save_format == 'PNG':
-                # PNG支持透明通道
-                if image.mode not in ('RGBA', 'RGB', 'L', 'LA', 'P'):
-                    image = image.convert('RGBA')
-                image.save(output_path, save_format)
-            elif save_format == 'TIFF':
-                # TIFF支持多种模式
-                image.save(output_path, save_format)
-            elif save_format == 'BMP':
-                # BMP不支持透明通道
-                if image.mode in ('RGBA', 'LA'):
-                    image = image.convert('RGB')
-                image.save(output_path, save_format)
-            elif save_format == 'WEBP':
-                # WebP支持透明通道
-                image.save(output_path, save_format, quality=quality)
-            else:
-                # 默认情况
-                image.save(output_path, save_format)
-            
+            save_format = self.get_save_format(output_filename)
+            image = self.prepare_image_for_format(image, save_format)
+            save_options = self.get_save_options(save_format, quality)
+            self.write_output_file(output_path, lambda f: image.save(f, save_format, **save_options))
             return output_path
         except Exception as e:
             raise ValueError(f"保存图片失败 {output_path}: {e}")
@@ -695,25 +1027,454 @@ class WatermarkProcessor:
                            stroke: bool = False,
                            image_watermark_path: Optional[str] = None,
                            image_watermark_scale: float = 1.0,
-                           rotation: float = 0.0) -> str:
-        """处理单张图片"""
+                           rotation: float = 0.0,
+                           stroke_width: Optional[int] = None,
+                           stroke_color: str = "#000000",
+                           spec: Optional[WatermarkSpec] = None) -> str:
+        """处理单张图片（指定 spec 时忽略其余水印、尺寸与输出参数）"""
+        spec = self.make_spec(
+            spec, font_size=font_size, color=color, position=position, font_path=font_path,
+            opacity=opacity, output_format=output_format, quality=quality,
+            naming_rule=naming_rule, custom_prefix=custom_prefix, custom_suffix=custom_suffix,
+            resize_mode=resize_mode, resize_width=resize_width, resize_height=resize_height,
+            resize_percent=resize_percent, custom_text=custom_text, font_style=font_style,
+            shadow=shadow, stroke=stroke, image_watermark_path=image_watermark_path,
+            image_watermark_scale=image_watermark_scale, rotation=rotation,
+            stroke_width=stroke_width, stroke_color=stroke_color
+        )
+        watermarked_image = self.render_watermarked_image(image_path, date_text, spec=spec)
+        
+        # 保存图片
+        output_path = self.save_watermarked_image(
+            watermarked_image, image_path, output_dir, spec.output_format,
+            spec.quality, spec.naming_rule, spec.custom_prefix, spec.custom_suffix
+        )
+        
+        return output_path
+    
+    def render_watermarked_image(self, image_source: Union[str, BinaryIO], date_text: str,
+                                 font_size: int = 36, color: str = "#FFFFFF",
+                                 position: WatermarkPosition = WatermarkPosition.BOTTOM_RIGHT,
+                                 font_path: Optional[str] = None,
+                                 opacity: float = 1.0,
+                                 resize_mode: str = "none",
+                                 resize_width: Optional[int] = None,
+                                 resize_height: Optional[int] = None,
+                                 resize_percent: Optional[float] = None,
+                                 custom_text: Optional[str] = None,
+                                 font_style: Optional[dict[str, bool]] = None,
+                                 shadow: bool = False,
+                                 stroke: bool = False,
+                                 image_watermark_path: Optional[str] = None,
+                                 image_watermark_scale: float = 1.0,
+                                 rotation: float = 0.0,
+                                 stroke_width: Optional[int] = None,
+                                 stroke_color: str = "#000000",
+                                 spec: Optional[WatermarkSpec] = None) -> Image.Image:
+        """添加水印并按需调整尺寸，返回待保存的图像（指定 spec 时忽略其余参数）"""
+        spec = self.make_spec(
+            spec, font_size=font_size, color=color, position=position, font_path=font_path,
+            opacity=opacity, resize_mode=resize_mode, resize_width=resize_width,
+            resize_height=resize_height, resize_percent=resize_percent,
+            custom_text=custom_text, font_style=font_style, shadow=shadow, stroke=stroke,
+            image_watermark_path=image_watermark_path,
+            image_watermark_scale=image_watermark_scale, rotation=rotation,
+            stroke_width=stroke_width, stroke_color=stroke_color
+        )
+        
+        if spec.resize_mode != "none":
+            # 先缩放再添加水印：只读取文件头获得原始尺寸，按目标尺寸解码与缩放，
+            # 再在输出分辨率上按比例排布水印
+            opened = not isinstance(image_source, Image.Image)
+            try:
+                source = Image.open(image_source) if opened else image_source
+            except Exception as e:
+                raise ValueError(f"无法打开图片文件 {image_source}: {e}")
+            target_size = self.compute_resize_size(
+                source.size, spec.resize_mode, spec.resize_width, spec.resize_height,
+                spec.resize_percent
+            )
+            if target_size is not None:
+                layout_scale = target_size[0] / source.size[0]
+                resized = self.load_image(source, target_size)
+                if opened and resized is not source:
+                    source.close()  # 合成水印前释放整帧解码的原图
+                return self.add_watermark(resized, date_text, layout_scale=layout_scale, spec=spec)
+            image_source = source
+        
         # 添加水印
-        watermarked_image = self.add_watermark(
-            image_path, date_text, font_size, color, position, font_path, opacity,
-            custom_text, font_style, shadow, stroke, image_watermark_path, image_watermark_scale,
-            rotation  # 新增旋转参数
+        return self.add_watermark(image_source, date_text, spec=spec)
+    
+    def render_single_image(self, image_data: bytes, original_path: str, date_text: str,
+                            output_format: str = "auto", quality: int = 95,
+                            naming_rule: str = "suffix", custom_prefix: str = "wm_",
+                            custom_suffix: str = "_watermarked",
+                            spec: Optional[WatermarkSpec] = None,
+                            **watermark_options) -> Tuple[str, bytes]:
+        """
+        处理已读入内存的单张图片（解码、渲染、编码），不访问磁盘
+        
+        Args:
+            image_data: 原始图片文件数据
+            original_path: 原始文件路径（用于生成输出文件名）
+            date_text: 水印文本（日期）
+            spec: 预先验证的设置，指定时忽略其余参数
+            **watermark_options: 透传给 render_watermarked_image 的水印与尺寸参数
+            
+        Returns:
+            (输出文件名, 编码后的文件数据)
+        """
+        spec = self.make_spec(
+            spec, output_format=output_format, quality=quality, naming_rule=naming_rule,
+            custom_prefix=custom_prefix, custom_suffix=custom_suffix, **watermark_options
+        )
+        watermarked_image = self.render_watermarked_image(io.BytesIO(image_data), date_text, spec=spec)
+        return self.encode_watermarked_image(
+            watermarked_image, original_path, spec.output_format, spec.quality,
+            spec.naming_rule, spec.custom_prefix, spec.custom_suffix
         )
+    
+    # 分条处理时每行像素的临时内存系数（条带副本、合成区域、水印图层与PNG滤波缓冲）
+    STRIP_ROW_FACTOR = 6
+    # 单个条带的目标大小：条带再大也不会更快，只会抬高内存峰值
+    STRIP_TARGET_BYTES = 16 * 1024 * 1024
+    
+    def process_in_strips(self, image_path: str, date_text: str, output_dir: str,
+                          spec: WatermarkSpec, output_filename: Optional[str] = None) -> str:
+        """
+        在内存上限（spec.max_memory）内处理并保存单张图片，输出与普通处理一致
+        
+        原图整帧解码后按水平条带处理：每个条带单独转换模式、合成水印（只处理与水印相交的条带）
+        并转换为输出格式所需的模式。PNG 输出逐条带压缩写入文件；其余格式在原图上原地合成，
+        原图模式与输出模式不同时写入一个输出图像。条带高度按扣除整帧图像后剩余的内存计算。
         
-        # 调整图片尺寸
-        if resize_mode != "none":
-            watermarked_image = self.resize_image(
-                watermarked_image, resize_mode, resize_width, resize_height, resize_percent
+        Args:
+            image_path: 图片路径
+            date_text: 水印文本（日期）
+            output_dir: 输出目录
+            spec: 设置了 max_memory 的水印设置
+            output_filename: 指定输出文件名，默认按命名规则生成
+            
+        Returns:
+            输出文件路径
+            
+        Raises:
+            ValueError: 图片无法打开、整帧解码所需内存超过上限或保存失败时
+        """
+        budget = spec.max_memory * 1024 * 1024
+        if output_filename is None:
+            output_filename = self.generate_output_filename(
+                image_path, spec.naming_rule, spec.custom_prefix, spec.custom_suffix,
+                spec.output_format
             )
+        output_path = os.path.join(output_dir, output_filename)
+        save_format = self.get_save_format(output_filename)
         
-        # 保存图片
-        output_path = self.save_watermarked_image(
-            watermarked_image, image_path, output_dir, output_format, 
-            quality, naming_rule, custom_prefix, custom_suffix
+        try:
+            source = open_within_budget(image_path)
+        except Exception as e:
+            raise ValueError(f"无法打开图片文件 {image_path}: {e}")
+        
+        with source:
+            original_size = source.size
+            target_size = None
+            if spec.resize_mode != "none":
+                target_size = self.compute_resize_size(
+                    source.size, spec.resize_mode, spec.resize_width, spec.resize_height,
+                    spec.resize_percent
+                )
+            working_mode = self._working_mode(source)
+            output_mode = self.prepare_image_for_format(Image.new(working_mode, (1, 1)), save_format).mode
+            streaming = save_format == 'PNG'
+            
+            # Pillow 只能整帧解码（JPEG 缩小时按 draft 模式降低解码尺寸），解码结果必须能放进上限；
+            # 此检查在解码前进行，代替打开时跳过的解压缩炸弹检查
+            if target_size is not None and source.format == 'JPEG':
+                source.draft(source.mode, target_size)
+            size = target_size or source.size
+            resident = frame_bytes(source.size, source.mode)
+            if target_size is not None:
+                resident += frame_bytes(target_size, working_mode)
+            in_place = target_size is None and source.mode == working_mode == output_mode
+            if not (streaming or in_place):
+                resident += frame_bytes(size, output_mode)
+            if resident > budget:
+                raise ValueError(f"图片 {os.path.basename(image_path)} ({original_size[0]}x{original_size[1]}) "
+                                 f"需要约 {resident // (1024 * 1024)} MB 内存，超过上限 {spec.max_memory} MB")
+            row_bytes = size[0] * 4
+            strip_height = max(1, min((budget - resident) // (row_bytes * self.STRIP_ROW_FACTOR),
+                                      self.STRIP_TARGET_BYTES // row_bytes))
+            
+            try:
+                if target_size is not None:
+                    image = self.load_image(source, target_size)
+                else:
+                    source.load()
+                    image = source
+            except Exception as e:
+                raise ValueError(f"无法打开图片文件 {image_path}: {e}")
+            layout_scale = size[0] / original_size[0] if target_size is not None else 1.0
+            
+            # 水印只生成一次，按条带位置合成
+            if spec.position is WatermarkPosition.TILE:
+                tile, solid_fill = self._build_tile(date_text, spec, layout_scale)
+                sprite_box = (0, 0) + size
+            else:
+                sprite, (x, y), solid_fill = self._build_watermark(size, date_text, spec, layout_scale)
+                sprite_box = (x, y, x + sprite.width, y + sprite.height)
+                mask = sprite.getchannel('A') if solid_fill is not None else None
+            
+            def watermark_strip(strip: Image.Image, top: int) -> Image.Image:
+                if spec.position is WatermarkPosition.TILE:
+                    # 图块按条带的纵向位置错开相位，条带拼接后与整帧平铺一致
+                    phase = top % tile.height
+                    return self.composite_tiled(
+                        strip, ImageChops.offset(tile, 0, -phase) if phase else tile, solid_fill
+                    )
+                if solid_fill is not None:
+                    strip.paste(solid_fill, (x, y - top), mask)
+                    return strip
+                return self.composite_sprite(strip, sprite, (x, y - top))
+            
+            def process_strips(write_strip: Optional[Callable[[Image.Image, tuple], None]]) -> None:
+                for box in iter_strips(size, strip_height):
+                    touches = (sprite_box[1] < box[3] and sprite_box[3] > box[1]
+                               and sprite_box[0] < box[2] and sprite_box[2] > 0)
+                    if write_strip is None:
+                        # 原地合成：跳过与水印不相交的条带
+                        if touches:
+                            image.paste(watermark_strip(image.crop(box), box[1]), box[:2])
+                        continue
+                    strip = self.load_image(image.crop(box))
+                    if touches:
+                        strip = watermark_strip(strip, box[1])
+                    write_strip(self.prepare_image_for_format(strip, save_format), box)
+                    del strip
+            
+            os.makedirs(output_dir, exist_ok=True)
+            try:
+                if streaming:
+                    def write_png(f: BinaryIO) -> None:
+                        writer = PNGStripWriter(f, size, output_mode,
+                                                icc_profile=image.info.get('icc_profile'))
+                        process_strips(lambda strip, box: writer.write_strip(strip))
+                        writer.close()
+                    self.write_output_file(output_path, write_png)
+                    return output_path
+                
+                if in_place:
+                    process_strips(None)
+                    output = image
+                else:
+                    output = Image.new(output_mode, size)
+                    output.info = dict(image.info)
+                    process_strips(lambda strip, box: output.paste(strip, box[:2]))
+                    image = None  # 编码前释放原图
+                save_options = self.get_save_options(save_format, spec.quality)
+                self.write_output_file(output_path, lambda f: output.save(f, save_format, **save_options))
+                return output_path
+            except Exception as e:
+                raise ValueError(f"保存图片失败 {output_path}: {e}")
+    
+    def process_renditions(self, image_path: str, date_text: str, output_dir: str,
+                           renditions: list, output_format: str = "auto",
+                           quality: int = 95, naming_rule: str = "suffix",
+                           custom_prefix: str = "wm_", custom_suffix: str = "_watermarked",
+                           spec: Optional[WatermarkSpec] = None,
+                           output_filenames: Optional[List[str]] = None,
+                           image_source: Optional[BinaryIO] = None, **watermark_options) -> list:
+        """
+        一次解码，导出多个尺寸的水印图片
+        
+        各尺寸按从大到小的顺序级联缩放（每一级从上一级未加水印的图像缩放得到），
+        水印在每个尺寸上按比例单独排布。
+        
+        Args:
+            image_path: 图片路径
+            date_text: 水印文本（日期）
+            output_dir: 输出目录
+            renditions: Rendition 列表
+            spec: 预先验证的设置，指定时忽略其余参数（其中的尺寸调整设置不使用）
+            output_filenames: 各尺寸的输出文件名（与 renditions 顺序一致），默认按命名规则生成
+            image_source: 已读入内存的图片文件（可选），默认从 image_path 读取
+            **watermark_options: 透传给 add_watermark 的水印参数
+            
+        Returns:
+            各尺寸输出文件路径列表（与 renditions 顺序一致）
+        """
+        spec = self.make_spec(
+            spec, output_format=output_format, quality=quality, naming_rule=naming_rule,
+            custom_prefix=custom_prefix, custom_suffix=custom_suffix, **watermark_options
         )
+        try:
+            source = Image.open(image_source if image_source is not None else image_path)
+        except Exception as e:
+            raise ValueError(f"无法打开图片文件 {image_path}: {e}")
+        original_size = source.size
+        
+        # 按输出尺寸从大到小排序，以便级联缩放
+        order = sorted(range(len(renditions)),
+                       key=lambda i: renditions[i].target_size(original_size)[0], reverse=True)
+        targets = [renditions[i].target_size(original_size) for i in order]
+        
+        # 最大尺寸小于原图时，JPEG可直接以草稿模式缩小解码
+        largest = targets[0]
+        current = self.load_image(source, None if largest == original_size else largest)
+        if current is not source:
+            source.close()  # 各尺寸都由 current 级联缩放得到，提前释放解码的原图
         
-        return output_path
\ No newline at end of file
+        output_paths = [None] * len(renditions)
+        for step, index in enumerate(order):
+            rendition = renditions[index]
+            target = targets[step]
+            if current.size != target:
+                current = current.resize(target, Image.Resampling.LANCZOS, reducing_gap=3.0)
+            
+            # 先准备下一级的底图，再在当前图像上原地绘制水印
+            next_base = None
+            if step + 1 < len(order):
+                next_target = targets[step + 1]
+                if next_target != current.size:
+                    next_base = current.resize(next_target, Image.Resampling.LANCZOS, reducing_gap=3.0)
+                else:
+                    next_base = current.copy()
+            
+            watermarked = self.add_watermark(
+                current, date_text, layout_scale=target[0] / original_size[0], spec=spec
+            )
+            output_paths[index] = self.save_watermarked_image(
+                watermarked, image_path, output_dir, spec.output_format,
+                rendition.quality or spec.quality, spec.naming_rule, spec.custom_prefix,
+                spec.custom_suffix, rendition.suffix,
+                output_filenames[index] if output_filenames else None
+            )
+            current = next_base
+        
+        return output_paths
+    
+    def plan_output_filenames(self, image_path: str, spec: WatermarkSpec, output_dir: str,
+                              renditions: Optional[list] = None,
+                              names: Optional[OutputNameRegistry] = None) -> List[str]:
+        """
+        确定一张图片的输出文件名（多尺寸导出时每个尺寸一个）
+        
+        Args:
+            names: 批处理的输出文件名登记，指定时避开批次内其他图片已使用的文件名
+        """
+        suffixes = [rendition.suffix for rendition in renditions] if renditions else [""]
+        filenames = []
+        for suffix in suffixes:
+            filename = self.generate_output_filename(
+                image_path, spec.naming_rule, spec.custom_prefix, spec.custom_suffix,
+                spec.output_format, suffix
+            )
+            if names is not None:
+                filename = os.path.basename(names.claim(os.path.join(output_dir, filename), image_path))
+            filenames.append(filename)
+        return filenames
+    
+    def process_item(self, index: int, image_path: str, date_text: str, output_dir: str,
+                     spec: WatermarkSpec, renditions: Optional[list] = None,
+                     output_filenames: Optional[List[str]] = None,
+                     image_data: Optional[bytes] = None) -> BatchResult:
+        """
+        处理批次中的一张图片，异常被捕获并记录在结果中
+        
+        Args:
+            index: 图片在批次中的序号
+            output_dir: 这张图片的输出目录
+            spec: 水印设置
+            renditions: 多尺寸导出的 Rendition 列表（可选）
+            output_filenames: 预先确定的输出文件名，默认按命名规则生成
+            image_data: 预先读入的文件数据（如流水线的读取线程），默认从 image_path 读取；
+                内存受限模式始终从文件分条处理
+            
+        Returns:
+            带各阶段耗时的 BatchResult
+        """
+        timings = {}
+        start = time.perf_counter()
+        try:
+            if spec.max_memory and not renditions:
+                # 内存受限模式：分条处理，合成与编码交错进行，耗时统一计入 render
+                output_path = self.process_in_strips(
+                    image_path, date_text, output_dir, spec,
+                    output_filenames[0] if output_filenames else None
+                )
+                timings['render'] = time.perf_counter() - start
+                return BatchResult(index, image_path, date_text, output_path=output_path, timings=timings)
+            
+            if renditions:
+                # 多尺寸导出：一次解码，输出多个尺寸
+                output_paths = self.process_renditions(
+                    image_path, date_text, output_dir, renditions, spec=spec,
+                    output_filenames=output_filenames,
+                    image_source=io.BytesIO(image_data) if image_data is not None else None
+                )
+                timings['render'] = time.perf_counter() - start
+                return BatchResult(index, image_path, date_text, output_path=output_paths[0],
+                                   output_paths=output_paths, timings=timings)
+            
+            watermarked_image = self.render_watermarked_image(
+                io.BytesIO(image_data) if image_data is not None else image_path, date_text, spec=spec
+            )
+            saved = time.perf_counter()
+            timings['render'] = saved - start
+            output_path = self.save_watermarked_image(
+                watermarked_image, image_path, output_dir, spec.output_format,
+                spec.quality, spec.naming_rule, spec.custom_prefix, spec.custom_suffix,
+                output_filename=output_filenames[0] if output_filenames else None
+            )
+            timings['save'] = time.perf_counter() - saved
+            return BatchResult(index, image_path, date_text, output_path=output_path, timings=timings)
+        except Exception as e:
+            timings.setdefault('render', time.perf_counter() - start)
+            return BatchResult(index, image_path, date_text, error=str(e), timings=timings)
+    
+    def process_batch(self, image_date_pairs: Iterable[Tuple[str, str]], spec: WatermarkSpec,
+                      output_dir: str, source_root: Optional[str] = None,
+                      renditions: Optional[list] = None, jobs: int = 1,
+                      runner=None, names: Optional[OutputNameRegistry] = None,
+                      pipeline: bool = False) -> Iterator[BatchResult]:
+        """
+        批量处理图片，命令行与图形界面共用的处理入口
+        
+        同一批次共享：只验证一次的水印设置、进程内缓存的字体/图章/图片水印，
+        以及输出文件名登记（批次内重名的输出文件自动追加序号）。
+        
+        Args:
+            image_date_pairs: (图片路径, 日期) 序列，可以是流式生成器
+            spec: 水印设置
+            output_dir: 输出目录
+            source_root: 输入根目录，指定时在输出目录中保留图片的相对子目录结构
+            renditions: 多尺寸导出的 Rendition 列表（可选）
+            jobs: 并行进程数，为1时在当前进程内串行处理
+            runner: 并行执行器（BatchProcessor），用于控制暂停与取消；指定时忽略 jobs
+            names: 输出文件名登记，可预先登记不在本批次中处理的图片已有的输出（如增量处理时跳过的图片）
+            pipeline: 是否使用读取线程预取文件数据的流水线（BatchProcessor.process_pipelined）
+            
+        Returns:
+            按输入顺序排列的 BatchResult 迭代器，包含每张图片的耗时与错误
+        """
+        if runner is None and (jobs > 1 or pipeline):
+            try:
+                from batch_processor import BatchProcessor
+            except ImportError:  # 以 src 包的方式导入时
+                from .batch_processor import BatchProcessor
+            runner = BatchProcessor(jobs=jobs)
+        if runner is not None:
+            run = runner.process_pipelined if pipeline else runner.process
+            return run(image_date_pairs, output_dir, source_root=source_root,
+                       spec=spec, renditions=renditions, names=names)
+        return self._iter_batch(image_date_pairs, spec, output_dir, source_root, renditions,
+                                names if names is not None else OutputNameRegistry())
+    
+    def _iter_batch(self, image_date_pairs: Iterable[Tuple[str, str]], spec: WatermarkSpec,
+                    output_dir: str, source_root: Optional[str], renditions: Optional[list],
+                    names: OutputNameRegistry) -> Iterator[BatchResult]:
+        """在当前进程内串行处理批次"""
+        for index, (image_path, date_text) in enumerate(image_date_pairs, 1):
+            target_dir = item_output_dir(output_dir, image_path, source_root)
+            output_filenames = self.plan_output_filenames(image_path, spec, target_dir, renditions, names)
+            yield self.process_item(index, image_path, date_text, target_dir, spec,
+                                    renditions, output_filenames)
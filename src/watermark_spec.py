@@ -0,0 +1,255 @@
+"""
+水印设置模块
+将水印、尺寸调整与输出相关的全部设置封装为不可变、可哈希、可序列化的 WatermarkSpec，
+参数只在创建时验证与转换一次（颜色、位置、字体文件等），批处理中的每张图片直接复用
+"""
+
+import os
+from dataclasses import dataclass, field, fields
+from enum import Enum
+from functools import lru_cache
+from typing import Optional, Tuple, Union
+
+from PIL import ImageFont
+
+
+class WatermarkPosition(Enum):
+    """水印位置枚举"""
+    TOP_LEFT = "top_left"
+    TOP_CENTER = "top_center"
+    TOP_RIGHT = "top_right"
+    CENTER_LEFT = "center_left"
+    CENTER = "center"
+    CENTER_RIGHT = "center_right"
+    BOTTOM_LEFT = "bottom_left"
+    BOTTOM_CENTER = "bottom_center"
+    BOTTOM_RIGHT = "bottom_right"
+    TILE = "tile"  # 在整张图片上错位平铺重复的水印
+
+
+def _font_candidates(bold: Optional[bool], italic: Optional[bool]) -> list:
+    """按优先级列出系统字体候选文件；bold/italic 为 None 表示未指定字体样式"""
+    if bold is None and italic is None:
+        return ["msyh.ttc", "arial.ttf"]
+
+    # Windows系统尝试使用微软雅黑
+    msyh = "msyh.ttc"
+    if bold:
+        msyh = "msyhbd.ttc"  # 粗体（微软雅黑没有斜体，粗斜体同样使用粗体）
+
+    # 尝试使用Arial字体
+    arial = "arial.ttf"
+    if bold and italic:
+        arial = "arialbi.ttf"  # 粗体+斜体
+    elif bold:
+        arial = "arialbd.ttf"  # 粗体
+    elif italic:
+        arial = "ariali.ttf"   # 斜体
+    return [msyh, arial]
+
+
+@lru_cache(maxsize=64)
+def _resolve_font_file(font_path: Optional[str], bold: Optional[bool],
+                       italic: Optional[bool]) -> Optional[str]:
+    """
+    解析实际可用的字体文件，结果在进程内缓存，
+    避免每张图片都重复探测失败的候选字体。返回 None 表示使用PIL默认字体
+    """
+    if font_path and os.path.exists(font_path):
+        return font_path
+
+    for candidate in _font_candidates(bold, italic):
+        try:
+            ImageFont.truetype(candidate, 12)
+            return candidate
+        except OSError:
+            continue
+    return None
+
+
+def parse_hex_color(hex_color: str) -> Tuple[int, int, int]:
+    """将 #RRGGBB 格式的颜色转换为RGB元组"""
+    hex_color = str(hex_color).lstrip('#')
+    if len(hex_color) != 6:
+        raise ValueError("颜色格式错误，请使用#RRGGBB格式")
+
+    try:
+        return (int(hex_color[0:2], 16), int(hex_color[2:4], 16), int(hex_color[4:6], 16))
+    except ValueError:
+        raise ValueError("颜色格式错误，请使用#RRGGBB格式")
+
+
+RESIZE_MODES = ("none", "width", "height", "percent")
+NAMING_RULES = ("original", "prefix", "suffix")
+OUTPUT_FORMATS = ("auto", "jpeg", "png")
+
+
+@dataclass(frozen=True)
+class WatermarkSpec:
+    """
+    一次处理任务的全部设置（水印外观、尺寸调整与输出）
+
+    创建时完成验证，并预先计算派生值（RGB颜色、字体文件、描边宽度等）；
+    对象不可变且可哈希，可直接作为缓存键，也可低成本地发送到工作进程
+    （序列化时只包含设置本身，派生值在接收方重新计算）。
+
+    Raises:
+        ValueError: 设置不合法时
+    """
+    # 水印外观
+    font_size: int = 36
+    color: str = "#FFFFFF"
+    position: WatermarkPosition = WatermarkPosition.BOTTOM_RIGHT
+    font_path: Optional[str] = None
+    opacity: float = 1.0
+    custom_text: Optional[str] = None
+    bold: bool = False
+    italic: bool = False
+    shadow: bool = False
+    stroke: bool = False
+    stroke_width: Optional[int] = None
+    stroke_color: str = "#000000"
+    image_watermark_path: Optional[str] = None
+    image_watermark_scale: float = 1.0
+    rotation: float = 0.0
+    # 平铺模式（position 为 TILE 时使用）：水印之间的间距（像素）与每个水印的旋转角度（代替 rotation）
+    tile_spacing: int = 100
+    tile_angle: float = 30.0
+    # 尺寸调整
+    resize_mode: str = "none"
+    resize_width: Optional[int] = None
+    resize_height: Optional[int] = None
+    resize_percent: Optional[float] = None
+    # 输出
+    output_format: str = "auto"
+    quality: int = 95
+    naming_rule: str = "suffix"
+    custom_prefix: str = "wm_"
+    custom_suffix: str = "_watermarked"
+    # 单张图片处理的内存上限（MB），设置后按水平条带处理大图；不影响输出结果
+    max_memory: Optional[int] = None
+
+    # 派生值（不参与比较与哈希）
+    rgb_color: Tuple[int, int, int] = field(init=False, repr=False, compare=False)
+    stroke_rgb: Tuple[int, int, int] = field(init=False, repr=False, compare=False)
+    alpha: int = field(init=False, repr=False, compare=False)
+    font_file: Optional[str] = field(init=False, repr=False, compare=False)
+    effective_stroke_width: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        def normalize(name, value):
+            object.__setattr__(self, name, value)
+
+        normalize('font_size', int(self.font_size))
+        normalize('opacity', float(self.opacity))
+        normalize('image_watermark_scale', float(self.image_watermark_scale))
+        normalize('rotation', float(self.rotation))
+        normalize('tile_spacing', int(self.tile_spacing))
+        normalize('tile_angle', float(self.tile_angle))
+        normalize('quality', int(self.quality))
+        normalize('output_format', str(self.output_format).lower())
+        if not isinstance(self.position, WatermarkPosition):
+            normalize('position', parse_position(self.position))
+
+        if self.font_size < 1:
+            raise ValueError("字体大小必须大于 0")
+        if not (0.0 <= self.opacity <= 1.0):
+            raise ValueError("透明度必须在 0.0 到 1.0 之间")
+        if not (1 <= self.quality <= 100):
+            raise ValueError("JPEG质量必须在 1 到 100 之间")
+        if self.max_memory is not None:
+            normalize('max_memory', int(self.max_memory))
+            if self.max_memory < 1:
+                raise ValueError("内存上限必须大于 0 MB")
+        if self.tile_spacing < 0:
+            raise ValueError("平铺间距不能为负数")
+        if self.stroke_width is not None and int(self.stroke_width) < 1:
+            raise ValueError("描边宽度必须大于等于 1")
+        if self.resize_mode not in RESIZE_MODES:
+            raise ValueError(f"不支持的缩放模式: {self.resize_mode}")
+        if self.naming_rule not in NAMING_RULES:
+            raise ValueError(f"不支持的命名规则: {self.naming_rule}")
+        if self.output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"不支持的输出格式: {self.output_format}")
+
+        # 派生值
+        normalize('rgb_color', parse_hex_color(self.color))
+        normalize('stroke_rgb', parse_hex_color(self.stroke_color) if self.stroke else (0, 0, 0))
+        normalize('alpha', int(255 * self.opacity) if self.opacity < 1.0 else 255)
+        normalize('font_file', _resolve_font_file(self.font_path, self.bold, self.italic))
+        if not self.stroke:
+            stroke_width = 0
+        elif self.stroke_width is None:
+            stroke_width = max(1, self.font_size // 30)  # 默认描边宽度
+        else:
+            stroke_width = int(self.stroke_width)
+        normalize('effective_stroke_width', stroke_width)
+
+    def __reduce__(self):
+        # 只序列化设置本身，派生值在反序列化时重新计算
+        return (self.__class__, tuple(getattr(self, f.name) for f in fields(self) if f.init))
+
+    @property
+    def font_style(self) -> Optional[dict]:
+        """与旧接口兼容的字体样式字典，未设置样式时为 None"""
+        style = {}
+        if self.bold:
+            style['bold'] = True
+        if self.italic:
+            style['italic'] = True
+        return style or None
+
+    @property
+    def is_solid_text(self) -> bool:
+        """是否为不透明、无特效的文字水印（可直接以遮罩填充颜色）"""
+        return not (self.opacity < 1.0 or self.shadow or self.stroke or self.rotation != 0)
+
+    def to_options(self) -> dict:
+        """转换为旧接口使用的关键字参数（字体样式为 font_style 字典）"""
+        options = {f.name: getattr(self, f.name) for f in fields(self)
+                   if f.init and f.name not in ('bold', 'italic')}
+        options['font_style'] = self.font_style
+        return options
+
+    @classmethod
+    def from_options(cls, font_style: Optional[dict] = None, **options) -> 'WatermarkSpec':
+        """
+        从旧接口的关键字参数创建设置
+
+        Args:
+            font_style: 字体样式字典，支持 'bold', 'italic' 键
+            **options: 其余与 WatermarkSpec 字段同名的参数，值为 None 的参数使用默认值
+        """
+        if font_style:
+            options.setdefault('bold', bool(font_style.get('bold')))
+            options.setdefault('italic', bool(font_style.get('italic')))
+        names = {f.name for f in fields(cls) if f.init}
+        unknown = set(options) - names
+        if unknown:
+            raise TypeError(f"未知的水印参数: {', '.join(sorted(unknown))}")
+        return cls(**{name: value for name, value in options.items() if value is not None})
+
+
+def parse_position(value: Union[str, WatermarkPosition]) -> WatermarkPosition:
+    """将位置名称（英文或中文）转换为位置枚举"""
+    if isinstance(value, WatermarkPosition):
+        return value
+    position = _POSITION_NAMES.get(str(value).lower().strip())
+    if position is None:
+        raise ValueError(f"未识别的水印位置: {value}")
+    return position
+
+
+_POSITION_NAMES = {position.value: position for position in WatermarkPosition}
+_POSITION_NAMES.update({
+    '左上': WatermarkPosition.TOP_LEFT,
+    '上中': WatermarkPosition.TOP_CENTER,
+    '右上': WatermarkPosition.TOP_RIGHT,
+    '左中': WatermarkPosition.CENTER_LEFT,
+    '居中': WatermarkPosition.CENTER,
+    '右中': WatermarkPosition.CENTER_RIGHT,
+    '左下': WatermarkPosition.BOTTOM_LEFT,
+    '下中': WatermarkPosition.BOTTOM_CENTER,
+    '右下': WatermarkPosition.BOTTOM_RIGHT,
+    '平铺': WatermarkPosition.TILE,
+})
@@ -0,0 +1,213 @@
+"""
+水印图章模块
+将文本水印（含阴影、描边、旋转）预渲染为紧凑的RGBA图章，
+并缓存解码后的图片水印（Logo）及其缩放/旋转/透明度变体与平铺图块，供批量处理复用
+"""
+
+import os
+from functools import lru_cache
+from typing import Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+
+class WatermarkStamp:
+    """
+    预渲染的文本水印图章
+
+    sprite 为只读共享对象，使用方只能粘贴/合成，不能原地修改。
+    """
+    def __init__(self, sprite: Image.Image, offset: Tuple[int, int], text_size: Tuple[int, int]):
+        self.sprite = sprite          # RGBA 图章
+        self.offset = offset          # 图章左上角相对于文本定位点的偏移
+        self.text_size = text_size    # 用于 calculate_position 的文本尺寸
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.sprite.size
+
+    def paste_position(self, text_position: Tuple[int, int]) -> Tuple[int, int]:
+        """根据 calculate_position 计算出的文本坐标，返回图章的粘贴坐标"""
+        return text_position[0] + self.offset[0], text_position[1] + self.offset[1]
+
+
+@lru_cache(maxsize=64)
+def render_text_stamp(text: str, font, color: Tuple[int, int, int], alpha: int = 255,
+                      shadow_offset: int = 0, stroke_width: int = 0,
+                      rotation: float = 0.0,
+                      stroke_color: Tuple[int, int, int] = (0, 0, 0)) -> WatermarkStamp:
+    """
+    渲染文本水印图章，相同的文本与样式参数只渲染一次
+
+    Args:
+        text: 水印文本
+        font: 字体对象
+        color: 文字颜色 RGB
+        alpha: 文字透明度 (0-255)
+        shadow_offset: 阴影偏移量，0 表示无阴影
+        stroke_width: 描边宽度，0 表示无描边
+        rotation: 旋转角度（度）
+        stroke_color: 描边颜色 RGB
+
+    Returns:
+        WatermarkStamp 图章对象
+    """
+    measure = ImageDraw.Draw(Image.new('RGB', (1, 1)))
+    left, top, right, bottom = measure.textbbox((0, 0), text, font=font)
+    text_size = (int(right - left), int(bottom - top))
+
+    # 为阴影和描边预留边距
+    pad = max(shadow_offset, stroke_width)
+    width = int(right - left) + 2 * pad
+    height = int(bottom - top) + 2 * pad
+    origin = (pad - int(left), pad - int(top))  # 文本绘制原点在图章中的位置
+
+    sprite = Image.new('RGBA', (max(1, width), max(1, height)), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(sprite)
+
+    # 添加阴影效果
+    if shadow_offset:
+        shadow_color = (0, 0, 0, int(alpha * 0.5))  # 半透明黑色阴影
+        draw.text((origin[0] + shadow_offset, origin[1] + shadow_offset), text, font=font, fill=shadow_color)
+
+    fill = tuple(color) + (alpha,)
+    stroke_fill = tuple(stroke_color) + (alpha,)
+    if stroke_width and isinstance(font, ImageFont.FreeTypeFont):
+        # 使用FreeType原生描边，一次光栅化同时生成描边与文字
+        draw.text(origin, text, font=font, fill=fill,
+                  stroke_width=stroke_width, stroke_fill=stroke_fill)
+    else:
+        if stroke_width:
+            # 位图字体不支持原生描边，退化为多方向偏移绘制
+            for dx in range(-stroke_width, stroke_width + 1):
+                for dy in range(-stroke_width, stroke_width + 1):
+                    if dx != 0 or dy != 0:
+                        draw.text((origin[0] + dx, origin[1] + dy), text, font=font, fill=stroke_fill)
+        draw.text(origin, text, font=font, fill=fill)
+
+    offset = (-origin[0], -origin[1])
+
+    if rotation != 0:
+        # 绕文本中心旋转，旋转后保持中心位置不变
+        center_x = offset[0] + sprite.width / 2
+        center_y = offset[1] + sprite.height / 2
+        sprite = sprite.rotate(rotation, expand=True)
+        offset = (int(round(center_x - sprite.width / 2)), int(round(center_y - sprite.height / 2)))
+
+    return WatermarkStamp(sprite, offset, text_size)
+
+
+@lru_cache(maxsize=8)
+def _decode_logo(path: str, mtime_ns: int, file_size: int) -> Image.Image:
+    """解码图片水印文件并转换为RGBA（按路径、修改时间与文件大小缓存）"""
+    with Image.open(path) as logo:
+        # 转换为RGBA模式以支持透明通道
+        return logo.convert('RGBA')
+
+
+@lru_cache(maxsize=32)
+def _logo_variant(path: str, mtime_ns: int, file_size: int, scale: float,
+                  rotation: float, opacity: float) -> Image.Image:
+    """生成并缓存指定缩放、旋转与透明度的图片水印变体"""
+    logo = _decode_logo(path, mtime_ns, file_size)
+
+    # 根据缩放比例调整水印图片大小
+    if scale != 1.0:
+        new_size = (max(1, int(logo.width * scale)), max(1, int(logo.height * scale)))
+        logo = logo.resize(new_size, Image.Resampling.LANCZOS)
+
+    # 应用水印旋转
+    if rotation != 0:
+        logo = logo.rotate(rotation, expand=True)
+
+    # 应用水印透明度：通过查找表一次性调整alpha通道
+    if opacity < 1.0:
+        if logo is _decode_logo(path, mtime_ns, file_size):
+            logo = logo.copy()  # 不修改共享的解码结果
+        lut = [int(p * opacity) for p in range(256)]
+        logo.putalpha(logo.getchannel('A').point(lut))
+
+    return logo
+
+
+def load_logo_stamp(path: str, scale: float = 1.0, rotation: float = 0.0,
+                    opacity: float = 1.0) -> Image.Image:
+    """
+    获取图片水印（Logo）的RGBA图像，同一文件只解码一次，
+    相同 (缩放, 旋转, 透明度) 的变体只生成一次。返回的图像为只读共享对象。
+    """
+    stat = os.stat(path)
+    return _logo_variant(path, stat.st_mtime_ns, stat.st_size,
+                         float(scale), float(rotation), float(opacity))
+
+
+def make_tile(sprite: Image.Image, spacing: int) -> Image.Image:
+    """
+    将图章排成错位（砖块式）排列的无缝图块
+
+    图块宽为一个图章加间距，高为两行；第二行错开半个图块宽度，
+    越过右边界的部分回绕到左侧，因此图块可以无缝地重复铺满画面。
+    """
+    cell_width = sprite.width + spacing
+    cell_height = sprite.height + spacing
+    tile = Image.new(sprite.mode, (cell_width, 2 * cell_height))
+    margin = spacing // 2
+    for x, y in ((margin, margin), (margin + cell_width // 2, margin + cell_height)):
+        # 同一行内的图章互不重叠，可直接粘贴
+        tile.paste(sprite, (x, y))
+        tile.paste(sprite, (x - cell_width, y))
+    return tile
+
+
+@lru_cache(maxsize=16)
+def render_text_tile(text: str, font, color: Tuple[int, int, int], alpha: int = 255,
+                     shadow_offset: int = 0, stroke_width: int = 0, angle: float = 0.0,
+                     stroke_color: Tuple[int, int, int] = (0, 0, 0),
+                     spacing: int = 0) -> Image.Image:
+    """渲染文本水印的平铺图块（参数同 render_text_stamp，angle 为每个水印的旋转角度）"""
+    stamp = render_text_stamp(text, font, color, alpha, shadow_offset, stroke_width, angle, stroke_color)
+    return make_tile(stamp.sprite, spacing)
+
+
+@lru_cache(maxsize=8)
+def _logo_tile(path: str, mtime_ns: int, file_size: int, scale: float,
+               angle: float, opacity: float, spacing: int) -> Image.Image:
+    """生成并缓存图片水印的平铺图块"""
+    return make_tile(_logo_variant(path, mtime_ns, file_size, scale, angle, opacity), spacing)
+
+
+def load_logo_tile(path: str, scale: float = 1.0, angle: float = 0.0,
+                   opacity: float = 1.0, spacing: int = 0) -> Image.Image:
+    """获取图片水印（Logo）的平铺图块，返回的图像为只读共享对象"""
+    stat = os.stat(path)
+    return _logo_tile(path, stat.st_mtime_ns, stat.st_size, float(scale),
+                      float(angle), float(opacity), int(spacing))
+
+
+def fill_tiled(tile: Image.Image, size: Tuple[int, int]) -> Image.Image:
+    """
+    用图块铺满指定尺寸的图层
+
+    先粘贴一个图块，再反复复制已铺好的区域使其宽度、高度依次加倍，
+    粘贴次数只与尺寸的对数相关，与重复的水印个数无关。
+
+    Args:
+        tile: 无缝图块（任意模式）
+        size: 图层尺寸
+
+    Returns:
+        与图块模式相同的新图层
+    """
+    width, height = size
+    layer = Image.new(tile.mode, size)
+    layer.paste(tile, (0, 0))
+    filled = tile.width
+    band_height = min(tile.height, height)
+    while filled < width:
+        layer.paste(layer.crop((0, 0, filled, band_height)), (filled, 0))
+        filled *= 2
+    filled = tile.height
+    while filled < height:
+        layer.paste(layer.crop((0, 0, width, filled)), (0, filled))
+        filled *= 2
+    return layer
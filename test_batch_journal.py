@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+测试作业日志与原子写入功能
+"""
+
+import json
+import os
+import sys
+import tempfile
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, 'src')
+
+for path in [current_dir, src_path]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from batch_journal import BatchJournal
+from watermark_processor import WatermarkProcessor
+
+
+def test_batch_journal_resume():
+    """测试中断后从作业日志继续"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, "a_watermarked.jpg")
+        with open(output_path, 'wb') as f:
+            f.write(b"x")
+        
+        journal = BatchJournal(temp_dir, "fp1")
+        journal.record(os.path.join(temp_dir, "a.jpg"), "2024-05-01", [output_path])
+        journal.close()
+        # 模拟进程被终止时写了一半的末行
+        with open(journal.path, 'a', encoding='utf-8') as f:
+            f.write('{"type": "done", "sou')
+        
+        journal = BatchJournal(temp_dir, "fp1", resume=True)
+        assert journal.is_done(os.path.join(temp_dir, "a.jpg"))
+        assert not journal.is_done(os.path.join(temp_dir, "b.jpg"))
+        # 继续后追加的记录不能与半行拼在一起
+        journal.record(os.path.join(temp_dir, "c.jpg"), "2024-05-02", [output_path])
+        journal.close()
+        with open(journal.path, encoding='utf-8') as f:
+            assert [json.loads(line)['type'] for line in f] == ['job', 'done', 'done']
+        
+        journal = BatchJournal(temp_dir, "fp1", resume=True)
+        assert journal.is_done(os.path.join(temp_dir, "a.jpg"))
+        assert journal.is_done(os.path.join(temp_dir, "c.jpg"))
+        journal.close()
+        print("  ✓ 继续作业时识别已完成的图片，忽略残缺记录")
+        
+        try:
+            BatchJournal(temp_dir, "fp2", resume=True)
+        except ValueError as e:
+            print(f"  ✓ 设置变化时拒绝继续: {e}")
+        else:
+            raise AssertionError("设置变化时应拒绝继续作业")
+        
+        journal = BatchJournal(temp_dir, "fp2")
+        assert not journal.is_done(os.path.join(temp_dir, "a.jpg"))
+        journal.close(remove=True)
+        assert not os.path.exists(journal.path)
+        print("  ✓ 新作业重新开始日志，完成后删除")
+
+
+def test_atomic_output():
+    """测试输出文件原子写入，失败时不留下残缺文件"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, "out.jpg")
+        image = Image.new('RGB', (32, 32), color=(10, 20, 30))
+        WatermarkProcessor.write_output_file(output_path, lambda f: image.save(f, 'JPEG'))
+        with Image.open(output_path) as result:
+            assert result.size == (32, 32)
+        
+        def failing_write(f):
+            f.write(b"partial")
+            raise IOError("disk full")
+        
+        try:
+            WatermarkProcessor.write_output_file(output_path, failing_write)
+        except IOError:
+            pass
+        assert os.listdir(temp_dir) == ["out.jpg"]
+        with Image.open(output_path) as result:
+            assert result.size == (32, 32)
+        print("  ✓ 写入失败时保留原文件且不留下临时文件")
+
+
+if __name__ == "__main__":
+    test_batch_journal_resume()
+    test_atomic_output()
+    print("\n测试完成！")
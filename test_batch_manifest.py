@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""
+测试批处理清单（增量处理）功能
+"""
+
+import os
+import sys
+import tempfile
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, 'src')
+
+for path in [current_dir, src_path]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from batch_manifest import BatchManifest, settings_fingerprint
+
+
+def test_batch_manifest():
+    """测试清单的记录、跳过与失效判断"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_path = os.path.join(temp_dir, "photo.jpg")
+        Image.new('RGB', (64, 48), color=(90, 140, 200)).save(image_path, 'JPEG')
+        output_dir = os.path.join(temp_dir, "output")
+        os.makedirs(output_dir)
+        output_path = os.path.join(output_dir, "photo_watermarked.jpg")
+        with open(output_path, 'wb') as f:
+            f.write(b"x")
+        
+        fingerprint = settings_fingerprint({'font_size': 36, 'opacity': 0.8})
+        assert fingerprint != settings_fingerprint({'font_size': 36, 'opacity': 0.5})
+        
+        manifest = BatchManifest(output_dir, use_hash=True)
+        assert not manifest.is_up_to_date(image_path, "2024-05-01", fingerprint)
+        manifest.record(image_path, "2024-05-01", fingerprint, [output_path])
+        manifest.save()
+        
+        # 重新加载后，未变化的图片应被跳过
+        manifest = BatchManifest(output_dir, use_hash=True)
+        assert manifest.is_up_to_date(image_path, "2024-05-01", fingerprint)
+        assert not manifest.is_up_to_date(image_path, "2024-05-02", fingerprint)
+        assert not manifest.is_up_to_date(image_path, "2024-05-01", "other")
+        print("  ✓ 设置与日期未变化时跳过，变化时重新处理")
+        
+        # 仅修改时间变化时，内容哈希一致仍跳过
+        stat = os.stat(image_path)
+        os.utime(image_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert manifest.is_up_to_date(image_path, "2024-05-01", fingerprint)
+        assert not BatchManifest(output_dir).is_up_to_date(image_path, "2024-05-01", fingerprint)
+        print("  ✓ 内容哈希一致时忽略修改时间变化")
+        
+        # 输出文件被删除后需要重新处理
+        os.remove(output_path)
+        assert not manifest.is_up_to_date(image_path, "2024-05-01", fingerprint)
+        print("  ✓ 输出文件缺失时重新处理")
+
+
+if __name__ == "__main__":
+    test_batch_manifest()
+    print("\n测试完成！")
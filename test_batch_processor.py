@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+"""
+测试批量并行处理功能
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, 'src')
+
+for path in [current_dir, src_path]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from batch_processor import BatchProcessor
+from main import PhotoWatermarkApp
+from watermark_processor import OutputNameRegistry, Rendition, WatermarkPosition, WatermarkProcessor
+from watermark_spec import WatermarkSpec
+
+
+def create_test_images(directory, count=6):
+    """创建测试图片，最后追加一个无法解码的文件"""
+    pairs = []
+    for i in range(count):
+        image_path = os.path.join(directory, f"batch_{i}.jpg")
+        Image.new('RGB', (320, 240), color=(40 * i % 255, 100, 160)).save(image_path, 'JPEG')
+        pairs.append((image_path, f"2024-01-{i + 1:02d}"))
+    
+    broken_path = os.path.join(directory, "broken.jpg")
+    with open(broken_path, 'wb') as f:
+        f.write(b"not an image")
+    pairs.append((broken_path, "2024-02-01"))
+    return pairs
+
+
+def test_batch_processor():
+    """测试进程池批处理：结果有序、失败项被记录"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = os.path.join(temp_dir, "input")
+        output_dir = os.path.join(temp_dir, "output")
+        os.makedirs(input_dir)
+        pairs = create_test_images(input_dir)
+        
+        for jobs in (1, 2):
+            print(f"测试进程数: {jobs}")
+            results = list(BatchProcessor(jobs=jobs).process(
+                pairs, output_dir,
+                font_size=24,
+                position=WatermarkPosition.BOTTOM_RIGHT,
+                opacity=0.8
+            ))
+            
+            assert [r.index for r in results] == list(range(1, len(pairs) + 1))
+            assert [r.image_path for r in results] == [p for p, _ in pairs]
+            
+            for result in results[:-1]:
+                assert result.success, result.error
+                assert os.path.exists(result.output_path)
+                print(f"  ✓ {os.path.basename(result.output_path)}")
+            
+            assert not results[-1].success
+            print(f"  ✓ 失败项已记录: {results[-1].error}")
+    
+    print("\n测试完成！")
+
+
+def test_pipelined_processing():
+    """测试流水线处理：输出与串行处理一致"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = os.path.join(temp_dir, "input")
+        os.makedirs(input_dir)
+        pairs = create_test_images(input_dir)
+        options = dict(font_size=24, color="#FF0000", opacity=0.6, stroke=True)
+        
+        serial_dir = os.path.join(temp_dir, "serial")
+        serial = list(BatchProcessor(jobs=1).process(pairs, serial_dir, **options))
+        
+        pipeline_dir = os.path.join(temp_dir, "pipeline")
+        piped = list(BatchProcessor(jobs=2, io_threads=2).process_pipelined(pairs, pipeline_dir, **options))
+        
+        assert [r.index for r in piped] == list(range(1, len(pairs) + 1))
+        assert not piped[-1].success
+        print(f"  ✓ 失败项已记录: {piped[-1].error}")
+        
+        for s_result, p_result in zip(serial[:-1], piped[:-1]):
+            assert p_result.success, p_result.error
+            with open(s_result.output_path, 'rb') as f1, open(p_result.output_path, 'rb') as f2:
+                assert f1.read() == f2.read()
+            print(f"  ✓ {os.path.basename(p_result.output_path)} 与串行输出一致")
+
+
+def test_pause_and_cancel():
+    """测试暂停时不提交新任务、取消后不再产出结果"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = os.path.join(temp_dir, "input")
+        os.makedirs(input_dir)
+        pairs = create_test_images(input_dir, count=12)[:-1]
+        
+        for jobs in (1, 2):
+            processor = BatchProcessor(jobs=jobs, window=2)
+            processor.pause()
+            assert processor.paused
+            results = []
+            
+            def run():
+                for result in processor.process(pairs, os.path.join(temp_dir, f"out_{jobs}"), font_size=24):
+                    results.append(result)
+                    if len(results) == 3:
+                        processor.cancel()
+            
+            thread = threading.Thread(target=run)
+            thread.start()
+            thread.join(0.5)
+            assert thread.is_alive() and results == []  # 暂停中
+            
+            processor.resume()
+            thread.join(30)
+            assert not thread.is_alive() and processor.cancelled
+            assert 3 <= len(results) < len(pairs)
+            assert [r.index for r in results] == list(range(1, len(results) + 1))
+            assert all(r.success for r in results)
+            print(f"  ✓ 进程数 {jobs}: 取消前完成 {len(results)}/{len(pairs)} 张")
+
+
+def test_results_while_paused():
+    """测试暂停后已提交的图片照常产出结果，只是不再提交新图片"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = os.path.join(temp_dir, "input")
+        os.makedirs(input_dir)
+        pairs = create_test_images(input_dir, count=10)[:-1]
+        processor = BatchProcessor(jobs=2, window=4)
+        results = []
+        
+        def run():
+            for result in processor.process(pairs, os.path.join(temp_dir, "out"), font_size=24):
+                results.append(result)
+                if len(results) == 1:
+                    processor.pause()
+        
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        try:
+            # 产出第一个结果时窗口中的其余3张已提交，暂停期间仍然产出
+            deadline = time.monotonic() + 30
+            while len(results) < 4 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            time.sleep(0.5)
+            assert processor.paused and thread.is_alive()
+            assert len(results) == 4, len(results)
+        finally:
+            processor.resume()
+        thread.join(30)
+        assert not thread.is_alive()
+        assert [r.index for r in results] == list(range(1, len(pairs) + 1))
+        assert all(r.success for r in results)
+        print(f"  ✓ 暂停期间产出已提交的 3 张图片的结果，继续后完成全部 {len(pairs)} 张")
+
+
+def test_process_batch_name_collisions():
+    """测试 process_batch：批次内重名输出自动编号，结果带耗时与错误"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pairs = []
+        for name, fmt in (("dup.jpg", 'JPEG'), ("dup.png", 'PNG'), ("DUP.jpeg", 'JPEG')):
+            image_path = os.path.join(temp_dir, name)
+            Image.new('RGB', (200, 150), color=(120, 60, 30)).save(image_path, fmt)
+            pairs.append((image_path, "2024-03-01"))
+        broken_path = os.path.join(temp_dir, "broken.jpg")
+        with open(broken_path, 'wb') as f:
+            f.write(b"not an image")
+        pairs.append((broken_path, "2024-03-02"))
+        spec = WatermarkSpec(font_size=16, output_format="jpeg", naming_rule="original")
+
+        expected = ["dup.jpg", "dup_2.jpg", "DUP_3.jpg"]
+        for jobs in (1, 2):
+            output_dir = os.path.join(temp_dir, f"out_{jobs}")
+            results = list(WatermarkProcessor().process_batch(iter(pairs), spec, output_dir, jobs=jobs))
+            assert [os.path.basename(r.output_path) for r in results[:3]] == expected
+            assert sorted(os.listdir(output_dir)) == sorted(expected)
+            assert all(r.success and r.timings['render'] > 0 and r.elapsed > 0 for r in results[:3])
+            assert not results[3].success and results[3].error
+            print(f"  ✓ 进程数 {jobs}: 重名输出 {[os.path.basename(r.output_path) for r in results[:3]]}")
+
+        # 流水线模式按相同规则编号
+        output_dir = os.path.join(temp_dir, "out_pipeline")
+        results = list(BatchProcessor(jobs=2).process_pipelined(pairs, output_dir, spec=spec))
+        assert [os.path.basename(r.output_path) for r in results[:3]] == expected
+
+
+def test_existing_output_names():
+    """测试输出目录中已有的文件视为已占用，每个目录只列出一次，上次的输出可被覆盖"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_dir = os.path.join(temp_dir, "output")
+        os.makedirs(output_dir)
+        for name in ("a.jpg", "A_2.JPG", "b.jpg"):
+            with open(os.path.join(output_dir, name), 'wb') as f:
+                f.write(b"x")
+
+        listed = []
+        scandir = os.scandir
+        os.scandir = lambda path: listed.append(path) or scandir(path)
+        try:
+            names = OutputNameRegistry()
+            names.reserve(os.path.join(output_dir, "b.jpg"), os.path.join(temp_dir, "b.png"))
+            claimed = [
+                names.claim(os.path.join(output_dir, "a.jpg"), os.path.join(temp_dir, "a.png")),
+                names.claim(os.path.join(output_dir, "b.jpg"), os.path.join(temp_dir, "b.png")),
+                names.claim(os.path.join(output_dir, "c.jpg"), os.path.join(temp_dir, "c.png")),
+                names.claim(os.path.join(output_dir, "c.jpg"), os.path.join(temp_dir, "c.tif")),
+                names.claim(os.path.join(temp_dir, "new", "a.jpg"), os.path.join(temp_dir, "a.png")),
+            ]
+        finally:
+            os.scandir = scandir
+        assert [os.path.basename(path) for path in claimed] == ["a_3.jpg", "b.jpg", "c.jpg", "c_2.jpg", "a.jpg"]
+        assert len(listed) == 2  # 输出目录与不存在的子目录各列出一次
+        print(f"  ✓ 已有文件视为已占用: {[os.path.basename(path) for path in claimed]}")
+
+        # 批处理不覆盖输出目录中已有的文件
+        image_path = os.path.join(temp_dir, "a.jpg")
+        Image.new('RGB', (200, 150), color=(120, 60, 30)).save(image_path)
+        spec = WatermarkSpec(font_size=16, naming_rule="original")
+        result = next(WatermarkProcessor().process_batch([(image_path, "2024-03-01")], spec, output_dir))
+        assert os.path.basename(result.output_path) == "a_3.jpg"
+        with open(os.path.join(output_dir, "a.jpg"), 'rb') as f:
+            assert f.read() == b"x"
+
+        # 命令行重新处理（设置改变）时覆盖同一图片上次的输出，不另起序号
+        input_dir = os.path.join(temp_dir, "input")
+        os.makedirs(input_dir)
+        create_test_images(input_dir, count=2)
+        cli_dir = os.path.join(temp_dir, "cli")
+        app = PhotoWatermarkApp(use_exif_cache=False)
+        for text in ("FIRST", "SECOND"):
+            app.process_images(input_dir, output_dir=cli_dir, custom_text=text, jobs=1)
+        outputs = sorted(name for name in os.listdir(cli_dir) if not name.startswith('.'))
+        assert outputs == ["batch_0_watermarked.jpg", "batch_1_watermarked.jpg"], outputs
+        print("  ✓ 重新处理时覆盖同一图片上次的输出")
+
+
+def test_pipeline_uses_process_item():
+    """测试流水线模式与普通处理一致：带耗时、支持多尺寸导出与内存上限"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = os.path.join(temp_dir, "input")
+        os.makedirs(input_dir)
+        pairs = create_test_images(input_dir, count=4)
+        processor = WatermarkProcessor()
+        cases = [
+            ("renditions", WatermarkSpec(font_size=20), Rendition.parse_list("200,100:80:_small")),
+            ("max_memory", WatermarkSpec(font_size=20, position="tile", max_memory=64), None),
+        ]
+        for name, spec, renditions in cases:
+            serial_dir = os.path.join(temp_dir, f"serial_{name}")
+            serial = list(processor.process_batch(pairs, spec, serial_dir, renditions=renditions))
+            pipeline_dir = os.path.join(temp_dir, f"pipeline_{name}")
+            piped = list(processor.process_batch(pairs, spec, pipeline_dir, renditions=renditions,
+                                                 runner=BatchProcessor(jobs=2), pipeline=True))
+            assert [r.index for r in piped] == list(range(1, len(pairs) + 1))
+            assert not piped[-1].success and 'read' in piped[-1].timings
+            for s_result, p_result in zip(serial[:-1], piped[:-1]):
+                assert p_result.success, p_result.error
+                assert p_result.timings['read'] >= 0 and p_result.timings['render'] > 0
+                assert len(p_result.output_paths) == len(s_result.output_paths)
+                for s_path, p_path in zip(s_result.output_paths, p_result.output_paths):
+                    assert os.path.basename(s_path) == os.path.basename(p_path)
+                    with open(s_path, 'rb') as f1, open(p_path, 'rb') as f2:
+                        assert f1.read() == f2.read()
+            print(f"  ✓ 流水线模式（{name}）与串行输出一致，耗时 {sorted(piped[0].timings)}")
+
+
+if __name__ == "__main__":
+    test_batch_processor()
+    test_pipelined_processing()
+    test_pause_and_cancel()
+    test_results_while_paused()
+    test_process_batch_name_collisions()
+    test_existing_output_names()
+    test_pipeline_uses_process_item()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+"""
+测试递归目录扫描与并行日期读取功能
+"""
+
+import os
+import sys
+import tempfile
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, 'src')
+
+for path in [current_dir, src_path]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from exif_reader import ExifReader
+from batch_processor import item_output_dir
+from main import PhotoWatermarkApp
+
+
+def create_tree(root):
+    """创建 年/月/日 结构的测试目录"""
+    for rel_path in ("top.jpg", "notes.txt", "2023/07/15/a.jpg", "2023/07/15/b.png",
+                     "2023/08/01/c.jpg", "2024/raw/d.jpg", "output/old.jpg"):
+        path = os.path.join(root, *rel_path.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if rel_path.endswith('.txt'):
+            with open(path, 'w') as f:
+                f.write("not an image")
+        else:
+            Image.new('RGB', (40, 30)).save(path)
+
+
+def test_scan_image_files():
+    """测试递归扫描、通配符过滤与深度限制"""
+    reader = ExifReader()
+    with tempfile.TemporaryDirectory() as root:
+        create_tree(root)
+        rel = lambda paths: [os.path.relpath(p, root).replace(os.sep, '/') for p in paths]
+        
+        assert rel(reader.scan_image_files(root)) == ["top.jpg"]
+        assert rel(reader.scan_image_files(root, recursive=True,
+                                           exclude_dirs=[os.path.join(root, "output")])) == [
+            "top.jpg", "2023/07/15/a.jpg", "2023/07/15/b.png", "2023/08/01/c.jpg", "2024/raw/d.jpg"]
+        assert rel(reader.scan_image_files(root, recursive=True, include=["*.jpg"],
+                                           exclude=["raw", "output"])) == [
+            "top.jpg", "2023/07/15/a.jpg", "2023/08/01/c.jpg"]
+        assert rel(reader.scan_image_files(root, recursive=True, include=["2023/07/*"])) == [
+            "2023/07/15/a.jpg", "2023/07/15/b.png"]
+        assert rel(reader.scan_image_files(root, recursive=True, max_depth=1)) == ["top.jpg", "output/old.jpg"]
+        print("  ✓ 递归扫描、通配符过滤、深度限制与输出目录排除")
+
+
+def test_parallel_dates():
+    """测试并行读取日期保持输入顺序"""
+    reader = ExifReader()
+    with tempfile.TemporaryDirectory() as root:
+        create_tree(root)
+        files = list(reader.scan_image_files(root, recursive=True))
+        serial = list(reader.iter_watermark_dates(files, workers=1))
+        parallel = list(reader.iter_watermark_dates(iter(files), workers=4))
+        assert serial == parallel
+        assert [path for path, _ in parallel] == files
+        print(f"  ✓ 并行读取 {len(parallel)} 张图片的日期，顺序与输入一致")
+
+
+def test_iter_images_streaming():
+    """测试流式读取：逐个产出结果，空目录不抛出异常"""
+    reader = ExifReader()
+    with tempfile.TemporaryDirectory() as root:
+        create_tree(root)
+        stream = reader.iter_images(root, recursive=True, workers=2)
+        first_path, first_date = next(stream)
+        assert os.path.basename(first_path) == "top.jpg" and first_date
+        assert len(list(stream)) == 5
+        
+        empty_dir = os.path.join(root, "empty")
+        os.makedirs(empty_dir)
+        assert list(reader.iter_images(empty_dir)) == []
+        try:
+            reader.process_images(empty_dir)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("process_images 在空目录中应抛出 ValueError")
+        print("  ✓ 流式产出结果，空目录返回空迭代器")
+
+
+def test_no_output_dir_without_images():
+    """测试没有找到图片时不创建输出目录（清单与作业日志在找到第一张图片后才写入）"""
+    app = PhotoWatermarkApp(use_exif_cache=False)
+    with tempfile.TemporaryDirectory() as root:
+        input_dir = os.path.join(root, "photos")
+        os.makedirs(input_dir)
+        with open(os.path.join(input_dir, "notes.txt"), 'w') as f:
+            f.write("not an image")
+        custom_dir = os.path.join(root, "custom_out")
+        app.process_images(input_dir)
+        app.process_images(input_dir, output_dir=custom_dir, recursive=True)
+        assert os.listdir(input_dir) == ["notes.txt"] and not os.path.exists(custom_dir)
+        
+        Image.new('RGB', (64, 48)).save(os.path.join(input_dir, "a.jpg"))
+        app.process_images(input_dir, jobs=1)
+        output_dir = os.path.join(input_dir, "photos_watermark")
+        assert os.path.isfile(os.path.join(output_dir, "a_watermarked.jpg"))
+        assert os.path.isfile(os.path.join(output_dir, ".watermark_manifest.json"))
+    print("  ✓ 没有图片时不留下空的输出目录")
+
+
+def test_item_output_dir():
+    """测试输出目录保留相对子目录结构"""
+    root = os.path.join("photos")
+    image_path = os.path.join(root, "2023", "07", "a.jpg")
+    assert item_output_dir("out", image_path) == "out"
+    assert item_output_dir("out", image_path, root) == os.path.join("out", "2023", "07")
+    assert item_output_dir("out", os.path.join(root, "a.jpg"), root) == "out"
+    print("  ✓ 输出目录保留子目录结构")
+
+
+if __name__ == "__main__":
+    test_scan_image_files()
+    test_parallel_dates()
+    test_iter_images_streaming()
+    test_no_output_dir_without_images()
+    test_item_output_dir()
+    print("\n测试完成！")
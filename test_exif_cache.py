@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+"""
+测试EXIF元数据缓存功能
+"""
+
+import os
+import sys
+import tempfile
+import piexif
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, 'src')
+
+for path in [current_dir, src_path]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from exif_cache import ExifCache
+from exif_reader import ExifReader
+
+
+def test_exif_cache():
+    """测试缓存命中、跨实例共享与文件变化后失效"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_path = os.path.join(temp_dir, "photo.jpg")
+        exif_bytes = piexif.dump({"0th": {piexif.ImageIFD.Orientation: 6},
+                                  "Exif": {piexif.ExifIFD.DateTimeOriginal: b"2021:03:04 05:06:07"}})
+        Image.new('RGB', (64, 48)).save(image_path, 'JPEG', exif=exif_bytes)
+        db_path = os.path.join(temp_dir, "cache.sqlite3")
+        
+        reader = ExifReader(cache=ExifCache(db_path))
+        metadata = reader.get_image_metadata(image_path)
+        assert (metadata.exif_date, metadata.width, metadata.height, metadata.orientation) == \
+            ("2021-03-04", 64, 48, 6)
+        reader.cache.close()
+        
+        # 新实例直接读取缓存
+        cache = ExifCache(db_path)
+        cached = cache.get(image_path, os.stat(image_path))
+        assert cached is not None and cached.exif_date == "2021-03-04"
+        assert ExifReader(cache=cache).get_watermark_date(image_path) == "2021-03-04"
+        print("  ✓ 缓存命中并在实例间共享")
+        
+        # 文件被修改后缓存失效
+        Image.new('RGB', (80, 60)).save(image_path, 'JPEG')
+        stat = os.stat(image_path)
+        os.utime(image_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert cache.get(image_path, os.stat(image_path)) is None
+        metadata = ExifReader(cache=cache).get_image_metadata(image_path)
+        assert (metadata.exif_date, metadata.width, metadata.height) == (None, 80, 60)
+        cache.close()
+        print("  ✓ 文件变化后重新读取")
+
+
+if __name__ == "__main__":
+    test_exif_cache()
+    print("\n测试完成！")
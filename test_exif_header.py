@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+测试EXIF头部快速读取功能
+"""
+
+import os
+import sys
+import tempfile
+import piexif
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, 'src')
+
+for path in [current_dir, src_path]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from exif_header import read_exif_header, ExifHeaderError, TAG_DATETIME, TAG_DATETIME_ORIGINAL, TAG_ORIENTATION
+from exif_reader import ExifReader
+
+
+def make_exif(date_original=None, date_time=None, orientation=None):
+    """构造EXIF数据"""
+    zeroth, exif = {}, {}
+    if date_time:
+        zeroth[piexif.ImageIFD.DateTime] = date_time.encode()
+    if orientation:
+        zeroth[piexif.ImageIFD.Orientation] = orientation
+    if date_original:
+        exif[piexif.ExifIFD.DateTimeOriginal] = date_original.encode()
+    return piexif.dump({"0th": zeroth, "Exif": exif})
+
+
+def test_read_exif_header_formats():
+    """测试 JPEG/TIFF/WebP 头部读取结果与piexif一致"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        exif_bytes = make_exif("2023:07:15 10:20:30", "2024:01:02 03:04:05", 6)
+        image = Image.new('RGB', (120, 80), color=(90, 140, 200))
+        
+        for ext, fmt in (('jpg', 'JPEG'), ('tiff', 'TIFF'), ('webp', 'WEBP')):
+            path = os.path.join(temp_dir, f"photo.{ext}")
+            image.save(path, fmt, exif=exif_bytes)
+            tags = read_exif_header(path)
+            assert tags[TAG_DATETIME_ORIGINAL] == "2023:07:15 10:20:30", (ext, tags)
+            assert tags[TAG_DATETIME] == "2024:01:02 03:04:05", (ext, tags)
+            assert tags[TAG_ORIENTATION] == 6, (ext, tags)
+            assert ExifReader().extract_date_from_exif(path) == "2023-07-15"
+            print(f"  ✓ {fmt}: {tags}")
+
+
+def test_read_exif_header_fallbacks():
+    """测试缺少EXIF或无法解析时的行为"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # 不含EXIF的JPEG返回空字典
+        plain_path = os.path.join(temp_dir, "plain.jpg")
+        Image.new('RGB', (40, 30)).save(plain_path, 'JPEG')
+        assert read_exif_header(plain_path) == {}
+        assert ExifReader().extract_date_from_exif(plain_path) is None
+        
+        # 只有 DateTime 时使用 DateTime
+        exif_bytes = make_exif(date_time="2022:12:31 23:59:59")
+        dt_path = os.path.join(temp_dir, "datetime.jpg")
+        Image.new('RGB', (40, 30)).save(dt_path, 'JPEG', exif=exif_bytes)
+        assert ExifReader().extract_date_from_exif(dt_path) == "2022-12-31"
+        
+        # 无法识别的文件抛出 ExifHeaderError
+        bogus_path = os.path.join(temp_dir, "bogus.jpg")
+        with open(bogus_path, 'wb') as f:
+            f.write(b"not an image at all")
+        try:
+            read_exif_header(bogus_path)
+        except ExifHeaderError:
+            pass
+        else:
+            raise AssertionError("应无法解析非图片文件")
+        assert ExifReader().extract_date_from_exif(bogus_path) is None
+        print("  ✓ 无EXIF、仅DateTime与无效文件均处理正确")
+
+
+if __name__ == "__main__":
+    test_read_exif_header_formats()
+    test_read_exif_header_fallbacks()
+    print("\n测试完成！")
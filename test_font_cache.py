@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+"""
+测试字体缓存功能
+"""
+
+import os
+import sys
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, 'src')
+
+for path in [current_dir, src_path]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import watermark_processor
+from watermark_processor import WatermarkProcessor
+
+
+def test_font_cache():
+    """测试重复获取字体时复用同一个字体对象，且只解析一次字体文件"""
+    processor = WatermarkProcessor()
+    watermark_processor._resolve_font_file.cache_clear()
+    
+    for font_style in (None, {'bold': True, 'italic': False}, {'bold': True, 'italic': True}):
+        first = processor.get_font(36, None, font_style)
+        for _ in range(5):
+            assert processor.get_font(36, None, font_style) is first
+        print(f"  ✓ 字体样式 {font_style}: 复用同一字体对象")
+    
+    info = watermark_processor._resolve_font_file.cache_info()
+    assert info.misses == 3
+    print(f"  ✓ 字体文件解析次数: {info.misses}，缓存命中: {info.hits}")
+    
+    # 不存在的字体路径同样只解析一次，并回退到系统/默认字体
+    missing = processor.get_font(24, "/nonexistent/font.ttf")
+    assert processor.get_font(24, "/nonexistent/font.ttf") is missing
+    print("  ✓ 不存在的字体路径回退成功")
+    
+    print("\n测试完成！")
+
+
+if __name__ == "__main__":
+    test_font_cache()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+测试后台图片导入功能
+"""
+
+import os
+import sys
+import tempfile
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, 'src')
+
+for path in [current_dir, src_path]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from exif_reader import ExifReader
+from image_importer import ImageImporter
+
+
+def test_image_importer():
+    """测试后台导入的去重、分批取出与进度"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = []
+        for i in range(25):
+            path = os.path.join(temp_dir, f"photo_{i:02d}.jpg")
+            Image.new('RGB', (32, 24)).save(path)
+            paths.append(path)
+        
+        # 文件夹与单独的文件重复，已在列表中的图片不再导入
+        importer = ImageImporter(ExifReader(), [temp_dir, paths[0], paths[1]],
+                                 known_paths={paths[2]}, workers=4, batch_size=5)
+        importer.start()
+        importer.join(timeout=30)
+        assert importer.finished and importer.error is None
+        assert importer.total == 24 and importer.done == 24
+        
+        first = importer.poll(max_items=5)
+        rest = importer.poll()
+        assert len(first) == 5 and importer.drained
+        imported = [path for path, _ in first + rest]
+        assert imported == [p for p in paths if p != paths[2]]
+        print(f"  ✓ 后台导入 {len(imported)} 张图片，去重并保持顺序")
+
+
+def test_image_importer_cancel():
+    """测试取消导入"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for i in range(10):
+            Image.new('RGB', (32, 24)).save(os.path.join(temp_dir, f"photo_{i}.jpg"))
+        importer = ImageImporter(ExifReader(), [temp_dir])
+        importer.cancel()
+        importer.start()
+        importer.join(timeout=30)
+        assert importer.finished and importer.cancelled
+        assert importer.poll() == []
+        print("  ✓ 取消后不再读取图片")
+
+
+if __name__ == "__main__":
+    test_image_importer()
+    test_image_importer_cancel()
+    print("\n测试完成！")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+"""
+测试内存上限下的大图分条处理功能
+"""
+
+import io
+import os
+import sys
+import tempfile
+import warnings
+from dataclasses import replace
+from PIL import Image, ImageChops
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, 'src')
+
+for path in [current_dir, src_path]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from large_image import PNGStripWriter, iter_strips, open_within_budget
+from watermark_processor import WatermarkProcessor
+from watermark_spec import WatermarkSpec
+
+
+def _gradient(mode, size):
+    """生成每个像素都不同的测试图片，便于发现条带边界上的错误"""
+    vertical = Image.linear_gradient('L').resize(size)
+    horizontal = Image.linear_gradient('L').rotate(90).resize(size)
+    bands = [vertical, horizontal, ImageChops.invert(vertical), ImageChops.invert(horizontal)]
+    return Image.merge(mode, bands[:len(mode)])
+
+
+def test_png_strip_writer():
+    """测试逐条带写入的PNG与原图逐像素一致"""
+    for mode in ('L', 'RGB', 'RGBA'):
+        image = _gradient(mode, (123, 77))
+        buffer = io.BytesIO()
+        writer = PNGStripWriter(buffer, image.size, mode, icc_profile=b'profile')
+        for box in iter_strips(image.size, 10):
+            writer.write_strip(image.crop(box))
+        writer.close()
+
+        buffer.seek(0)
+        with Image.open(buffer) as decoded:
+            assert decoded.mode == mode and decoded.info.get('icc_profile') == b'profile'
+            assert decoded.tobytes() == image.tobytes()
+    print("  ✓ L、RGB、RGBA 分条写入后逐像素一致")
+
+    writer = PNGStripWriter(io.BytesIO(), (10, 10), 'RGB')
+    writer.write_strip(Image.new('RGB', (10, 4)))
+    try:
+        writer.close()
+        raise AssertionError("行数不足时应当报错")
+    except ValueError:
+        pass
+
+
+def test_strips_match_normal_processing():
+    """测试分条处理与普通处理的输出一致（强制使用很小的条带）"""
+    processor = WatermarkProcessor()
+    processor.STRIP_TARGET_BYTES = 40000
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sources = {
+            "photo.jpg": _gradient('RGB', (640, 480)),
+            "alpha.png": _gradient('RGBA', (500, 400)),
+        }
+        for name, image in sources.items():
+            image.save(os.path.join(temp_dir, name))
+
+        cases = [
+            (WatermarkSpec(custom_text="PROOF", position="center", shadow=True), "auto"),
+            (WatermarkSpec(custom_text="PROOF", position="tile", tile_spacing=20, opacity=0.6), "auto"),
+            (WatermarkSpec(custom_text="PROOF", position="tile", resize_mode="percent",
+                           resize_percent=0.5), "auto"),
+            (WatermarkSpec(custom_text="PROOF", position="top_left", stroke=True), "jpeg"),
+            (WatermarkSpec(custom_text="PROOF", position="bottom_right"), "png"),
+        ]
+        for spec, output_format in cases:
+            spec = replace(spec, output_format=output_format)
+            for name in sources:
+                normal_dir = os.path.join(temp_dir, "normal")
+                strip_dir = os.path.join(temp_dir, "strips")
+                os.makedirs(normal_dir, exist_ok=True)
+                os.makedirs(strip_dir, exist_ok=True)
+                image_path = os.path.join(temp_dir, name)
+                expected = processor.process_single_image(image_path, "", normal_dir, spec=spec)
+                actual = processor.process_in_strips(image_path, "", strip_dir,
+                                                     replace(spec, max_memory=64))
+                with Image.open(expected) as a, Image.open(actual) as b:
+                    assert a.size == b.size and a.mode == b.mode
+                    assert ImageChops.difference(a, b).getbbox() is None, (name, spec)
+        print(f"  ✓ {len(cases) * len(sources)} 种组合的分条输出与普通处理一致")
+
+
+def test_memory_budget():
+    """测试超过上限时报错，以及超过Pillow像素数限制的图片由内存上限决定能否处理"""
+    processor = WatermarkProcessor()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_path = os.path.join(temp_dir, "wide.png")
+        Image.new('RGB', (1200, 1000), (0, 0, 255)).save(image_path)
+
+        try:
+            processor.process_in_strips(image_path, "", temp_dir, WatermarkSpec(max_memory=1))
+            raise AssertionError("超过内存上限时应当报错")
+        except ValueError as e:
+            assert "超过上限" in str(e)
+        print("  ✓ 整帧解码超过上限时报错")
+
+        # 超过 Pillow 拒绝线的图片：上限足够时正常处理，且不修改全局限制
+        limit = Image.MAX_IMAGE_PIXELS
+        Image.MAX_IMAGE_PIXELS = 100000
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('error', Image.DecompressionBombWarning)
+                with open_within_budget(image_path) as image:
+                    assert image.size == (1200, 1000)
+                processor.STRIP_TARGET_BYTES = 40000  # Pillow 对裁剪区域仍检查像素数
+                output_path = processor.process_in_strips(image_path, "", temp_dir,
+                                                          WatermarkSpec(custom_text="X", max_memory=64))
+            assert Image.MAX_IMAGE_PIXELS == 100000
+            try:
+                Image.open(image_path)
+                raise AssertionError("其他调用仍应受解压缩炸弹检查保护")
+            except Image.DecompressionBombError:
+                pass
+            # 上限不足时在解码前报错
+            try:
+                processor.process_in_strips(image_path, "", temp_dir, WatermarkSpec(custom_text="X", max_memory=1))
+                raise AssertionError("超过内存上限时应当报错")
+            except ValueError as e:
+                assert "超过上限" in str(e)
+        finally:
+            Image.MAX_IMAGE_PIXELS = limit
+        with Image.open(output_path) as output:
+            assert output.size == (1200, 1000)
+        print("  ✓ 超过 Pillow 拒绝线的图片在上限足够时正常处理，且不修改全局限制")
+
+        try:
+            open_within_budget(os.path.join(temp_dir, "missing.png"))
+            raise AssertionError("文件不存在时应当报错")
+        except OSError:
+            pass
+
+        result = processor.process_item(0, image_path, "", temp_dir,
+                                        WatermarkSpec(custom_text="X", max_memory=1))
+        assert not result.success and "超过上限" in result.error
+
+
+if __name__ == "__main__":
+    test_png_strip_writer()
+    test_strips_match_normal_processing()
+    test_memory_budget()
+    print("\n测试完成！")
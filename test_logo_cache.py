@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""
+测试图片水印（Logo）的解码缓存、变体缓存与查表透明度
+"""
+
+import os
+import sys
+import tempfile
+from PIL import Image, ImageDraw
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, 'src')
+
+for path in [current_dir, src_path]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from watermark_processor import WatermarkProcessor
+from watermark_spec import WatermarkSpec
+from watermark_stamp import _decode_logo, _logo_variant, load_logo_stamp
+
+
+def _save_logo(path, color=(255, 0, 0)):
+    """保存一张带渐变透明度的Logo，覆盖全部 alpha 取值"""
+    logo = Image.new('RGB', (64, 48), color)
+    ImageDraw.Draw(logo).ellipse((8, 8, 56, 40), fill=(0, 0, 255))
+    logo.putalpha(Image.linear_gradient('L').resize(logo.size))
+    logo.save(path)
+
+
+def _reference_logo(path, scale, rotation, opacity):
+    """原先的做法：每次打开文件，缩放、旋转后用逐像素的 lambda 调整 alpha 通道"""
+    logo = Image.open(path)
+    if logo.mode != 'RGBA':
+        logo = logo.convert('RGBA')
+    if scale != 1.0:
+        logo = logo.resize((int(logo.width * scale), int(logo.height * scale)), Image.Resampling.LANCZOS)
+    if rotation != 0:
+        logo = logo.rotate(rotation, expand=True)
+    if opacity < 1.0:
+        alpha = logo.split()[-1]
+        alpha = alpha.point(lambda p: int(p * opacity))
+        logo.putalpha(alpha)
+    return logo
+
+
+def test_logo_variants_reused():
+    """测试同一文件只解码一次，相同变体复用缓存，文件修改后重新解码"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        logo_path = os.path.join(temp_dir, "logo.png")
+        _save_logo(logo_path)
+        _decode_logo.cache_clear()
+        _logo_variant.cache_clear()
+
+        first = load_logo_stamp(logo_path, 0.5, 15.0, 0.7)
+        assert load_logo_stamp(logo_path, 0.5, 15.0, 0.7) is first
+        assert _logo_variant.cache_info().hits == 1
+        for opacity in (0.3, 1.0):
+            load_logo_stamp(logo_path, 0.5, 15.0, opacity)
+        assert _logo_variant.cache_info().misses == 3
+        assert _decode_logo.cache_info().misses == 1  # 三个变体共用一次解码
+
+        # 不透明、不缩放的变体直接共享解码结果，带透明度的变体不修改它
+        decoded = load_logo_stamp(logo_path)
+        assert decoded is _decode_logo(logo_path, os.stat(logo_path).st_mtime_ns, os.path.getsize(logo_path))
+        load_logo_stamp(logo_path, 1.0, 0.0, 0.5)
+        assert decoded.tobytes() == _reference_logo(logo_path, 1.0, 0.0, 1.0).tobytes()
+        print(f"  ✓ 同一文件只解码一次，相同变体复用: {_logo_variant.cache_info()}")
+
+        # 批量添加水印时复用同一变体
+        processor = WatermarkProcessor()
+        spec = WatermarkSpec(custom_text="", image_watermark_path=logo_path, opacity=0.6)
+        hits = _logo_variant.cache_info().hits
+        for _ in range(3):
+            processor.add_watermark(Image.new('RGB', (300, 200)), "", spec=spec)
+        assert _logo_variant.cache_info().hits >= hits + 2
+
+        # 文件被替换（修改时间改变）后重新解码
+        stat = os.stat(logo_path)
+        _save_logo(logo_path, color=(0, 255, 0))
+        os.utime(logo_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        refreshed = load_logo_stamp(logo_path, 0.5, 15.0, 0.7)
+        assert refreshed is not first
+        assert _decode_logo.cache_info().misses == 2
+        assert refreshed.tobytes() == _reference_logo(logo_path, 0.5, 15.0, 0.7).tobytes()
+        print("  ✓ 文件修改后重新解码")
+
+
+def test_lut_opacity_matches_lambda():
+    """测试查找表调整的透明度与原先逐像素 lambda 的结果一致"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        logo_path = os.path.join(temp_dir, "logo.png")
+        _save_logo(logo_path)
+        cases = [(opacity, scale, rotation)
+                 for opacity in (0.0, 0.3, 0.5, 0.77, 1.0)
+                 for scale, rotation in ((1.0, 0.0), (0.5, 0.0), (0.8, 30.0))]
+        for opacity, scale, rotation in cases:
+            actual = load_logo_stamp(logo_path, scale, rotation, opacity)
+            expected = _reference_logo(logo_path, scale, rotation, opacity)
+            assert actual.size == expected.size
+            assert actual.tobytes() == expected.tobytes(), (opacity, scale, rotation)
+        print(f"  ✓ {len(cases)} 种透明度、缩放与旋转组合与原先的结果逐像素一致")
+
+
+if __name__ == "__main__":
+    test_logo_variants_reused()
+    test_lut_opacity_matches_lambda()
+    print("\n测试完成！")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""
+测试单张图片处理的内存峰值
+
+每个场景在独立的子进程中处理一张图片，分别记录：
+- tracemalloc 统计的 Python 对象内存峰值（文件数据、字节串等副本）；
+- 进程常驻内存峰值（/proc/self/status 中的 VmHWM）的增长。Pillow 的像素缓冲区由C代码
+  直接分配，tracemalloc 统计不到，整帧图像副本只能通过常驻内存观察。
+  （getrusage 的 ru_maxrss 在 exec 后会继承父进程的峰值，不能用于子进程测量）
+两者都以整帧图像的大小为单位断言上限。
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, 'src')
+
+for path in [current_dir, src_path]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from watermark_spec import WatermarkSpec
+
+IMAGE_SIZE = (3000, 2000)
+FRAME_BYTES = IMAGE_SIZE[0] * IMAGE_SIZE[1] * 4  # Pillow 的RGB与RGBA图像都按每像素4字节存储
+
+
+def peak_rss():
+    """当前进程的常驻内存峰值（字节），不支持的平台返回 None"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def measure_peak(image_path, output_dir, options):
+    """在当前进程中处理一张图片，返回 (tracemalloc 峰值, RSS 峰值增长)，单位为字节"""
+    import tracemalloc
+    from watermark_processor import WatermarkProcessor
+
+    processor = WatermarkProcessor()
+    spec = WatermarkSpec(**options)
+
+    # 先处理一张小图，载入字体并渲染缓存的水印图章，不计入峰值
+    with tempfile.TemporaryDirectory() as warm_dir:
+        warm_path = os.path.join(warm_dir, os.path.basename(image_path))
+        with Image.open(image_path) as image:  # 只读取文件头，不解码大图
+            mode = image.mode
+        Image.new(mode, (64, 64)).save(warm_path)
+        processor.process_single_image(warm_path, "", warm_dir, spec=spec)
+
+    before = peak_rss()
+    tracemalloc.start()
+    processor.process_single_image(image_path, "", output_dir, spec=spec)
+    python_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return python_peak, peak_rss() - before
+
+
+def _measure_in_subprocess(image_path, output_dir, options):
+    """在新进程中测量，RSS 峰值不受本进程之前的处理影响"""
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--measure', image_path, output_dir,
+         json.dumps(options)],
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_peak_memory_per_image():
+    """测试各场景的内存峰值不超过预期的整帧副本数量"""
+    if peak_rss() is None:
+        print("  - 当前平台无法读取内存峰值，跳过")
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        gradient = Image.linear_gradient('L').resize(IMAGE_SIZE)
+        rgb_path = os.path.join(temp_dir, "photo.jpg")
+        rgba_path = os.path.join(temp_dir, "alpha.png")
+        Image.merge('RGB', (gradient, gradient.rotate(180), gradient)).save(rgb_path, quality=90)
+        Image.merge('RGBA', (gradient, gradient, gradient, gradient.rotate(180))).save(rgba_path)
+
+        # (场景, 图片, 水印设置, RSS 峰值增长上限（整帧数）)
+        cases = [
+            # 原图解码后原地合成水印，不产生整帧副本
+            ("不透明文字", rgb_path, dict(custom_text="PROOF", font_size=200), 1.2),
+            # 不透明的RGB图片始终不转换为RGBA：半透明水印只在水印区域内混合
+            ("半透明文字", rgb_path, dict(custom_text="PROOF", font_size=200, opacity=0.5), 1.2),
+            # 平铺图层逐行生成，不需要整张图片大小的RGBA图层
+            ("平铺水印", rgb_path, dict(custom_text="PROOF", position="tile", opacity=0.5), 1.2),
+            # 透明图片保存为JPEG：RGBA原图 + 白色背景 + 单个alpha通道
+            ("透明PNG转JPEG", rgba_path, dict(custom_text="PROOF", opacity=0.5, output_format="jpeg"), 2.5),
+        ]
+        for index, (name, image_path, options, frame_limit) in enumerate(cases):
+            output_dir = os.path.join(temp_dir, f"out_{index}")
+            python_peak, rss_growth = _measure_in_subprocess(image_path, output_dir, options)
+            frames = rss_growth / FRAME_BYTES
+            print(f"  ✓ {name}: RSS 增长 {rss_growth / 1024 / 1024:.1f} MB（{frames:.2f} 帧），"
+                  f"Python 对象峰值 {python_peak / 1024:.0f} KB")
+            assert frames <= frame_limit, f"{name}: 内存峰值 {frames:.2f} 帧超过上限 {frame_limit} 帧"
+            assert python_peak < FRAME_BYTES / 8, f"{name}: 产生了整帧大小的 Python 字节副本"
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--measure':
+        print(json.dumps(measure_peak(sys.argv[2], sys.argv[3], json.loads(sys.argv[4]))))
+        sys.exit(0)
+    test_peak_memory_per_image()
+    print("\n测试完成！")
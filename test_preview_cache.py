@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+测试预览代理图缓存功能
+"""
+
+import os
+import sys
+import tempfile
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, 'src')
+
+for path in [current_dir, src_path]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from watermark_processor import WatermarkProcessor
+from preview_cache import PreviewProxyCache
+
+
+def test_preview_proxy_cache():
+    """测试代理图按预览区域缩小、缓存复用与LRU淘汰"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        large_path = os.path.join(temp_dir, "large.jpg")
+        small_path = os.path.join(temp_dir, "small.png")
+        Image.new('RGB', (4000, 3000), color=(90, 140, 200)).save(large_path, 'JPEG')
+        Image.new('RGBA', (200, 100), color=(10, 20, 30, 255)).save(small_path, 'PNG')
+        
+        processor = WatermarkProcessor()
+        cache = PreviewProxyCache(processor, max_items=2)
+        
+        proxy, scale = cache.get(large_path, (800, 600))
+        assert proxy.size == (800, 600) and abs(scale - 0.2) < 1e-6
+        assert cache.get(large_path, (800, 600))[0] is proxy
+        print(f"  ✓ 代理图尺寸 {proxy.size}，缩放系数 {scale}")
+        
+        # 小图不放大
+        small_proxy, small_scale = cache.get(small_path, (800, 600))
+        assert small_proxy.size == (200, 100) and small_scale == 1.0
+        
+        # 在副本上绘制水印，缓存的代理图保持不变
+        before = proxy.tobytes()
+        result = processor.add_watermark(proxy.copy(), "2024-05-01", font_size=36,
+                                         opacity=0.5, layout_scale=scale)
+        assert result.size == proxy.size and proxy.tobytes() == before
+        
+        # 超出容量后淘汰最久未使用的代理图
+        cache.get(large_path, (400, 300))
+        assert cache.get(large_path, (800, 600))[0] is not proxy
+        print("  ✓ 缓存复用、副本绘制与LRU淘汰")
+
+
+if __name__ == "__main__":
+    test_preview_proxy_cache()
+    print("\n测试完成！")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+测试只在水印区域内合成的结果与整帧合成一致
+"""
+
+import os
+import sys
+from PIL import Image, ImageDraw
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, 'src')
+
+for path in [current_dir, src_path]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from watermark_processor import WatermarkProcessor
+from watermark_spec import WatermarkSpec
+
+
+def _full_frame_composite(image, sprite, position):
+    """原先的做法：生成整张图片大小的透明图层，转换为RGBA后整帧合成，再转换回原模式"""
+    layer = Image.new('RGBA', image.size, (0, 0, 0, 0))
+    layer.paste(sprite, position)
+    return Image.alpha_composite(image.convert('RGBA'), layer).convert(image.mode)
+
+
+def _sources():
+    """RGB 与（部分透明的）RGBA 底图"""
+    gradient = Image.linear_gradient('L').resize((300, 200))
+    rgb = Image.merge('RGB', (gradient, gradient.rotate(180), gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    rgba = rgb.convert('RGBA')
+    rgba.putalpha(gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT))
+    return {'RGB': rgb, 'RGBA': rgba}
+
+
+def test_composite_sprite_matches_full_frame():
+    """测试区域合成与整帧 alpha_composite 一致，包括超出图片边界被裁剪的水印"""
+    processor = WatermarkProcessor()
+    sprite = Image.new('RGBA', (120, 50), (255, 0, 0, 160))
+    ImageDraw.Draw(sprite).ellipse((10, 5, 110, 45), fill=(0, 255, 0, 255))
+
+    positions = [(90, 75), (-30, -20), (240, 170), (250, -10), (-40, 180), (400, 10)]
+    for mode, source in _sources().items():
+        for position in positions:
+            expected = _full_frame_composite(source, sprite, position)
+            actual = processor.composite_sprite(source.copy(), sprite, position)
+            assert actual.mode == mode
+            assert actual.tobytes() == expected.tobytes(), (mode, position)
+    print(f"  ✓ RGB 与 RGBA 底图在 {len(positions)} 个位置（含边缘裁剪与完全越界）与整帧合成一致")
+
+
+def test_add_watermark_matches_full_frame():
+    """测试添加水印（纯色遮罩填充与区域合成两条路径）与整帧合成一致"""
+    processor = WatermarkProcessor()
+    specs = [
+        WatermarkSpec(custom_text="PROOF 2024", color="#FF8000"),                      # 纯色遮罩填充
+        WatermarkSpec(custom_text="PROOF 2024", position="top_left", opacity=0.6, shadow=True),
+        WatermarkSpec(custom_text="PROOF 2024", position="center", rotation=30, stroke=True),
+    ]
+    for mode, source in _sources().items():
+        for spec in specs:
+            sprite, position, solid_fill = processor._build_watermark(source.size, "", spec)
+            actual = processor.add_watermark(source.copy(), "", spec=spec)
+            if solid_fill is not None and mode == 'RGBA':
+                # 透明底图上的纯色水印一直是以alpha为遮罩的填充（不按底图透明度加权）
+                expected = source.copy()
+                expected.paste(solid_fill, position, sprite.getchannel('A'))
+            else:
+                expected = _full_frame_composite(source, sprite, position)
+            assert actual.tobytes() == expected.tobytes(), (mode, spec)
+
+        # 在图片边缘被裁剪的水印
+        small = source.crop((0, 0, 60, 12))
+        spec = WatermarkSpec(custom_text="PROOF 2024", position="bottom_right", opacity=0.5)
+        sprite, position, _ = processor._build_watermark(small.size, "", spec)
+        assert position[0] < 0 or position[1] < 0
+        actual = processor.add_watermark(small.copy(), "", spec=spec)
+        assert actual.tobytes() == _full_frame_composite(small, sprite, position).tobytes()
+    print("  ✓ 纯色填充、半透明与旋转水印与整帧合成一致")
+
+
+if __name__ == "__main__":
+    test_composite_sprite_matches_full_frame()
+    test_add_watermark_matches_full_frame()
+    print("\n测试完成！")
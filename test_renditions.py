@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+测试多尺寸导出功能
+"""
+
+import os
+import sys
+import tempfile
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, 'src')
+
+for path in [current_dir, src_path]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from watermark_processor import WatermarkProcessor, Rendition
+
+
+def test_parse_renditions():
+    """测试尺寸规格解析"""
+    renditions = Rendition.parse_list("2400:90, 1200,400:80:_thumb,full")
+    assert [r.size for r in renditions] == [2400, 1200, 400, None]
+    assert [r.quality for r in renditions] == [90, None, 80, None]
+    assert [r.suffix for r in renditions] == ["_2400", "_1200", "_thumb", ""]
+    
+    for bad_spec in ("", "abc", "-5", "800:0", "800:90:_a:extra"):
+        try:
+            Rendition.parse_list(bad_spec)
+        except ValueError as e:
+            print(f"  ✓ 拒绝无效规格 {bad_spec!r}: {e}")
+        else:
+            raise AssertionError(f"应拒绝无效规格: {bad_spec!r}")
+
+
+def test_process_renditions():
+    """测试一次解码导出多个尺寸"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_path = os.path.join(temp_dir, "photo.jpg")
+        Image.new('RGB', (1600, 1200), color=(90, 140, 200)).save(image_path, 'JPEG')
+        output_dir = os.path.join(temp_dir, "output")
+        
+        processor = WatermarkProcessor()
+        renditions = Rendition.parse_list("400,full,800:80,2400")
+        output_paths = processor.process_renditions(
+            image_path, "2024-05-01", output_dir, renditions,
+            font_size=48, opacity=0.7, stroke=True
+        )
+        
+        expected = {
+            "photo_watermarked_400.jpg": (400, 300),
+            "photo_watermarked.jpg": (1600, 1200),
+            "photo_watermarked_800.jpg": (800, 600),
+            "photo_watermarked_2400.jpg": (1600, 1200),  # 不放大
+        }
+        assert [os.path.basename(p) for p in output_paths] == list(expected)
+        for path in output_paths:
+            with Image.open(path) as result:
+                assert result.size == expected[os.path.basename(path)]
+                print(f"  ✓ {os.path.basename(path)}: {result.size}")
+
+
+if __name__ == "__main__":
+    test_parse_renditions()
+    test_process_renditions()
+    print("\n测试完成！")
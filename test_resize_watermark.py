@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+测试先缩放再添加水印：输出尺寸、按比例排布的水印，以及JPEG草稿解码
+"""
+
+import os
+import sys
+import tempfile
+from PIL import Image, ImageChops
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, 'src')
+
+for path in [current_dir, src_path]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from watermark_processor import WatermarkProcessor
+from watermark_spec import WatermarkSpec
+
+
+def _photo(size):
+    """每个像素都不同的测试照片"""
+    gradient = Image.linear_gradient('L').resize(size)
+    return Image.merge('RGB', (gradient, gradient.rotate(180), gradient))
+
+
+def test_output_size_and_layout():
+    """测试输出尺寸，以及字号、边距与图片水印按缩放比例调整"""
+    processor = WatermarkProcessor()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        photo_path = os.path.join(temp_dir, "photo.jpg")
+        Image.new('RGB', (1600, 1200), (128, 128, 128)).save(photo_path, quality=90)
+        logo_path = os.path.join(temp_dir, "logo.png")
+        Image.new('RGBA', (80, 80), (255, 0, 0, 255)).save(logo_path)
+
+        cases = [
+            (dict(resize_mode="percent", resize_percent=0.25), (400, 300), 0.25),
+            (dict(resize_mode="width", resize_width=800), (800, 600), 0.5),
+            (dict(resize_mode="height", resize_height=900), (1200, 900), 0.75),
+        ]
+        for options, expected_size, layout_scale in cases:
+            # 字号、边距与描边宽度按输出分辨率缩放
+            spec = WatermarkSpec(custom_text="PROOF", font_size=80, stroke=True, stroke_width=4, **options)
+            font_size, margin, logo_scale, stroke_width = processor._scaled_layout(spec, layout_scale)
+            assert font_size == round(80 * layout_scale) and margin == round(20 * layout_scale)
+            assert stroke_width == round(4 * layout_scale) and logo_scale == layout_scale
+
+            font_sizes = []
+            load_font_file = processor.load_font_file
+            processor.load_font_file = lambda path, size, *args: font_sizes.append(size) or load_font_file(path, size, *args)
+            try:
+                image = processor.render_watermarked_image(photo_path, "", spec=spec)
+            finally:
+                del processor.load_font_file
+            assert image.size == expected_size
+            assert font_sizes and set(font_sizes) == {font_size}
+
+            # 图片水印的大小与右下角边距都按比例缩小，与原图添加水印后再缩放的排布一致
+            spec = WatermarkSpec(custom_text="", image_watermark_path=logo_path, **options)
+            image = processor.render_watermarked_image(photo_path, "", spec=spec)
+            red, green, _ = image.split()
+            box = ImageChops.multiply(red.point(lambda p: 255 if p > 200 else 0),
+                                      green.point(lambda p: 255 if p < 60 else 0)).getbbox()
+            side = int(80 * layout_scale)
+            assert box is not None
+            width, height = expected_size
+            assert abs(box[2] - (width - margin)) <= 1 and abs(box[3] - (height - margin)) <= 1, box
+            assert abs((box[2] - box[0]) - side) <= 1 and abs((box[3] - box[1]) - side) <= 1, box
+            print(f"  ✓ {options}: 输出 {image.size}，字号 {font_size}，边距 {margin}，Logo {side}px")
+
+
+def test_draft_never_below_target():
+    """测试JPEG草稿解码只按不小于目标尺寸的比例缩小"""
+    processor = WatermarkProcessor()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        photo_path = os.path.join(temp_dir, "photo.jpg")
+        _photo((1600, 1200)).save(photo_path, quality=90)
+
+        # (目标尺寸, 草稿解码后的尺寸)：刚好超过 1/4、1/2 时只能使用上一档的比例
+        cases = [
+            ((400, 300), (400, 300)),
+            ((401, 301), (800, 600)),
+            ((199, 149), (200, 150)),
+            ((801, 601), (1600, 1200)),
+            ((803, 300), (1600, 1200)),
+        ]
+        for target_size, draft_size in cases:
+            with Image.open(photo_path) as source:
+                resized = processor.load_image(source, target_size)
+                assert source.size == draft_size, (target_size, source.size)
+                assert source.size[0] >= target_size[0] and source.size[1] >= target_size[1]
+                assert resized.size == target_size
+
+        # 非JPEG图片不使用草稿模式，直接缩放
+        png_path = os.path.join(temp_dir, "photo.png")
+        _photo((640, 480)).save(png_path)
+        with Image.open(png_path) as source:
+            assert processor.load_image(source, (161, 121)).size == (161, 121)
+            assert source.size == (640, 480)
+    print(f"  ✓ {len(cases)} 个目标尺寸的草稿解码均不小于目标尺寸")
+
+
+if __name__ == "__main__":
+    test_output_size_and_layout()
+    test_draft_never_below_target()
+    print("\n测试完成！")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+测试文字描边（宽度、颜色、旋转）与描边命令行参数
+"""
+
+import os
+import sys
+from PIL import Image, ImageDraw, ImageFont
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, 'src')
+
+for path in [current_dir, src_path]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from main import create_parser, main
+from watermark_processor import WatermarkProcessor
+from watermark_spec import WatermarkSpec
+from watermark_stamp import render_text_stamp
+
+
+def _color_pixels(image, rgb):
+    """统计不透明且颜色为 rgb 的像素数"""
+    return sum(1 for pixel in image.getdata() if pixel[:3] == rgb and pixel[3] == 255)
+
+
+def test_native_stroke():
+    """测试原生描边的宽度与颜色，以及旋转后的图章"""
+    font = WatermarkProcessor().load_font_file(None, 36)
+    assert isinstance(font, ImageFont.FreeTypeFont)
+
+    plain = render_text_stamp("PROOF", font, (255, 255, 255))
+    for width in (1, 3):
+        stamp = render_text_stamp("PROOF", font, (255, 255, 255), 255, 0, width, 0.0, (0, 255, 0))
+        # 图章四周为描边预留边距
+        assert stamp.size == (plain.size[0] + 2 * width, plain.size[1] + 2 * width)
+
+        # 与 FreeType 一次性绘制描边和文字的结果一致
+        left, top, _, _ = ImageDraw.Draw(Image.new('RGB', (1, 1))).textbbox((0, 0), "PROOF", font=font)
+        expected = Image.new('RGBA', stamp.size, (0, 0, 0, 0))
+        ImageDraw.Draw(expected).text((width - left, width - top), "PROOF", font=font, fill=(255, 255, 255, 255),
+                                      stroke_width=width, stroke_fill=(0, 255, 0, 255))
+        assert stamp.sprite.tobytes() == expected.tobytes()
+        assert _color_pixels(stamp.sprite, (0, 255, 0)) > 0
+    thin = render_text_stamp("PROOF", font, (255, 255, 255), 255, 0, 1, 0.0, (0, 255, 0))
+    thick = render_text_stamp("PROOF", font, (255, 255, 255), 255, 0, 3, 0.0, (0, 255, 0))
+    assert _color_pixels(thick.sprite, (0, 255, 0)) > _color_pixels(thin.sprite, (0, 255, 0))
+    print(f"  ✓ 描边宽度 1/3 与颜色，图章 {thin.size} / {thick.size}")
+
+    # 旋转：图章为未旋转图章绕中心旋转的结果，文本中心位置不变
+    rotated = render_text_stamp("PROOF", font, (255, 255, 255), 255, 0, 2, 30.0, (0, 255, 0))
+    upright = render_text_stamp("PROOF", font, (255, 255, 255), 255, 0, 2, 0.0, (0, 255, 0))
+    assert rotated.sprite.tobytes() == upright.sprite.rotate(30.0, expand=True).tobytes()
+    center = (upright.offset[0] + upright.size[0] / 2, upright.offset[1] + upright.size[1] / 2)
+    assert abs(rotated.offset[0] + rotated.size[0] / 2 - center[0]) <= 1
+    assert abs(rotated.offset[1] + rotated.size[1] / 2 - center[1]) <= 1
+    print("  ✓ 描边文字旋转")
+
+    # 位图字体不支持原生描边，使用偏移绘制
+    if hasattr(ImageFont, 'load_default_imagefont'):
+        bitmap = render_text_stamp("PROOF", ImageFont.load_default_imagefont(), (255, 255, 255),
+                                   255, 0, 1, 0.0, (255, 0, 0))
+        assert _color_pixels(bitmap.sprite, (255, 0, 0)) > 0
+        print("  ✓ 位图字体的偏移描边")
+
+
+def test_stroke_watermark_options():
+    """测试水印设置与命令行参数中的描边宽度和颜色"""
+    processor = WatermarkProcessor()
+    base = Image.new('RGB', (300, 200), (0, 0, 0))
+    image = processor.add_watermark(base.copy(), "", spec=WatermarkSpec(
+        custom_text="PROOF", position="center", stroke=True, stroke_width=2, stroke_color="#0000FF"))
+    assert any(pixel == (0, 0, 255) for pixel in image.getdata())
+    image = processor.add_watermark(base.copy(), "", spec=WatermarkSpec(
+        custom_text="PROOF", position="center", stroke=False, stroke_width=2, stroke_color="#0000FF"))
+    assert not any(pixel == (0, 0, 255) for pixel in image.getdata())
+    assert WatermarkSpec(font_size=90, stroke=True).effective_stroke_width == 3  # 默认按字号计算
+
+    args = create_parser().parse_args(["photos", "--stroke", "-sw", "4", "-sc", "#00FF00"])
+    assert args.stroke and args.stroke_width == 4 and args.stroke_color == "#00FF00"
+    args = create_parser().parse_args(["photos"])
+    assert not args.stroke and args.stroke_width is None and args.stroke_color == "#000000"
+
+    argv = sys.argv
+    try:
+        for invalid in (["--stroke-width", "0"], ["--stroke-color", "green"]):
+            sys.argv = ["main.py", "photos", "--stroke"] + invalid
+            try:
+                main()
+                raise AssertionError(f"应当拒绝无效参数: {invalid}")
+            except SystemExit as e:
+                assert e.code == 1
+    finally:
+        sys.argv = argv
+    print("  ✓ --stroke-width / --stroke-color 参数解析与验证")
+
+
+if __name__ == "__main__":
+    test_native_stroke()
+    test_stroke_watermark_options()
+    print("\n测试完成！")
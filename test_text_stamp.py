@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""
+测试文本水印图章的缓存功能
+"""
+
+import os
+import sys
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, 'src')
+
+for path in [current_dir, src_path]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from watermark_processor import WatermarkProcessor
+from watermark_spec import WatermarkSpec
+from watermark_stamp import render_text_stamp
+
+
+def test_stamp_cache_reused():
+    """测试相同设置复用缓存的图章，缓存结果与重新渲染的像素一致"""
+    processor = WatermarkProcessor()
+    base = Image.new('RGB', (400, 300), color=(90, 140, 200))
+    specs = [
+        WatermarkSpec(custom_text="2024-05-01", font_size=40),
+        WatermarkSpec(custom_text="2024-05-01", opacity=0.5, shadow=True, stroke=True, rotation=20),
+    ]
+
+    render_text_stamp.cache_clear()
+    for spec in specs:
+        first = processor.add_watermark(base.copy(), "", spec=spec)
+        misses = render_text_stamp.cache_info().misses
+        hits = render_text_stamp.cache_info().hits
+        second = processor.add_watermark(base.copy(), "", spec=spec)
+        info = render_text_stamp.cache_info()
+        assert info.misses == misses and info.hits == hits + 1
+        assert first.tobytes() == second.tobytes()
+    print(f"  ✓ 相同设置复用缓存的图章: {render_text_stamp.cache_info()}")
+
+    # 缓存的图章与不经缓存重新渲染的图章逐像素一致
+    font = processor.load_font_file(None, 40)
+    args = ("PROOF", font, (255, 0, 0), 128, 2, 1, 15.0, (0, 0, 255))
+    cached = render_text_stamp(*args)
+    assert render_text_stamp(*args) is cached
+    fresh = render_text_stamp.__wrapped__(*args)
+    assert cached.sprite.tobytes() == fresh.sprite.tobytes()
+    assert cached.offset == fresh.offset and cached.text_size == fresh.text_size
+
+    # 清空缓存后重新渲染，添加水印的结果不变
+    expected = processor.add_watermark(base.copy(), "", spec=specs[1])
+    render_text_stamp.cache_clear()
+    assert processor.add_watermark(base.copy(), "", spec=specs[1]).tobytes() == expected.tobytes()
+    print("  ✓ 缓存结果与重新渲染的像素一致")
+
+
+if __name__ == "__main__":
+    test_stamp_cache_reused()
+    print("\n测试完成！")
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+"""
+测试缩略图服务功能
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+import piexif
+from PIL import Image, TiffImagePlugin
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, 'src')
+
+for path in [current_dir, src_path]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from exif_header import read_exif_thumbnail
+from thumbnail_service import ThumbnailService, make_thumbnail
+
+
+def _save_with_embedded_thumbnail(path, size, thumbnail_color, fmt='JPEG'):
+    """保存带EXIF内嵌缩略图的图片（缩略图颜色与原图不同，便于区分来源）"""
+    buffer = io.BytesIO()
+    Image.new('RGB', (160, 120), color=thumbnail_color).save(buffer, 'JPEG')
+    exif_bytes = piexif.dump({
+        '0th': {piexif.ImageIFD.Orientation: 1},
+        'Exif': {piexif.ExifIFD.DateTimeOriginal: b'2023:07:15 10:20:30'},
+        '1st': {piexif.ImageIFD.JPEGInterchangeFormat: 0, piexif.ImageIFD.JPEGInterchangeFormatLength: 0},
+        'thumbnail': buffer.getvalue(),
+    })
+    Image.new('RGB', size, color=(0, 0, 255)).save(path, fmt, exif=exif_bytes)
+
+
+def test_make_thumbnail():
+    """测试内嵌缩略图优先、draft解码与透明图片"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        embedded_path = os.path.join(temp_dir, "embedded.jpg")
+        plain_path = os.path.join(temp_dir, "plain.jpg")
+        png_path = os.path.join(temp_dir, "alpha.png")
+        _save_with_embedded_thumbnail(embedded_path, (2000, 1500), (255, 0, 0))
+        Image.new('RGB', (2000, 1000), color=(0, 255, 0)).save(plain_path, 'JPEG')
+        Image.new('RGBA', (300, 300), color=(0, 0, 0, 0)).save(png_path, 'PNG')
+
+        data = read_exif_thumbnail(embedded_path)
+        assert data is not None and Image.open(io.BytesIO(data)).size == (160, 120)
+        assert read_exif_thumbnail(plain_path) is None
+
+        thumbnail = make_thumbnail(embedded_path, (64, 64))
+        assert thumbnail.mode == 'RGB' and thumbnail.size == (64, 48)
+        assert thumbnail.getpixel((32, 24))[0] > 200  # 来自红色的内嵌缩略图
+        print(f"  ✓ 使用EXIF内嵌缩略图 {thumbnail.size}")
+
+        # 内嵌缩略图小于目标尺寸时解码原图
+        assert make_thumbnail(embedded_path, (400, 400)).getpixel((10, 10))[2] > 200
+
+        thumbnail = make_thumbnail(plain_path, (64, 64))
+        assert thumbnail.size == (64, 32) and thumbnail.getpixel((32, 16))[1] > 200
+
+        thumbnail = make_thumbnail(png_path, (64, 64))
+        assert thumbnail.mode == 'RGB' and thumbnail.getpixel((0, 0)) == (255, 255, 255)
+        print("  ✓ draft解码与透明背景处理")
+
+
+def test_png_and_tiff_previews():
+    """测试PNG的eXIf内嵌缩略图、TIFF的缩小分辨率页，以及其余图片先用 reduce() 缩小"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        png_path = os.path.join(temp_dir, "embedded.png")
+        _save_with_embedded_thumbnail(png_path, (2000, 1500), (255, 0, 0), fmt='PNG')
+        assert read_exif_thumbnail(png_path) is not None
+        thumbnail = make_thumbnail(png_path, (64, 64))
+        assert thumbnail.size == (64, 48) and thumbnail.getpixel((32, 24))[0] > 200
+        print("  ✓ 使用PNG eXIf块中的内嵌缩略图")
+
+        # 多页TIFF：第二页为标记了 NewSubfileType 的缩小分辨率页
+        tiff_path = os.path.join(temp_dir, "pages.tif")
+        with TiffImagePlugin.AppendingTiffWriter(tiff_path, True) as tiff:
+            Image.new('RGB', (2000, 1500), color=(0, 0, 255)).save(tiff, 'TIFF')
+            tiff.newFrame()
+            Image.new('RGB', (200, 150), color=(255, 0, 0)).save(tiff, 'TIFF', tiffinfo={254: 1})
+            tiff.newFrame()
+        thumbnail = make_thumbnail(tiff_path, (64, 64))
+        assert thumbnail.size == (64, 48) and thumbnail.getpixel((32, 24))[0] > 200
+        # 缩小分辨率页小于目标尺寸时解码第一页
+        assert make_thumbnail(tiff_path, (400, 400)).getpixel((10, 10))[2] > 200
+        print("  ✓ 使用TIFF的缩小分辨率页")
+
+        # 没有内嵌缩略图的PNG先按整数倍缩小再转换模式；调色板图片直接转换
+        reduced = []  # (模式, 尺寸, 倍数)
+        reduce = Image.Image.reduce
+        Image.Image.reduce = lambda self, factor, **kwargs: (reduced.append((self.mode, self.size, factor))
+                                                             or reduce(self, factor, **kwargs))
+        try:
+            rgb_path = os.path.join(temp_dir, "plain.png")
+            Image.new('RGB', (2000, 1000), color=(0, 255, 0)).save(rgb_path)
+            thumbnail = make_thumbnail(rgb_path, (64, 64))
+            assert thumbnail.size == (64, 32) and thumbnail.getpixel((32, 16)) == (0, 255, 0)
+            assert reduced[0] == ('RGB', (2000, 1000), 15)
+
+            palette_path = os.path.join(temp_dir, "palette.png")
+            Image.new('RGB', (640, 480), color=(255, 0, 0)).convert('P').save(palette_path)
+            thumbnail = make_thumbnail(palette_path, (64, 64))
+            assert thumbnail.size == (64, 48) and thumbnail.getpixel((32, 24))[0] > 200
+            assert not any(mode == 'P' for mode, _, _ in reduced)
+        finally:
+            Image.Image.reduce = reduce
+        print("  ✓ 先用 reduce() 按整数倍缩小再生成缩略图")
+
+
+def test_thumbnail_service_cache():
+    """测试后台生成、磁盘缓存与文件修改后失效"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_path = os.path.join(temp_dir, "photo.jpg")
+        cache_dir = os.path.join(temp_dir, "thumbs")
+        Image.new('RGB', (800, 600), color=(200, 100, 50)).save(image_path, 'JPEG')
+
+        service = ThumbnailService((48, 48), cache_dir=cache_dir, workers=2)
+        try:
+            service.request(image_path)
+            service.request(image_path)  # 未完成时重复请求被忽略
+            service.request(os.path.join(temp_dir, "missing.jpg"))
+
+            results = {}
+            deadline = time.time() + 10
+            while len(results) < 2 and time.time() < deadline:
+                results.update(service.poll())
+                time.sleep(0.01)
+            assert results[image_path].size == (48, 36)
+            assert results[os.path.join(temp_dir, "missing.jpg")] is None
+            assert service.poll() == []
+
+            cache_path = service.cache_path(image_path, os.stat(image_path))
+            assert os.path.exists(cache_path)
+            assert [name for name in os.listdir(cache_dir) if name.endswith('.part')] == []
+            print("  ✓ 后台生成并写入磁盘缓存")
+
+            # 修改图片后缓存键变化
+            Image.new('RGB', (400, 400), color=(0, 0, 0)).save(image_path, 'JPEG')
+            stat = os.stat(image_path)
+            os.utime(image_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            assert service.cache_path(image_path, os.stat(image_path)) != cache_path
+            assert service.load(image_path).size == (48, 48)
+            print("  ✓ 图片修改后缓存失效")
+        finally:
+            service.shutdown()
+
+
+def test_cache_size_limit():
+    """测试磁盘缓存超过容量上限时淘汰最久未使用的缩略图"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache_dir = os.path.join(temp_dir, "thumbs")
+        paths = []
+        for i in range(6):
+            image_path = os.path.join(temp_dir, f"photo_{i}.png")
+            Image.new('RGB', (480, 360), color=(40 * i, 80, 120)).save(image_path)
+            paths.append(image_path)
+
+        service = ThumbnailService((48, 48), cache_dir=cache_dir, workers=1)
+        try:
+            cache_paths = [service.cache_path(path, os.stat(path)) for path in paths]
+            for index, path in enumerate(paths):
+                service.load(path)
+                # 按生成顺序设置修改时间，不依赖文件系统的时间精度
+                os.utime(cache_paths[index], ns=(0, (index + 1) * 1_000_000_000))
+            sizes = [os.path.getsize(path) for path in cache_paths]
+
+            # 读取缓存命中的缩略图会更新其最近使用时间
+            service.load(paths[0])
+            assert os.stat(cache_paths[0]).st_mtime_ns > 6_000_000_000
+
+            # 按最近使用时间淘汰：保留 photo_0（刚读取过）与最新的 photo_4、photo_5
+            keep = sizes[0] + sizes[4] + sizes[5]
+            assert service.prune_cache(keep) == keep
+            assert not any(os.path.exists(cache_paths[i]) for i in (1, 2, 3))
+            assert all(os.path.exists(cache_paths[i]) for i in (0, 4, 5))
+
+            # 写入新缩略图后超过容量上限时自动淘汰到上限的3/4
+            service.max_cache_bytes = keep
+            service.load(paths[1])
+            remaining = os.listdir(cache_dir)
+            total = sum(os.path.getsize(os.path.join(cache_dir, name)) for name in remaining)
+            assert os.path.exists(cache_paths[1]) and total <= keep * 3 // 4, remaining
+            print(f"  ✓ 超过容量上限时淘汰最久未使用的缩略图，剩余 {len(remaining)} 个")
+
+            # 被淘汰的缩略图再次请求时重新生成
+            assert service.load(paths[2]).size == (48, 36)
+            assert service.prune_cache(0) == 0 and os.listdir(cache_dir) == []
+        finally:
+            service.shutdown()
+
+
+if __name__ == "__main__":
+    test_make_thumbnail()
+    test_png_and_tiff_previews()
+    test_thumbnail_service_cache()
+    test_cache_size_limit()
+    print("\n测试完成！")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+测试平铺水印功能
+"""
+
+import os
+import sys
+import tempfile
+from PIL import Image, ImageChops
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, 'src')
+
+for path in [current_dir, src_path]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from watermark_processor import WatermarkProcessor, WatermarkPosition
+from watermark_spec import WatermarkSpec
+from watermark_stamp import fill_tiled, make_tile
+
+
+def test_tile_pattern():
+    """测试图块无缝重复，倍增铺满与逐个粘贴的结果一致"""
+    sprite = Image.new('RGBA', (30, 10), (255, 0, 0, 255))
+    tile = make_tile(sprite, 8)
+    assert tile.size == (38, 36)
+    # 第二行错开半个图块，越过右边界的部分回绕到左侧
+    assert tile.getpixel((4, 4))[3] == 255 and tile.getpixel((4 + 19, 4 + 18))[3] == 255
+    assert tile.getpixel((0, 4 + 18))[3] == 255
+
+    size = (500, 333)
+    layer = fill_tiled(tile, size)
+    expected = Image.new('RGBA', size)
+    for y in range(0, size[1], tile.height):
+        for x in range(0, size[0], tile.width):
+            expected.paste(tile, (x, y))
+    assert ImageChops.difference(layer, expected).getbbox() is None
+    print(f"  ✓ 图块 {tile.size} 倍增铺满 {size} 与逐个粘贴一致")
+
+
+def test_tile_watermark():
+    """测试平铺水印覆盖整张图片，支持各种效果、RGBA图片与图片水印"""
+    processor = WatermarkProcessor()
+    spec = WatermarkSpec(position="平铺", custom_text="PROOF", color="#FF0000",
+                         tile_spacing=20, tile_angle=30)
+    assert spec.position == WatermarkPosition.TILE
+
+    image = processor.add_watermark(Image.new('RGB', (600, 400), (0, 0, 255)), "", spec=spec)
+    assert image.mode == 'RGB'
+    # 四个象限都有水印
+    for box in ((0, 0, 300, 200), (300, 0, 600, 200), (0, 200, 300, 400), (300, 200, 600, 400)):
+        assert image.crop(box).getextrema()[0][1] > 200
+    print("  ✓ 纯色文字平铺覆盖整张图片")
+
+    for options in (dict(opacity=0.5, shadow=True), dict(stroke=True)):
+        styled = WatermarkSpec(position="tile", custom_text="PROOF", tile_spacing=20, **options)
+        image = processor.add_watermark(Image.new('RGB', (300, 200), (0, 0, 255)), "", spec=styled)
+        assert image.mode == 'RGB' and image.getextrema()[0][1] > 0
+        image = processor.add_watermark(Image.new('RGBA', (300, 200), (0, 0, 255, 128)), "", spec=styled)
+        assert image.mode == 'RGBA'
+    print("  ✓ 阴影、描边、透明度与RGBA图片")
+
+    # 预览图层覆盖整张图片
+    sprite, position = processor.render_watermark_sprite((320, 240), "2024-01-01", spec=spec)
+    assert sprite.size == (320, 240) and position == (0, 0)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        logo_path = os.path.join(temp_dir, "logo.png")
+        Image.new('RGBA', (40, 20), (0, 255, 0, 255)).save(logo_path)
+        logo_spec = WatermarkSpec(position="tile", image_watermark_path=logo_path, tile_spacing=10)
+        image = processor.add_watermark(Image.new('RGB', (400, 300), (0, 0, 0)), "", spec=logo_spec)
+        assert image.crop((200, 150, 400, 300)).getextrema()[1][1] == 255
+    print("  ✓ 图片水印平铺")
+
+    try:
+        WatermarkSpec(position="tile", tile_spacing=-1)
+        raise AssertionError("应当拒绝负数间距")
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    test_tile_pattern()
+    test_tile_watermark()
+    print("\n测试完成！")
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+"""
+测试预览水印图层渲染功能
+"""
+
+import os
+import sys
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, 'src')
+
+for path in [current_dir, src_path]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from watermark_processor import WatermarkProcessor, WatermarkPosition
+
+
+def test_render_watermark_sprite():
+    """测试单独渲染的水印图层与直接添加水印的结果一致"""
+    processor = WatermarkProcessor()
+    base = Image.new('RGB', (640, 480), color=(90, 140, 200))
+    
+    cases = [
+        dict(),
+        dict(opacity=0.5, rotation=30, position=WatermarkPosition.CENTER),
+        dict(shadow=True, stroke=True, color="#FF0000", position=WatermarkPosition.TOP_LEFT),
+    ]
+    for options in cases:
+        expected = processor.add_watermark(base.copy(), "2024-05-01", font_size=40, **options)
+        
+        sprite, position = processor.render_watermark_sprite(base.size, "2024-05-01",
+                                                            font_size=40, **options)
+        assert sprite.mode == 'RGBA'
+        overlay = processor.composite_sprite(base.copy(), sprite, position)
+        assert overlay.tobytes() == expected.tobytes(), options
+        print(f"  ✓ 水印图层 {sprite.size} 位于 {position}: {options or '默认'}")
+    
+    # 渲染水印图层不读取也不修改图片
+    assert base.getpixel((0, 0)) == (90, 140, 200)
+
+
+if __name__ == "__main__":
+    test_render_watermark_sprite()
+    print("\n测试完成！")
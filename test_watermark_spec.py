@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+测试水印设置对象（WatermarkSpec）
+"""
+
+import os
+import pickle
+import sys
+import tempfile
+from dataclasses import replace
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, 'src')
+
+for path in [current_dir, src_path]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from watermark_processor import WatermarkProcessor, WatermarkPosition
+from main import PhotoWatermarkApp
+from watermark_spec import WatermarkSpec, parse_position
+
+
+def test_spec_validation_and_derived_values():
+    """测试创建时的验证、转换与派生值"""
+    spec = WatermarkSpec(font_size="48", color="#FF8000", position="左上", opacity=0.5,
+                         stroke=True, stroke_color="#0000FF", output_format="PNG")
+    assert spec.font_size == 48 and spec.position == WatermarkPosition.TOP_LEFT
+    assert spec.rgb_color == (255, 128, 0) and spec.stroke_rgb == (0, 0, 255)
+    assert spec.alpha == 127 and spec.effective_stroke_width == 1
+    assert spec.output_format == "png" and not spec.is_solid_text
+    print("  ✓ 参数转换与派生值")
+
+    for invalid in (dict(color="#FFF"), dict(font_size=0), dict(opacity=1.5),
+                    dict(quality=0), dict(position="nowhere"), dict(resize_mode="zoom"),
+                    dict(stroke=True, stroke_color="red"), dict(stroke_width=0)):
+        try:
+            WatermarkSpec(**invalid)
+        except ValueError:
+            continue
+        raise AssertionError(f"应当拒绝无效设置: {invalid}")
+    print("  ✓ 无效设置被拒绝")
+
+
+def test_spec_hash_and_pickle():
+    """测试不可变、可哈希与序列化"""
+    spec = WatermarkSpec(font_size=40, bold=True, rotation=15)
+    same = WatermarkSpec.from_options(font_size=40, font_style={'bold': True}, rotation=15.0)
+    assert spec == same and hash(spec) == hash(same)
+    assert len({spec, same, replace(spec, font_size=41)}) == 2
+    try:
+        spec.font_size = 10
+        raise AssertionError("设置对象应当不可修改")
+    except AttributeError:
+        pass
+
+    restored = pickle.loads(pickle.dumps(spec))
+    assert restored == spec and restored.rgb_color == spec.rgb_color
+    assert restored.font_style == {'bold': True}
+    assert WatermarkSpec.from_options(**spec.to_options()) == spec
+    print(f"  ✓ 可哈希、不可修改，序列化后 {len(pickle.dumps(spec))} 字节")
+
+
+def test_spec_matches_keyword_api():
+    """测试使用设置对象与使用关键字参数的输出一致"""
+    processor = WatermarkProcessor()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_path = os.path.join(temp_dir, "photo.jpg")
+        Image.new('RGB', (640, 480), color=(90, 140, 200)).save(image_path, 'JPEG')
+
+        options = dict(font_size=40, color="#FF0000", position=WatermarkPosition.CENTER,
+                       opacity=0.7, shadow=True, stroke=True, rotation=10.0)
+        legacy = processor.add_watermark(image_path, "2024-05-01", **options)
+        spec = WatermarkSpec(**options)
+        assert processor.add_watermark(image_path, "2024-05-01", spec=spec).tobytes() == legacy.tobytes()
+
+        resized_spec = replace(spec, resize_mode="percent", resize_percent=0.5, naming_rule="prefix")
+        output_path = processor.process_single_image(image_path, "2024-05-01", temp_dir, spec=resized_spec)
+        assert os.path.basename(output_path) == "wm_photo.jpg"
+        with Image.open(output_path) as output:
+            assert output.size == (320, 240)
+        print("  ✓ 设置对象与关键字参数输出一致")
+
+
+def test_position_names():
+    """测试命令行按 parse_position 解析位置名称，未识别时使用右下角"""
+    app = PhotoWatermarkApp(use_exif_cache=False)
+    names = [position.value for position in WatermarkPosition] + ['左上', '居中', '平铺', ' Top_Left ']
+    for name in names:
+        assert app.get_position_from_string(name) is parse_position(name)
+    assert app.get_position_from_string("平铺") is WatermarkPosition.TILE
+    assert app.get_position_from_string("middle") is WatermarkPosition.BOTTOM_RIGHT
+    try:
+        parse_position("middle")
+        raise AssertionError("未识别的位置应当报错")
+    except ValueError:
+        pass
+    print(f"  ✓ {len(names)} 个位置名称解析一致")
+
+
+if __name__ == "__main__":
+    test_spec_validation_and_derived_values()
+    test_spec_hash_and_pickle()
+    test_spec_matches_keyword_api()
+    test_position_names()
+    print("\n测试完成！")